@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 
 from .models import (
@@ -5,6 +6,8 @@ from .models import (
     Consumer,
     ConsumerKey,
     Plugin,
+    Target,
+    Upstream,
 )
 
 
@@ -16,15 +19,39 @@ class ConsumerAdmin(admin.ModelAdmin):
     list_display = ('created_at', 'username')
 
 
+class ConsumerKeyForm(forms.ModelForm):
+    key = forms.CharField(min_length=8, max_length=200)
+
+    class Meta:
+        model = ConsumerKey
+        fields = ('consumer', 'key')
+
+    def save(self, commit=True):
+        self.instance.key = self.cleaned_data['key']
+        return super(ConsumerKeyForm, self).save(commit=commit)
+
+
 class ConsumerKeyAdmin(admin.ModelAdmin):
-    list_display = ('consumer', 'key')
+    form = ConsumerKeyForm
+    list_display = ('consumer', 'key_digest')
 
 
 class PluginAdmin(admin.ModelAdmin):
     list_display = ('api', 'name')
 
 
+class TargetInline(admin.TabularInline):
+    model = Target
+    extra = 1
+
+
+class UpstreamAdmin(admin.ModelAdmin):
+    list_display = ('api', 'algorithm')
+    inlines = [TargetInline]
+
+
 admin.site.register(Api, ApiAdmin)
 admin.site.register(Consumer, ConsumerAdmin)
 admin.site.register(ConsumerKey, ConsumerKeyAdmin)
 admin.site.register(Plugin, PluginAdmin)
+admin.site.register(Upstream, UpstreamAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApiBouncerConfig(AppConfig):
     name = 'api_bouncer'
     verbose_name = 'API Bouncer'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,17 @@
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+
+def get_asgi_application():
+    """Set up Django and return the ASGI application of the data plane"""
+    django.setup(set_prefix=False)
+
+    from .async_proxy import aiohttp, BouncerASGIHandler
+
+    if aiohttp is None:
+        raise ImproperlyConfigured(
+            'The ASGI data plane requires aiohttp, install it with '
+            '`pip install django-api-bouncer[async]`'
+        )
+
+    return BouncerASGIHandler()
@@ -0,0 +1,637 @@
+import asyncio
+import io
+import sys
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .coalescing import abort_flight, build_shared_response
+from .conf import get_setting
+from .metrics import record_request, upstream_duration
+from .middleware.base import BaseMiddleware
+from .plugins.request_size_limiting import get_size_limit
+from .proxy import (
+    BodyTooLarge,
+    get_request_headers,
+    HOP_BY_HOP_HEADERS,
+    request_too_large,
+    should_stream,
+    upstream_error,
+)
+from .registry import ApiRegistry
+from .retries import get_backoff, get_retries, retry_budgets
+from .routing import routing_table
+from .tracing import activate, deactivate
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+# Characters left as they are when quoting upstream paths and queries, as
+# in RFC 3986. Queries are passed as received, so their escapes are kept.
+PATH_SAFE = "/!$&'()*+,;=:@~"
+QUERY_SAFE = PATH_SAFE + '?%'
+
+
+def get_environ(scope):
+    """Build the WSGI environ of the request described by an ASGI scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': client[0],
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = 'HTTP_{}'.format(name)
+        if name in environ:
+            value = '{},{}'.format(environ[name], value)
+        environ[name] = value
+
+    return environ
+
+
+def get_content_length(environ):
+    try:
+        return int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def has_body(environ):
+    return (
+        get_content_length(environ) > 0 or
+        'chunked' in environ.get('HTTP_TRANSFER_ENCODING', '').lower()
+    )
+
+
+def needs_body(route):
+    """Whether plugins of the route read the request body"""
+    config = route.plugins.get('key-auth')
+    return bool(config and config.get('key_in_body'))
+
+
+def needs_response(route, request):
+    """Whether plugins of the route act on the response of a request"""
+    return any(plugin.needs_response(request) for plugin in route.pipeline)
+
+
+def needs_buffer(route):
+    """
+    Whether plugins of the route keep upstream responses, which they can
+    only do with buffered bodies
+    """
+    return (
+        'proxy-cache' in route.plugins or
+        'request-coalescing' in route.plugins
+    )
+
+
+def is_connect_timeout(error):
+    """Whether an upstream request timed out while connecting"""
+    if hasattr(aiohttp, 'ConnectionTimeoutError'):
+        return isinstance(error, aiohttp.ConnectionTimeoutError)
+    # Before aiohttp 3.10, connect and read timeouts only differ by message
+    return (
+        isinstance(error, aiohttp.ServerTimeoutError) and
+        str(error).startswith('Connection timeout')
+    )
+
+
+def load_middleware():
+    """Instantiate bouncer middleware listed in settings.MIDDLEWARE"""
+    middleware = []
+    for middleware_path in settings.MIDDLEWARE:
+        middleware_class = import_string(middleware_path)
+        if (
+            isinstance(middleware_class, type) and
+            issubclass(middleware_class, BaseMiddleware)
+        ):
+            middleware.append(middleware_class())
+    return middleware
+
+
+async def send_response(send, response):
+    """Send a Django response through ASGI"""
+    content = response.content
+    headers = [
+        (name.encode('latin1'), value.encode('latin1'))
+        for name, value in response.items()
+    ]
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').strip().encode('latin1'))
+        )
+    if not response.has_header('Content-Length'):
+        headers.append((b'Content-Length', str(len(content)).encode()))
+
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': headers,
+    })
+    await send({'type': 'http.response.body', 'body': content})
+
+
+def get_body_limit(route):
+    """Size limit of request bodies set by request-size-limiting, if any"""
+    config = route.plugins.get('request-size-limiting')
+    return get_size_limit(config) if config else None
+
+
+class ReceiveBody(object):
+    """
+    Async iterator over the body of an ASGI request, raising BodyTooLarge
+    once more than `limit` bytes were received, if given.
+    """
+    def __init__(self, receive, limit=None):
+        self.receive = receive
+        self.more_body = True
+        self.limit = limit
+        self.size = 0
+        self.too_large = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.more_body:
+            raise StopAsyncIteration
+
+        message = await self.receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError('Client disconnected')
+
+        self.more_body = message.get('more_body', False)
+        chunk = message.get('body', b'')
+        self.size += len(chunk)
+        if self.limit is not None and self.size > self.limit:
+            self.too_large = True
+            raise BodyTooLarge()
+        return chunk
+
+    async def read(self):
+        chunks = []
+        async for chunk in self:
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+
+class AsyncUpstreamClient(object):
+    """Non-blocking HTTP session keeping connections alive to an upstream"""
+    def __init__(self, upstream_url):
+        self.upstream_url = upstream_url
+        # Requests using the session, and whether it's been replaced
+        self.active = 0
+        self.retired = False
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=get_setting('ASYNC_UPSTREAM_LIMIT'),
+            keepalive_timeout=get_setting('UPSTREAM_IDLE_TIMEOUT'),
+        )
+        # Same as UpstreamClient: bodies are passed through undecoded and
+        # upstream cookies are never kept.
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            headers={'Accept-Encoding': 'identity'},
+            auto_decompress=False,
+        )
+
+    async def close(self):
+        await self.session.close()
+
+
+class AsyncUpstreamClients(ApiRegistry):
+    """
+    Async upstream clients, by api.
+
+    Clients are bound to the event loop they're created in, so they must
+    only be used from that loop. Requests acquire the client of their api
+    until their response is sent, and a client replaced when the
+    upstream_url of its api changes is only closed once they're done.
+    """
+    def __init__(self):
+        super(AsyncUpstreamClients, self).__init__(
+            lambda api: AsyncUpstreamClient(api.upstream_url),
+            settings=lambda api: api.upstream_url,
+            close=self.retire,
+        )
+        # Closing clients, kept so their tasks aren't collected midway
+        self._closing = set()
+
+    def acquire(self, api):
+        client = self.get(api)
+        client.active += 1
+        return client
+
+    def release(self, client):
+        client.active -= 1
+        if client.retired and not client.active:
+            self._schedule_close(client)
+
+    def retire(self, client):
+        client.retired = True
+        if not client.active:
+            self._schedule_close(client)
+
+    def _schedule_close(self, client):
+        task = asyncio.ensure_future(client.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close(self):
+        self.clear()
+        if self._closing:
+            await asyncio.wait(list(self._closing))
+
+
+class BouncerASGIHandler(object):
+    """
+    ASGI application of the bouncer data plane.
+
+    Bouncer middleware run in a thread, as they may query the database, and
+    requests are then proxied to upstreams without blocking, so a single
+    process can wait on many upstream calls at once.
+    """
+    def __init__(self):
+        self.middleware = load_middleware()
+        self.clients = AsyncUpstreamClients()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+        else:
+            raise ValueError(
+                'Unsupported ASGI scope type {}'.format(scope['type'])
+            )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def close(self):
+        await self.clients.close()
+
+    async def handle(self, scope, receive, send):
+        loop = asyncio.get_event_loop()
+        environ = get_environ(scope)
+        route = await loop.run_in_executor(
+            None,
+            self.get_route,
+            environ.get('HTTP_HOST'),
+            scope['path'],
+            scope['method'],
+        )
+
+        if not route:
+            await send_response(send, JsonResponse(data={}, status=200))
+            return
+
+        data = None
+        if has_body(environ):
+            limit = get_body_limit(route)
+            data = ReceiveBody(receive, limit)
+            # Bodies too large by their Content-Length are never read, and
+            # are rejected by request-size-limiting
+            if needs_body(route) and not (
+                limit is not None and get_content_length(environ) > limit
+            ):
+                try:
+                    data = await data.read()
+                except BodyTooLarge:
+                    await send_response(send, request_too_large())
+                    return
+                environ['wsgi.input'] = io.BytesIO(data)
+
+        # Lets plugins hand waits over to the event loop
+        environ['BOUNCER_ASYNC'] = True
+        request, response = await loop.run_in_executor(
+            None,
+            self.process_request,
+            environ,
+        )
+        if response is not None:
+            await send_response(send, response)
+            return
+
+        if 'BOUNCER_WAIT' in request.META:
+            # Waiting on an identical request in flight, see
+            # request-coalescing
+            flight, timeout = request.META.pop('BOUNCER_WAIT')
+            shared = await flight.wait_async(timeout)
+            if shared is not None:
+                response = await loop.run_in_executor(
+                    None,
+                    self.run_process_response,
+                    request,
+                    build_shared_response(shared),
+                )
+                await send_response(send, response)
+                return
+
+        # Held until the response is sent, so the session isn't closed under
+        # the request if the api changes meanwhile
+        client = self.clients.acquire(route.api)
+        try:
+            await self.proxy(route, request, data, send, client.session)
+        finally:
+            self.clients.release(client)
+            # Don't keep waiters of a failed or cancelled request waiting
+            abort_flight(request)
+
+    def get_route(self, host, path, method):
+        """Look up the route of a request, to be called in a thread"""
+        try:
+            return routing_table.get(host, path, method)
+        finally:
+            close_old_connections()
+
+    def process_request(self, environ):
+        """Run the bouncer middleware chain, to be called in a thread"""
+        close_old_connections()
+        try:
+            request = WSGIRequest(environ)
+            for middleware in self.middleware:
+                response = middleware.process_request(request)
+                if response is not None:
+                    return request, self.run_process_response(
+                        request,
+                        response,
+                    )
+            return request, None
+        finally:
+            # Requests are handed over to other threads from here on
+            deactivate()
+            close_old_connections()
+
+    def process_response(self, request, status, headers, content=None):
+        """
+        Run the bouncer middleware chain on the status and headers of an
+        upstream response, and its body if it was buffered, to be called
+        in a thread.
+
+        Returns the response to send instead if a middleware replaced it
+        or the body was buffered, or the status and headers to send with
+        the upstream body.
+        """
+        if content is None:
+            # Streamed, as the upstream body isn't read yet
+            shell = StreamingHttpResponse((), status=status)
+        else:
+            shell = HttpResponse(content, status=status)
+        del shell['Content-Type']
+        cookies = []
+        for name, value in headers:
+            name = name.decode('latin1')
+            if name.lower() != 'set-cookie':
+                shell[name] = value.decode('latin1')
+            elif content is None:
+                cookies.append((name.encode('latin1'), value))
+            else:
+                # Seen by plugins, which don't keep responses setting them
+                shell.cookies.load(value.decode('latin1'))
+
+        response = self.run_process_response(request, shell)
+        if response is not shell or content is not None:
+            return response, None, None
+        return None, response.status_code, [
+            (name.encode('latin1'), value.encode('latin1'))
+            for name, value in response.items()
+        ] + cookies
+
+    def run_process_response(self, request, response):
+        activate(request.META.get('BOUNCER_TRACE'))
+        try:
+            for middleware in reversed(self.middleware):
+                response = middleware.process_response(request, response)
+            return response
+        finally:
+            deactivate()
+
+    async def proxy(self, route, request, data, send, session):
+        """
+        Send a request to a target of its route and stream the response
+        back. Connection failures of idempotent requests are retried, on
+        the next available target, as long as the retry budget of the api
+        allows it.
+        """
+        api = route.api
+        retries = get_retries(api, request.method, data)
+        budget = retry_budgets.get(api)
+        budget.deposit()
+
+        attempt = 0
+        while True:
+            target = route.select_target(request)
+            if target is None:
+                await self.send_error(request, upstream_error(503), send)
+                return
+
+            start = time.perf_counter()
+            try:
+                try:
+                    resp = await self.request_upstream(
+                        route,
+                        request,
+                        data,
+                        target,
+                        session,
+                    )
+                except (
+                    aiohttp.ClientConnectorError,
+                    aiohttp.ServerDisconnectedError,
+                ):
+                    route.health.report(target, error=True)
+                    if attempt < retries and budget.withdraw():
+                        attempt += 1
+                        await asyncio.sleep(get_backoff(attempt))
+                        continue
+                    await self.send_error(request, upstream_error(502), send)
+                    return
+                except asyncio.TimeoutError as e:
+                    if not is_connect_timeout(e):
+                        route.health.report(target, timeout=True)
+                        await self.send_error(
+                            request,
+                            upstream_error(504),
+                            send,
+                        )
+                        return
+                    # No request was sent either, as for connection
+                    # failures
+                    route.health.report(target, timeout=True, error=True)
+                    if attempt < retries and budget.withdraw():
+                        attempt += 1
+                        await asyncio.sleep(get_backoff(attempt))
+                        continue
+                    await self.send_error(request, upstream_error(504), send)
+                    return
+                except aiohttp.ClientError:
+                    if getattr(data, 'too_large', False):
+                        # Chunked body over the request-size-limiting limit
+                        response = request_too_large()
+                        await self.send_error(request, response, send)
+                        return
+                    route.health.report(target, error=True)
+                    await self.send_error(request, upstream_error(502), send)
+                    return
+
+                end = time.perf_counter()
+                upstream_duration.observe(end - start, api.name, target)
+                trace = request.META.get('BOUNCER_TRACE')
+                if trace is not None:
+                    trace.add_span('upstream', start, end, {
+                        'bouncer.target': target,
+                        'http.status_code': resp.status,
+                    }, span_id=trace.upstream_span_id)
+                route.health.report(target, status=resp.status)
+                async with resp:
+                    await self.send_upstream(route, request, resp, send)
+                return
+            finally:
+                route.release_target(target)
+
+    async def send_error(self, request, response, send):
+        """Send an error response through the bouncer middleware chain"""
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            None,
+            self.run_process_response,
+            request,
+            response,
+        )
+        await send_response(send, response)
+
+    async def request_upstream(self, route, request, data, target, session):
+        """Send a request to a target, until its response headers arrive"""
+        # The url is sent as is, so the decoded path is quoted again, as
+        # requests does under WSGI
+        url = '{0}{1}'.format(
+            target or route.upstream_url,
+            quote(route.get_upstream_path(request.path), safe=PATH_SAFE),
+        )
+        if request.META.get('QUERY_STRING'):
+            url = '{0}?{1}'.format(url, quote(
+                request.META['QUERY_STRING'].encode('latin1'),
+                safe=QUERY_SAFE,
+            ))
+
+        headers = get_request_headers(request.META)
+        if data is not None and request.META.get('CONTENT_LENGTH'):
+            headers['CONTENT-LENGTH'] = request.META['CONTENT_LENGTH']
+
+        connect_timeout, read_timeout = route.api.get_timeout()
+        return await session.request(
+            request.method,
+            yarl.URL(url, encoded=True),
+            data=data,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout,
+                sock_read=read_timeout,
+            ),
+        )
+
+    async def send_upstream(self, route, request, resp, send):
+        """
+        Send an upstream response back to the client, streaming its body
+        unless plugins keep responses.
+        """
+        loop = asyncio.get_event_loop()
+        status = resp.status
+        headers = [
+            (name, value) for name, value in resp.raw_headers
+            if name.decode('latin1').lower() not in HOP_BY_HOP_HEADERS
+        ]
+        if needs_buffer(route) and not should_stream(
+            route.api,
+            resp.content_length,
+        ):
+            # Read whole, as the WSGI data plane does, so proxy-cache and
+            # request-coalescing can keep it
+            try:
+                content = await resp.read()
+            except asyncio.TimeoutError:
+                await self.send_error(request, upstream_error(504), send)
+                return
+            except aiohttp.ClientError:
+                await self.send_error(request, upstream_error(502), send)
+                return
+            response, _, _ = await loop.run_in_executor(
+                None,
+                self.process_response,
+                request,
+                status,
+                headers,
+                content,
+            )
+            await send_response(send, response)
+            return
+
+        if needs_response(route, request):
+            response, status, headers = await loop.run_in_executor(
+                None,
+                self.process_response,
+                request,
+                status,
+                headers,
+            )
+            if response is not None:
+                await send_response(send, response)
+                return
+        else:
+            # BouncerMiddleware.process_response is skipped along with the
+            # plugins, count the request here instead
+            record_request(request, route, status)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        # Set by response-compression, the body is compressed as it arrives
+        compressor = request.META.get('BOUNCER_COMPRESSOR')
+        chunk_size = get_setting('STREAM_CHUNK_SIZE')
+        async for chunk in resp.content.iter_chunked(chunk_size):
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            })
+        await send({
+            'type': 'http.response.body',
+            'body': compressor.finish() if compressor is not None else b'',
+        })
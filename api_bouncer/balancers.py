@@ -0,0 +1,242 @@
+import bisect
+import hashlib
+import heapq
+import itertools
+import struct
+import threading
+from urllib.parse import urlsplit
+
+from .plugins.ip_restriction import get_client_ip
+
+
+class Balancer(object):
+    """
+    Base class of load balancers.
+
+    Balancers are built with the routing table from the (target, weight)
+    pairs of an upstream, targets with a weight of 0 left out. select picks
+    the target of a request among those passing the available check, if
+    given, and release is called once the upstream response has been
+    received.
+    """
+    def __init__(self, targets):
+        self.targets = [
+            (target, weight) for target, weight in targets if weight > 0
+        ]
+
+    def __len__(self):
+        return len(self.targets)
+
+    def select(self, request, available=None):
+        raise NotImplementedError
+
+    def release(self, target):
+        pass
+
+
+class RoundRobinBalancer(Balancer):
+    """
+    Smooth weighted round robin.
+
+    Each target is due again 1 / weight after its last turn, as in stride
+    scheduling, and the target due first is picked. Targets get requests in
+    proportion to their weight, interleaved rather than in a row: weights
+    of 1, 3 and 2 give b, d, b, a, b, d. Due targets are kept in a heap, so
+    selections cost O(log n).
+    """
+    def __init__(self, targets):
+        super(RoundRobinBalancer, self).__init__(targets)
+        self._lock = threading.Lock()
+        # Turns taken by each target, turn n of a target being due at
+        # n / weight
+        self.turns = [0] * len(self.targets)
+        self.heap = [
+            (1 / weight, index)
+            for index, (_, weight) in enumerate(self.targets)
+        ]
+        heapq.heapify(self.heap)
+
+    def select(self, request, available=None):
+        if not self.heap:
+            return None
+        with self._lock:
+            # Unavailable targets lose their turn, so they don't get a burst
+            # of requests once available again
+            for _ in range(len(self.targets)):
+                index = self._next()
+                target = self.targets[index][0]
+                if available is None or available(target):
+                    return target
+        return None
+
+    def _next(self):
+        index = self.heap[0][1]
+        self.turns[index] += 1
+        heapq.heapreplace(self.heap, (
+            (self.turns[index] + 1) / self.targets[index][1],
+            index,
+        ))
+        return index
+
+
+class LeastConnectionsBalancer(Balancer):
+    """
+    Target with the fewest requests in flight, relative to its weight.
+
+    Loads are kept in a heap. Changing the load of a target pushes a new
+    entry for it and leaves the previous one stale, to be skipped when it
+    reaches the top, so selections and releases cost O(log n).
+    """
+    def __init__(self, targets):
+        super(LeastConnectionsBalancer, self).__init__(targets)
+        self._lock = threading.Lock()
+        self.index = {
+            target: index for index, (target, _) in enumerate(self.targets)
+        }
+        self.active = [0] * len(self.targets)
+        self.versions = [0] * len(self.targets)
+        self.sequence = itertools.count()
+        self.heap = []
+        for index in range(len(self.targets)):
+            self._push(index)
+
+    def select(self, request, available=None):
+        if not self.targets:
+            return None
+        with self._lock:
+            index = None
+            skipped = []
+            while self.heap:
+                entry = heapq.heappop(self.heap)
+                if entry[3] != self.versions[entry[2]]:
+                    continue
+                if available is None or available(self.targets[entry[2]][0]):
+                    index = entry[2]
+                    break
+                skipped.append(entry)
+            for entry in skipped:
+                heapq.heappush(self.heap, entry)
+            if index is None:
+                return None
+            self.active[index] += 1
+            self._push(index)
+        return self.targets[index][0]
+
+    def release(self, target):
+        index = self.index.get(target)
+        if index is None:
+            return
+        with self._lock:
+            self.active[index] = max(0, self.active[index] - 1)
+            self._push(index)
+
+    def _push(self, index):
+        self.versions[index] += 1
+        # Ties go to the target waiting the longest
+        heapq.heappush(self.heap, (
+            self.active[index] / self.targets[index][1],
+            next(self.sequence),
+            index,
+            self.versions[index],
+        ))
+        if len(self.heap) > 4 * len(self.targets) + 64:
+            self.heap = [
+                entry for entry in self.heap
+                if entry[3] == self.versions[entry[2]]
+            ]
+            heapq.heapify(self.heap)
+
+
+def hash_points(value, count):
+    """Points of a value on a hash ring, four per md5 digest"""
+    points = []
+    for replica in range((count + 3) // 4):
+        digest = hashlib.md5(
+            '{}-{}'.format(value, replica).encode('utf-8')
+        ).digest()
+        points.extend(struct.unpack('<4I', digest))
+    return points[:count]
+
+
+class ConsistentHashBalancer(Balancer):
+    """
+    Hash ring with points for each target in proportion to its weight, so
+    adding or removing a target only moves the keys of its share of the
+    ring. Keys are looked up with a binary search, in O(log n).
+    """
+    # Average number of points per target, bounding the ring size
+    points_per_target = 40
+
+    def __init__(self, targets, hash_on='consumer', hash_on_header=''):
+        super(ConsistentHashBalancer, self).__init__(targets)
+        self.hash_on = hash_on
+        self.hash_on_header = 'HTTP_{}'.format(
+            hash_on_header.upper().replace('-', '_')
+        )
+        total = sum(weight for _, weight in self.targets)
+        scale = self.points_per_target * len(self.targets) / (total or 1)
+        ring = sorted(
+            (point, target)
+            for target, weight in self.targets
+            for point in hash_points(target, max(1, round(weight * scale)))
+        )
+        self.points = [point for point, _ in ring]
+        self.ring = [target for _, target in ring]
+
+    def select(self, request, available=None):
+        if not self.ring:
+            return None
+        point = hash_points(self.get_key(request), 1)[0]
+        index = bisect.bisect(self.points, point) % len(self.points)
+        if available is None:
+            return self.ring[index]
+
+        # Walk the ring to the next available target
+        checked = set()
+        for offset in range(len(self.ring)):
+            target = self.ring[(index + offset) % len(self.ring)]
+            if target not in checked:
+                if available(target):
+                    return target
+                checked.add(target)
+                if len(checked) == len(self.targets):
+                    break
+        return None
+
+    def get_key(self, request):
+        """Consumer or header value requests are hashed on, or client ip"""
+        meta = request.META
+        if self.hash_on == 'consumer' and 'BOUNCER_CREDENTIAL' in meta:
+            return meta['BOUNCER_CONSUMER'].id
+        if self.hash_on == 'header' and meta.get(self.hash_on_header):
+            return meta[self.hash_on_header]
+        return get_client_ip(request)
+
+
+balancer_classes = {
+    'round-robin': RoundRobinBalancer,
+    'least-connections': LeastConnectionsBalancer,
+    'consistent-hash': ConsistentHashBalancer,
+}
+
+
+def build_balancer(upstream, upstream_url):
+    """
+    Balancer of an upstream, between the upstream_url of its api with the
+    host and port of each target.
+    """
+    url = urlsplit(upstream_url)
+    targets = [
+        (
+            '{}://{}{}'.format(url.scheme, target.target, url.path),
+            target.weight,
+        )
+        for target in upstream.targets.all()
+    ]
+    if upstream.algorithm == 'consistent-hash':
+        return ConsistentHashBalancer(
+            targets,
+            upstream.hash_on,
+            upstream.hash_on_header,
+        )
+    return balancer_classes[upstream.algorithm](targets)
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+from django.http import HttpResponse
+
+
+# Upstream response fanned out to the requests waiting on a flight
+SharedResponse = namedtuple('SharedResponse', ['status', 'headers', 'content'])
+
+
+def set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+class Flight(object):
+    """
+    Upstream request in flight, shared by identical requests.
+
+    Flights expire after the timeout of their waiters, so a leader that
+    never lands its flight doesn't hold its key any longer.
+    """
+    def __init__(self, timeout):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.response = None
+        self.expires_at = time.monotonic() + timeout
+        self._lock = threading.Lock()
+        self._futures = []
+
+    def wait(self, timeout):
+        """
+        Shared response once the flight lands, or None if it timed out or
+        its response couldn't be shared.
+        """
+        self.done.wait(timeout)
+        return self.response
+
+    async def wait_async(self, timeout):
+        """Same as wait, for event loops, without blocking a thread"""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                future.set_result(self.response)
+            else:
+                self._futures.append((loop, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def land(self, response):
+        with self._lock:
+            self.response = response
+            self.done.set()
+            futures, self._futures = self._futures, []
+        for loop, future in futures:
+            try:
+                loop.call_soon_threadsafe(set_result, future, response)
+            except RuntimeError:
+                # The loop of the waiter is closed
+                pass
+
+
+class Flights(object):
+    """
+    Registry of upstream requests in flight, keyed by request.
+
+    The first request of a key leads the flight and goes upstream, the
+    following ones join it as waiters until the leader lands it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def join(self, key, max_waiters, timeout):
+        """
+        Return the flight of a key and whether the caller leads it, or
+        (None, False) if the flight is already full.
+        """
+        now = time.monotonic()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.expires_at <= now:
+                # Expired flights are replaced, their waiters gave up on them
+                flight = self._flights[key] = Flight(timeout)
+                return flight, True
+            if flight.waiters >= max_waiters:
+                return None, False
+            flight.waiters += 1
+            return flight, False
+
+    def land(self, key, flight, response=None):
+        """Release the waiters of a flight with the response to share"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.land(response)
+
+    def __len__(self):
+        return len(self._flights)
+
+
+def abort_flight(request):
+    """
+    Release the waiters of a flight led by a request that failed before
+    its response went through request-coalescing, so they go upstream.
+    """
+    if 'BOUNCER_FLIGHT' in request.META:
+        key, flight = request.META.pop('BOUNCER_FLIGHT')
+        flights.land(key, flight)
+
+
+def share_response(response):
+    """Response as shared with waiters, or None if it can't be shared"""
+    if response.streaming or response.cookies:
+        return None
+    return SharedResponse(
+        status=response.status_code,
+        headers=tuple(response.items()),
+        content=response.content,
+    )
+
+
+def build_shared_response(shared):
+    response = HttpResponse(shared.content, status=shared.status)
+    del response['Content-Type']
+    for name, value in shared.headers:
+        response[name] = value
+    return response
+
+
+flights = Flights()
@@ -0,0 +1,83 @@
+import zlib
+
+
+# zlib window bits of each supported content coding, by preference
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+def parse_accept_encoding(value):
+    """Quality of each content coding of an Accept-Encoding header"""
+    qualities = {}
+    for item in value.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, param_value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Supported content coding the client prefers, gzip on ties, or None if
+    it accepts none of them.
+    """
+    qualities = parse_accept_encoding(accept_encoding or '')
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class Compressor(object):
+    """
+    Incremental compressor of a response body.
+
+    Every compressed chunk is flushed, so clients get data as soon as the
+    upstream sends it, at the cost of a few bytes per chunk.
+    """
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        self._compressobj = zlib.compressobj(
+            level,
+            zlib.DEFLATED,
+            ENCODINGS[encoding],
+        )
+
+    def compress(self, chunk):
+        if not chunk:
+            return b''
+        return (
+            self._compressobj.compress(chunk) +
+            self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self):
+        return self._compressobj.flush(zlib.Z_FINISH)
+
+    def stream(self, chunks):
+        """Compress an iterable of chunks, as they come"""
+        for chunk in chunks:
+            data = self.compress(chunk)
+            if data:
+                yield data
+        yield self.finish()
+
+
+def compress(content, encoding, level):
+    """Compress a whole body at once"""
+    compressobj = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    return compressobj.compress(content) + compressobj.flush()
@@ -0,0 +1,48 @@
+from django.conf import settings
+
+
+DEFAULTS = {
+    # Seconds before routes cached in the in-process routing table are
+    # reloaded from the database, so changes made by other processes are
+    # eventually seen. Changes made in the current process invalidate it
+    # right away.
+    'ROUTES_TTL': 30,
+    # Maximum number of hosts whose route is cached in the routing table.
+    'ROUTES_CACHE_SIZE': 10000,
+    # Maximum number of keep-alive connections kept per upstream host.
+    'UPSTREAM_POOL_SIZE': 10,
+    # Seconds an upstream client may stay unused before its connections
+    # are closed.
+    'UPSTREAM_IDLE_TIMEOUT': 60,
+    # Size in bytes of the chunks read from streamed request and response
+    # bodies.
+    'STREAM_CHUNK_SIZE': 65536,
+    # Maximum number of simultaneous connections per upstream host made by
+    # the ASGI data plane.
+    'ASYNC_UPSTREAM_LIMIT': 1000,
+    # Maximum number of api keys whose consumer is cached by key-auth.
+    'CREDENTIALS_CACHE_SIZE': 10000,
+    # Seconds a valid api key stays cached.
+    'CREDENTIALS_TTL': 60,
+    # Seconds an invalid api key stays cached.
+    'CREDENTIALS_NEGATIVE_TTL': 5,
+    # Maximum number of clients whose token buckets are kept in memory by
+    # the local rate-limiting policy.
+    'RATE_LIMITING_CACHE_SIZE': 100000,
+    # Alias of the Django cache holding counters of the shared
+    # rate-limiting policy. It must be shared by workers, e.g. memcached.
+    'RATE_LIMITING_CACHE': 'default',
+    # Seconds the first retry of a failed upstream request may wait for,
+    # doubled on each retry up to RETRY_BACKOFF_MAX. Actual waits are
+    # picked at random below those, so retries don't come in bursts.
+    'RETRY_BACKOFF': 0.05,
+    'RETRY_BACKOFF_MAX': 1,
+    # Retries always allowed to an api per 10 seconds, whatever its retry
+    # budget.
+    'RETRY_BUDGET_MIN_RETRIES': 10,
+}
+
+
+def get_setting(name):
+    """Return an API_BOUNCER setting, falling back to its default value"""
+    return getattr(settings, 'API_BOUNCER', {}).get(name, DEFAULTS[name])
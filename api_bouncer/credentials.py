@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import ValidationError
+
+from .cache import LRUCache
+from .conf import get_setting
+from .models import Consumer, ConsumerKey, hash_key
+
+
+# Read-only view of a consumer and its acl groups
+ConsumerRecord = namedtuple('ConsumerRecord', ['id', 'username', 'groups'])
+
+# Consumers by key digest, or None for keys found to be invalid
+credential_cache = LRUCache(
+    maxsize=get_setting('CREDENTIALS_CACHE_SIZE'),
+    ttl=get_setting('CREDENTIALS_TTL'),
+)
+
+_missing = object()
+
+
+def get_credential(key):
+    """Return the consumer record of a key, or None if the key is invalid"""
+    if not key:
+        return None
+
+    key_digest = hash_key(key)
+    credential = credential_cache.get(key_digest, _missing)
+    if credential is not _missing:
+        return credential
+
+    consumer_key = (
+        ConsumerKey.objects
+        .select_related('consumer')
+        .prefetch_related('consumer__acls')
+        .filter(key_digest=key_digest)
+        .first()
+    )
+    if consumer_key:
+        consumer = consumer_key.consumer
+        credential = ConsumerRecord(
+            id=consumer.id,
+            username=consumer.username,
+            groups=frozenset(acl.group for acl in consumer.acls.all()),
+        )
+        credential_cache.set(key_digest, credential)
+    else:
+        credential = None
+        credential_cache.set(
+            key_digest,
+            credential,
+            ttl=get_setting('CREDENTIALS_NEGATIVE_TTL'),
+        )
+
+    return credential
+
+
+def get_consumer(consumer_id):
+    """Return the consumer record of a consumer id, or None if unknown"""
+    if not consumer_id:
+        return None
+
+    try:
+        consumer = (
+            Consumer.objects
+            .filter(pk=consumer_id)
+            .annotate(groups=ArrayAgg('acl__group'))
+            .values_list('id', 'username', 'groups')
+            .first()
+        )
+    except (ValidationError, ValueError):
+        return None
+
+    if not consumer:
+        return None
+
+    consumer_id, username, groups = consumer
+    return ConsumerRecord(
+        id=consumer_id,
+        username=username,
+        groups=frozenset(group for group in groups if group is not None),
+    )
+
+
+def invalidate_consumer(consumer_id):
+    """Forget cached credentials of a consumer"""
+    credential_cache.discard(
+        lambda key, credential: (
+            credential is not None and credential.id == consumer_id
+        )
+    )
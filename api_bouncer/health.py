@@ -0,0 +1,205 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from .registry import ApiRegistry
+from .schemas import healthchecks_defaults
+
+
+def get_healthchecks(config):
+    """Merge the health checks config of an upstream with defaults"""
+    config = config or {}
+    return {
+        kind: dict(defaults, **config.get(kind, {}))
+        for kind, defaults in healthchecks_defaults.items()
+    }
+
+
+class TargetHealth(object):
+    __slots__ = (
+        'failures',
+        'timeouts',
+        'open_until',
+        'tripped',
+        'healthy',
+        'probe_successes',
+        'probe_failures',
+    )
+
+    def __init__(self):
+        # Consecutive failures and timeouts of proxied requests
+        self.failures = 0
+        self.timeouts = 0
+        # The circuit is open, failing requests fast, until open_until. Once
+        # it has tripped, the first failure after the cool-down reopens it.
+        self.open_until = 0
+        self.tripped = False
+        # Outcome of active probes
+        self.healthy = True
+        self.probe_successes = 0
+        self.probe_failures = 0
+
+
+class HealthChecker(object):
+    """
+    Health of the targets of an api.
+
+    Proxied requests report their outcome. Consecutive failures or timeouts
+    of a target trip its circuit breaker, so it doesn't get any request
+    until its cool-down is over. Active probes mark targets unhealthy after
+    consecutive failed probes, until enough probes succeed again.
+    """
+    def __init__(self, config):
+        self._lock = threading.Lock()
+        self.config = config
+        self.targets = {}
+        self.next_probe = 0
+
+    def set_targets(self, targets):
+        with self._lock:
+            self.targets = {
+                target: self.targets.get(target) or TargetHealth()
+                for target in targets
+            }
+
+    def is_available(self, target):
+        health = self.targets.get(target)
+        return health is None or (
+            (health.healthy or not self.config['active']['interval']) and
+            health.open_until <= time.monotonic()
+        )
+
+    def report(self, target, status=None, timeout=False, error=False):
+        """Record the outcome of a request proxied to a target"""
+        health = self.targets.get(target)
+        if health is None:
+            return
+        passive = self.config['passive']
+        failed = timeout or error or status in passive['http_statuses']
+
+        with self._lock:
+            if not failed:
+                health.failures = health.timeouts = 0
+                health.tripped = False
+                return
+
+            if timeout:
+                health.timeouts += 1
+            else:
+                health.failures += 1
+            if health.tripped or (
+                0 < passive['failures'] <= health.failures or
+                0 < passive['timeouts'] <= health.timeouts
+            ):
+                health.open_until = time.monotonic() + passive['cooldown']
+                health.failures = health.timeouts = 0
+                health.tripped = True
+
+    def record_probe(self, target, ok):
+        """Record the outcome of an active probe of a target"""
+        health = self.targets.get(target)
+        if health is None:
+            return
+        active = self.config['active']
+
+        with self._lock:
+            if ok:
+                health.probe_failures = 0
+                health.probe_successes += 1
+                if (
+                    not health.healthy and
+                    health.probe_successes >= active['successes']
+                ):
+                    health.healthy = True
+                    health.open_until = 0
+                    health.tripped = False
+            else:
+                health.probe_successes = 0
+                health.probe_failures += 1
+                if health.probe_failures >= active['failures']:
+                    health.healthy = False
+
+    def probe(self, session=requests):
+        """Probe every target once"""
+        active = self.config['active']
+        for target in list(self.targets):
+            url = urlsplit(target)
+            try:
+                resp = session.get(
+                    '{}://{}{}'.format(url.scheme, url.netloc, active['path']),
+                    timeout=active['timeout'] or None,
+                    allow_redirects=False,
+                )
+                resp.close()
+                ok = resp.status_code in active['healthy_statuses']
+            except requests.RequestException:
+                ok = False
+            self.record_probe(target, ok)
+
+    def get_status(self):
+        """Health of each target, as shown by the admin API"""
+        now = time.monotonic()
+        return [
+            {
+                'target': target,
+                'healthy': health.healthy,
+                'circuit': 'open' if health.open_until > now else 'closed',
+                'retry_in': max(0, round(health.open_until - now, 3)),
+                'failures': health.failures,
+                'timeouts': health.timeouts,
+            }
+            for target, health in sorted(self.targets.items())
+        ]
+
+
+def set_healthchecks(checker, api_id, config):
+    checker.config = config
+
+
+class HealthCheckers(ApiRegistry):
+    """
+    Health checkers, by api.
+
+    Checkers outlive the routes, which are rebuilt with the routing table,
+    so target health isn't forgotten. Apis with active health checks are
+    probed by a daemon thread, started once such an api is routed.
+    """
+    def __init__(self):
+        super(HealthCheckers, self).__init__(
+            lambda api_id, config: HealthChecker(config),
+            settings=lambda api_id, config: config,
+            update=set_healthchecks,
+        )
+        self._prober = None
+
+    def get(self, api_id, config):
+        checker = super(HealthCheckers, self).get(api_id, config)
+        if config['active']['interval']:
+            self.start_prober()
+        return checker
+
+    def start_prober(self):
+        with self._lock:
+            if self._prober is None:
+                self._prober = threading.Thread(
+                    target=self.run_prober,
+                    name='api-bouncer-health',
+                    daemon=True,
+                )
+                self._prober.start()
+
+    def run_prober(self):
+        session = requests.Session()
+        while True:
+            now = time.monotonic()
+            for checker in self.values():
+                interval = checker.config['active']['interval']
+                if interval and checker.next_probe <= now:
+                    checker.next_probe = now + interval
+                    checker.probe(session)
+            time.sleep(0.5)
+
+
+health_checkers = HealthCheckers()
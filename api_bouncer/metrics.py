@@ -0,0 +1,335 @@
+import threading
+import time
+
+
+# Histograms split each power of two microseconds in 16 buckets, so
+# recorded latencies are off by 6% at most
+SUB_BUCKET_BITS = 5
+# Latencies are capped to about 19 hours
+MAX_MICROSECONDS = 2 ** 36 - 1
+
+# Bounds in seconds of the buckets exported for request latencies, and
+# for latencies of the bouncer itself, e.g. plugins
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+OVERHEAD_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01,
+)
+
+
+def get_bucket(microseconds):
+    """
+    Index of the histogram bucket of a latency.
+
+    Values below 2 ** SUB_BUCKET_BITS each have their own bucket, then
+    every power of two is split in 2 ** (SUB_BUCKET_BITS - 1) buckets of
+    equal width, as in HdrHistogram.
+    """
+    shift = microseconds.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return microseconds
+    return (shift << (SUB_BUCKET_BITS - 1)) + (microseconds >> shift)
+
+
+def get_bucket_bounds(index):
+    """Lowest and highest latency, in microseconds, of a bucket"""
+    half = 1 << (SUB_BUCKET_BITS - 1)
+    if index < 2 * half:
+        return index, index
+    shift = index // half - 1
+    top = index - shift * half
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class HistogramData(object):
+    """Sparse counts of the latencies recorded by a thread for a series"""
+    __slots__ = ('buckets', 'count', 'sum')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        microseconds = min(int(seconds * 1e6), MAX_MICROSECONDS)
+        if microseconds < 0:
+            microseconds = 0
+        index = get_bucket(microseconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        for index, count in list(other.buckets.items()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+
+    def get_quantile(self, quantile):
+        """Latency in seconds below which `quantile` of them are"""
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return get_bucket_bounds(index)[1] / 1e6
+        return get_bucket_bounds(max(self.buckets))[1] / 1e6
+
+    def get_cumulative_counts(self, bounds):
+        """
+        Counts of latencies below each bound, in seconds. Buckets are
+        counted under the first bound above all of their latencies.
+        """
+        limits = [int(bound * 1e6) for bound in bounds]
+        counts = [0] * len(limits)
+        for index, count in self.buckets.items():
+            highest = get_bucket_bounds(index)[1]
+            for position, limit in enumerate(limits):
+                if highest <= limit:
+                    counts[position] += count
+                    break
+        for position in range(1, len(counts)):
+            counts[position] += counts[position - 1]
+        return counts
+
+
+class Metric(object):
+    """Metric of the registry, recording values of its series by labels"""
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels):
+        shard = self.registry.get_shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0) + 1
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels, buckets):
+        super(Histogram, self).__init__(registry, name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, seconds, *labels):
+        shard = self.registry.get_shard()
+        key = (self.name, labels)
+        data = shard.get(key)
+        if data is None:
+            data = shard[key] = HistogramData()
+        data.record(seconds)
+
+
+def escape_label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(name, escape_label(value)) for name, value in pairs
+    ))
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def merge_shard(into, shard):
+    """Add the series of a shard to another"""
+    # Copied at once, as threads keep adding series to their shard
+    for key, value in list(shard.items()):
+        if isinstance(value, HistogramData):
+            merged = into.get(key)
+            if merged is None:
+                merged = into[key] = HistogramData()
+            merged.merge(value)
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class Registry(object):
+    """
+    Per-process registry of metrics.
+
+    Each thread records into its own shard, a plain dict of series, so
+    recording takes no lock. Shards are merged when metrics are scraped,
+    and those of threads that exited are folded into a base shard, so
+    short lived threads don't pile up shards.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Shards by thread, and series of threads that exited
+        self._shards = {}
+        self._base = {}
+        self.metrics = {}
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(),
+                  buckets=LATENCY_BUCKETS):
+        return self.register(
+            Histogram(self, name, documentation, labels, buckets)
+        )
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def get_shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._fold_dead_shards()
+                self._shards[threading.current_thread()] = shard
+            return shard
+
+    def _fold_dead_shards(self):
+        # Threads that exited no longer write to their shard, it can be
+        # merged without racing them. Called with the lock held.
+        for thread in [
+            thread for thread in self._shards if not thread.is_alive()
+        ]:
+            merge_shard(self._base, self._shards.pop(thread))
+
+    def collect(self):
+        """Series of every metric, merged across threads"""
+        series = {}
+        with self._lock:
+            self._fold_dead_shards()
+            merge_shard(series, self._base)
+            shards = list(self._shards.values())
+
+        for shard in shards:
+            merge_shard(series, shard)
+        return series
+
+    def clear(self):
+        with self._lock:
+            self._base.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format"""
+        series = self.collect()
+        by_metric = {}
+        for (name, labels), value in series.items():
+            by_metric.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(self.metrics):
+            metric = self.metrics[name]
+            lines.append('# HELP {} {}'.format(name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(name, metric.kind))
+            for labels, value in sorted(
+                by_metric.get(name, ()),
+                key=lambda item: item[0],
+            ):
+                if metric.kind == 'counter':
+                    lines.append('{}{} {}'.format(
+                        name,
+                        format_labels(metric.labels, labels),
+                        format_value(value),
+                    ))
+                    continue
+
+                counts = value.get_cumulative_counts(metric.buckets)
+                for bound, count in zip(metric.buckets, counts):
+                    lines.append('{}_bucket{} {}'.format(
+                        name,
+                        format_labels(
+                            metric.labels,
+                            labels,
+                            [('le', format_value(float(bound)))],
+                        ),
+                        count,
+                    ))
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    format_labels(metric.labels, labels, [('le', '+Inf')]),
+                    value.count,
+                ))
+                lines.append('{}_sum{} {}'.format(
+                    name,
+                    format_labels(metric.labels, labels),
+                    format_value(value.sum),
+                ))
+                lines.append('{}_count{} {}'.format(
+                    name,
+                    format_labels(metric.labels, labels),
+                    value.count,
+                ))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requests_total = registry.counter(
+    'bouncer_requests_total',
+    'Requests bounced, by api, consumer and status class.',
+    ['api', 'consumer', 'status'],
+)
+request_duration = registry.histogram(
+    'bouncer_request_duration_seconds',
+    'Time spent on requests, from routing to the upstream response '
+    'headers.',
+    ['api', 'consumer'],
+)
+upstream_duration = registry.histogram(
+    'bouncer_upstream_duration_seconds',
+    'Time until upstream response headers, by api and target.',
+    ['api', 'upstream'],
+)
+routing_duration = registry.histogram(
+    'bouncer_routing_duration_seconds',
+    'Time spent looking up the route of requests.',
+    buckets=OVERHEAD_BUCKETS,
+)
+plugin_duration = registry.histogram(
+    'bouncer_plugin_duration_seconds',
+    'Time spent in plugins, by api, plugin and hook.',
+    ['api', 'plugin', 'hook'],
+    buckets=OVERHEAD_BUCKETS,
+)
+
+
+def get_consumer_label(request):
+    """Consumer authenticated by key-auth, without loading any other"""
+    meta = request.META
+    if 'BOUNCER_CREDENTIAL' in meta:
+        return meta['BOUNCER_CONSUMER'].username
+    return ''
+
+
+def record_request(request, route, status_code):
+    """Count a bounced request and time it since it was routed"""
+    api = route.api.name
+    consumer = get_consumer_label(request)
+    requests_total.inc(api, consumer, '{}xx'.format(status_code // 100))
+    start = request.META.get('BOUNCER_START')
+    if start is not None:
+        request_duration.observe(time.perf_counter() - start, api, consumer)
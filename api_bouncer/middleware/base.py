@@ -0,0 +1,78 @@
+import time
+
+from ..metrics import plugin_duration
+
+
+def run_plugin(route, plugin, hook, request, *args):
+    """
+    Run the process_request or process_response hook of a plugin, timing
+    it for metrics and, if the request is sampled, its trace.
+    """
+    start = time.perf_counter()
+    result = getattr(plugin, 'process_' + hook)(request, *args)
+    end = time.perf_counter()
+    plugin_duration.observe(end - start, route.api.name, plugin.name, hook)
+    trace = request.META.get('BOUNCER_TRACE')
+    if trace is not None:
+        trace.add_span(
+            'plugin.{}'.format(plugin.name),
+            start,
+            end,
+            {'bouncer.hook': hook},
+        )
+    return result
+
+
+class BaseMiddleware(object):
+    """
+    Base class of bouncer middleware.
+
+    Checks live in process_request, which returns a response to stop the
+    request or None to let it through, and process_response, which gets
+    the response either way, so they can also be run outside of Django's
+    middleware stack by the ASGI data plane.
+    """
+    def __init__(self, get_response=None):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+
+        return self.process_response(request, response)
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+
+class PluginMiddleware(BaseMiddleware):
+    """
+    Middleware running a single plugin of the api, if configured.
+
+    Kept for projects listing plugin middleware one by one in
+    settings.MIDDLEWARE, BouncerPipeline runs all of them at once.
+    """
+    plugin_name = None
+
+    def process_request(self, request):
+        route = request.META['BOUNCER_ROUTE']
+        for plugin in route.pipeline if route else ():
+            if plugin.name == self.plugin_name:
+                return run_plugin(route, plugin, 'request', request)
+
+    def process_response(self, request, response):
+        route = request.META.get('BOUNCER_ROUTE')
+        for plugin in route.pipeline if route else ():
+            if plugin.name == self.plugin_name:
+                response = run_plugin(
+                    route,
+                    plugin,
+                    'response',
+                    request,
+                    response,
+                )
+        return response
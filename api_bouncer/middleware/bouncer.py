@@ -1,31 +1,40 @@
-from ..models import Consumer, Plugin
+import time
 
+from django.utils.functional import SimpleLazyObject
 
-class BouncerMiddleware(object):
-    def __init__(self, get_response):
-        self.get_response = get_response
+from .base import BaseMiddleware
+from ..credentials import get_consumer
+from ..metrics import record_request, routing_duration
+from ..routing import routing_table
+from ..tracing import deactivate
 
-    def __call__(self, request):
+
+class BouncerMiddleware(BaseMiddleware):
+    def process_request(self, request):
         host = request.META.get('HTTP_HOST')
         consumer_id = request.META.get('HTTP_CONSUMER_ID')
 
-        # Attach plugins to request.META
-        plugin_values = (
-            Plugin.objects.filter(
-                api__hosts__contains=[host]
-            ).values('name', 'config')
-        )
-        plugins = {p['name']: p['config'] for p in plugin_values}
-        request.META['BOUNCER_PLUGINS'] = plugins
-
-        # Attach consumer to request
-        bouncer_consumer = (
-            Consumer.objects
-                    .prefetch_related('acls')
-                    .filter(pk=consumer_id)
-                    .first()
+        # Forget the trace of any previous request that failed in this
+        # thread
+        deactivate()
+
+        # Attach route and its plugins to request.META
+        start = time.perf_counter()
+        route = routing_table.get(host, request.path_info, request.method)
+        routed = time.perf_counter()
+        routing_duration.observe(routed - start)
+        request.META['BOUNCER_START'] = start
+        request.META['BOUNCER_ROUTED'] = routed
+        request.META['BOUNCER_ROUTE'] = route
+        request.META['BOUNCER_PLUGINS'] = route.plugins if route else {}
+
+        # Attach consumer to request, only loaded if a plugin needs it
+        request.META['BOUNCER_CONSUMER'] = SimpleLazyObject(
+            lambda: get_consumer(consumer_id)
         )
-        request.META['BOUNCER_CONSUMER'] = bouncer_consumer
-        response = self.get_response(request)
 
+    def process_response(self, request, response):
+        route = request.META.get('BOUNCER_ROUTE')
+        if route:
+            record_request(request, route, response.status_code)
         return response
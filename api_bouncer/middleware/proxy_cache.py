@@ -0,0 +1,5 @@
+from .base import PluginMiddleware
+
+
+class ProxyCacheMiddleware(PluginMiddleware):
+    plugin_name = 'proxy-cache'
@@ -0,0 +1,5 @@
+from .base import PluginMiddleware
+
+
+class RateLimitingMiddleware(PluginMiddleware):
+    plugin_name = 'rate-limiting'
@@ -0,0 +1,5 @@
+from .base import PluginMiddleware
+
+
+class RequestCoalescingMiddleware(PluginMiddleware):
+    plugin_name = 'request-coalescing'
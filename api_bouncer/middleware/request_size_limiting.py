@@ -0,0 +1,5 @@
+from .base import PluginMiddleware
+
+
+class RequestSizeLimitingMiddleware(PluginMiddleware):
+    plugin_name = 'request-size-limiting'
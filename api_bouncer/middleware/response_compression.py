@@ -0,0 +1,5 @@
+from .base import PluginMiddleware
+
+
+class ResponseCompressionMiddleware(PluginMiddleware):
+    plugin_name = 'response-compression'
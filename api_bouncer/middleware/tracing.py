@@ -0,0 +1,5 @@
+from .base import PluginMiddleware
+
+
+class TracingMiddleware(PluginMiddleware):
+    plugin_name = 'tracing'
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 09:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0002_consumer_acls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='api',
+            name='stream_response',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='api',
+            name='stream_threshold',
+            field=models.PositiveIntegerField(default=1048576),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:40
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+BATCH_SIZE = 1000
+
+
+def backfill_key_digests(apps, schema_editor):
+    ConsumerKey = apps.get_model('api_bouncer', 'ConsumerKey')
+    consumer_keys = ConsumerKey.objects.filter(key_digest__isnull=True)
+    # One UPDATE per batch of keys, rather than per key
+    while True:
+        batch = list(consumer_keys.values_list('pk', 'key')[:BATCH_SIZE])
+        if not batch:
+            break
+        ConsumerKey.objects.filter(pk__in=[pk for pk, key in batch]).update(
+            key_digest=Case(*[
+                When(pk=pk, then=Value(
+                    hashlib.sha256(key.encode('utf-8')).hexdigest()
+                ))
+                for pk, key in batch
+            ], output_field=models.CharField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0003_api_stream_response'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumerkey',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(
+            backfill_key_digests,
+            migrations.RunPython.noop,
+        ),
+    ]
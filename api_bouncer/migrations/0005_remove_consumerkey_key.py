@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:41
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0004_consumerkey_key_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='consumerkey',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='consumerkey',
+            unique_together=set([]),
+        ),
+        migrations.RemoveField(
+            model_name='consumerkey',
+            name='key',
+        ),
+    ]
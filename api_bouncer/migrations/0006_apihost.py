@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 13:02
+from __future__ import unicode_literals
+
+import uuid
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def normalize_host(host):
+    return host.lower().rstrip('.')
+
+
+def populate_api_hosts(apps, schema_editor):
+    # When several apis share a host, the oldest keeps it, as it was the
+    # one requests were routed to.
+    Api = apps.get_model('api_bouncer', 'Api')
+    ApiHost = apps.get_model('api_bouncer', 'ApiHost')
+    seen = set()
+    api_hosts = []
+    apis = Api.objects.order_by('created_at').values_list('pk', 'hosts')
+    for pk, hosts in apis.iterator():
+        for host in map(normalize_host, hosts):
+            if host not in seen:
+                seen.add(host)
+                api_hosts.append(ApiHost(api_id=pk, host=host))
+    ApiHost.objects.bulk_create(api_hosts, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0005_remove_consumerkey_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiHost',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('host', models.CharField(max_length=253, unique=True)),
+                ('api', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_hosts', to='api_bouncer.Api')),
+            ],
+        ),
+        migrations.RunPython(populate_api_hosts, migrations.RunPython.noop),
+    ]
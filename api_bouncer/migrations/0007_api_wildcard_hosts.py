@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 13:40
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0006_apihost'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='api',
+            name='hosts',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=200, validators=[django.core.validators.RegexValidator(regex='(?=^.{4,253}$)(^(\\*\\.)?((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\\.)+[a-zA-Z]{2,63}\\.?$|^((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\\.)+\\*$)')]), size=None, validators=[django.core.validators.MinLengthValidator(1, message='At least one is required')]),
+        ),
+    ]
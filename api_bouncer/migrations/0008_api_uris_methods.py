@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:25
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0007_api_wildcard_hosts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='api',
+            name='methods',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=16, validators=[django.core.validators.RegexValidator(regex='^[A-Z]+$')]), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='api',
+            name='strip_uri',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='api',
+            name='uris',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=200, validators=[django.core.validators.RegexValidator(message='Must start with /', regex='^/')]), blank=True, default=list, size=None),
+        ),
+        migrations.AlterField(
+            model_name='apihost',
+            name='host',
+            field=models.CharField(db_index=True, max_length=253),
+        ),
+        migrations.AlterUniqueTogether(
+            name='apihost',
+            unique_together=set([('host', 'api')]),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 15:02
+from __future__ import unicode_literals
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0008_api_uris_methods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upstream',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('algorithm', models.CharField(choices=[('round-robin', 'Round robin'), ('least-connections', 'Least connections'), ('consistent-hash', 'Consistent hash')], default='round-robin', max_length=32)),
+                ('hash_on', models.CharField(choices=[('consumer', 'Consumer'), ('header', 'Header')], default='consumer', max_length=32)),
+                ('hash_on_header', models.CharField(blank=True, max_length=200)),
+                ('api', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='upstream', to='api_bouncer.Api')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Target',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('target', models.CharField(max_length=260, validators=[django.core.validators.RegexValidator(message='Must be host:port', regex='^([a-zA-Z0-9.-]+|\\[[0-9a-fA-F:.]+\\]):[0-9]{1,5}$')])),
+                ('weight', models.PositiveIntegerField(default=100, validators=[django.core.validators.MaxValueValidator(1000)])),
+                ('upstream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='targets', to='api_bouncer.Upstream')),
+            ],
+            options={
+                'unique_together': set([('upstream', 'target')]),
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 17:20
+from __future__ import unicode_literals
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_bouncer', '0010_upstream_healthchecks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='api',
+            name='connect_timeout',
+            field=models.PositiveIntegerField(default=60000),
+        ),
+        migrations.AddField(
+            model_name='api',
+            name='read_timeout',
+            field=models.PositiveIntegerField(default=60000),
+        ),
+        migrations.AddField(
+            model_name='api',
+            name='retries',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+        migrations.AddField(
+            model_name='api',
+            name='retry_budget',
+            field=models.PositiveSmallIntegerField(default=20, validators=[django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
@@ -1,19 +1,37 @@
+import hashlib
 import uuid
 
 from django.contrib.postgres.fields import (
     ArrayField,
     JSONField,
 )
+from django.core.exceptions import ValidationError
 from django.core.validators import (
+    MaxValueValidator,
     MinLengthValidator,
     RegexValidator,
 )
-from django.db import models
+from django.db import models, transaction
 
 
-FQDN_REGEX = (
-    '(?=^.{4,253}$)(^((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\.)+[a-zA-Z]{2,63}\.?$)'
+# Hostnames, optionally with a wildcard as first or last label, as in
+# *.example.com or api.*
+HOST_REGEX = (
+    r'(?=^.{4,253}$)'
+    r'(^(\*\.)?((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\.)+[a-zA-Z]{2,63}\.?$|'
+    r'^((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\.)+\*$)'
 )
+# Upstream targets, as hostname, IPv4 or bracketed IPv6 address and port
+TARGET_REGEX = r'^([a-zA-Z0-9.-]+|\[[0-9a-fA-F:.]+\]):[0-9]{1,5}$'
+
+
+def normalize_host(host):
+    """Lower-case the host, dropping the port and any trailing dot"""
+    host = (host or '').lower()
+    domain, colon, port = host.rpartition(':')
+    if colon and ']' not in port:
+        host = domain
+    return host.rstrip('.')
 
 
 class Api(models.Model):
@@ -31,18 +49,195 @@ class Api(models.Model):
             blank=False,
             null=False,
             validators=[
-                RegexValidator(regex=FQDN_REGEX),
+                RegexValidator(regex=HOST_REGEX),
             ]
         ),
         validators=[
             MinLengthValidator(1, message='At least one is required'),
         ]
     )
+    # Path prefixes and methods routed to the api on its hosts, all of them
+    # if empty. The longest matching prefix wins.
+    uris = ArrayField(
+        models.CharField(
+            max_length=200,
+            validators=[
+                RegexValidator(regex='^/', message='Must start with /'),
+            ]
+        ),
+        blank=True,
+        default=list
+    )
+    methods = ArrayField(
+        models.CharField(
+            max_length=16,
+            validators=[
+                RegexValidator(regex='^[A-Z]+$'),
+            ]
+        ),
+        blank=True,
+        default=list
+    )
+    strip_uri = models.BooleanField(default=False)
     upstream_url = models.URLField(null=False)
+    stream_response = models.BooleanField(default=False)
+    stream_threshold = models.PositiveIntegerField(default=1048576)
+    # Milliseconds to wait for upstreams to accept a connection, and then
+    # between two reads of their response, 0 to wait forever
+    connect_timeout = models.PositiveIntegerField(default=60000)
+    read_timeout = models.PositiveIntegerField(default=60000)
+    # Times idempotent requests are retried on connection failures, as long
+    # as retries stay under retry_budget percent of the api requests
+    retries = models.PositiveSmallIntegerField(default=2)
+    retry_budget = models.PositiveSmallIntegerField(
+        default=20,
+        validators=[MaxValueValidator(100)]
+    )
 
     def __str__(self):
         return self.name
 
+    def get_timeout(self):
+        """Connect and read timeouts, in seconds"""
+        return (
+            self.connect_timeout / 1000 or None,
+            self.read_timeout / 1000 or None,
+        )
+
+    def clean(self):
+        if self.get_conflicting_hosts():
+            raise ValidationError({'hosts': 'Host already in use'})
+
+    def get_conflicting_hosts(self):
+        """Hosts where another api routes some of the same uris and methods"""
+        hosts = [normalize_host(host) for host in self.hosts or []]
+        uris = set(self.uris or [''])
+        methods = set(self.methods or [])
+
+        conflicts = set()
+        api_hosts = (
+            ApiHost.objects
+            .filter(host__in=hosts)
+            .exclude(api_id=self.pk)
+            .select_related('api')
+        )
+        for api_host in api_hosts:
+            other = api_host.api
+            other_methods = set(other.methods or [])
+            if (
+                not uris.isdisjoint(other.uris or ['']) and
+                (not methods or not other_methods or methods & other_methods)
+            ):
+                conflicts.add(api_host.host)
+        return conflicts
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super(Api, self).save(*args, **kwargs)
+            self.sync_hosts()
+
+    def sync_hosts(self):
+        """Make the ApiHost rows of the api match its hosts"""
+        hosts = set(normalize_host(host) for host in self.hosts)
+        self.api_hosts.exclude(host__in=hosts).delete()
+        hosts.difference_update(self.api_hosts.values_list('host', flat=True))
+        ApiHost.objects.bulk_create(
+            ApiHost(api=self, host=host) for host in hosts
+        )
+
+
+class ApiHost(models.Model):
+    """
+    Normalized host of an api, indexed so the apis of a request host are
+    found with a single lookup. Rows are kept in sync with Api.hosts when
+    the api is saved.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    host = models.CharField(max_length=253, db_index=True)
+    api = models.ForeignKey(
+        'Api',
+        related_name='api_hosts',
+        on_delete=models.CASCADE
+    )
+
+    class Meta:
+        unique_together = ('host', 'api')
+
+    def __str__(self):
+        return self.host
+
+
+class Upstream(models.Model):
+    """
+    Targets requests to an api are balanced between, instead of the host of
+    its upstream_url.
+    """
+    ALGORITHMS = (
+        ('round-robin', 'Round robin'),
+        ('least-connections', 'Least connections'),
+        ('consistent-hash', 'Consistent hash'),
+    )
+    HASH_ON = (
+        ('consumer', 'Consumer'),
+        ('header', 'Header'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    api = models.OneToOneField(
+        'Api',
+        related_name='upstream',
+        on_delete=models.CASCADE
+    )
+    algorithm = models.CharField(
+        max_length=32,
+        choices=ALGORITHMS,
+        default='round-robin'
+    )
+    # What consistent-hash hashes on, falling back to the client ip
+    hash_on = models.CharField(
+        max_length=32,
+        choices=HASH_ON,
+        default='consumer'
+    )
+    hash_on_header = models.CharField(max_length=200, blank=True)
+    # Passive and active health checks of the targets, see
+    # schemas.healthchecks
+    healthchecks = JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return str(self.api)
+
+
+class Target(models.Model):
+    """
+    Host and port of an upstream, replacing those of the api upstream_url.
+    Targets with a weight of 0 don't get any request.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    upstream = models.ForeignKey(
+        'Upstream',
+        related_name='targets',
+        on_delete=models.CASCADE
+    )
+    target = models.CharField(
+        max_length=260,
+        validators=[
+            RegexValidator(regex=TARGET_REGEX, message='Must be host:port'),
+        ]
+    )
+    weight = models.PositiveIntegerField(
+        default=100,
+        validators=[MaxValueValidator(1000)]
+    )
+
+    class Meta:
+        unique_together = ('upstream', 'target')
+
+    def __str__(self):
+        return self.target
+
 
 class Consumer(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -80,21 +275,26 @@ class ConsumerACL(models.Model):
         return '{}: {}'.format(self.consumer.name, self.group)
 
 
+def hash_key(key):
+    """Digest under which api keys are stored and looked up"""
+    return hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+
+
 class ConsumerKey(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     consumer = models.ForeignKey('Consumer', on_delete=models.CASCADE)
-    key = models.CharField(
-        max_length=200,
-        blank=False,
-        null=False,
-        validators=[
-            MinLengthValidator(8),
-        ]
-    )
+    key_digest = models.CharField(max_length=64, unique=True, editable=False)
 
-    class Meta:
-        unique_together = ('consumer', 'key')
+    @property
+    def key(self):
+        """Plaintext key, only known right after it's been set"""
+        return getattr(self, '_key', None)
+
+    @key.setter
+    def key(self, value):
+        self._key = value
+        self.key_digest = hash_key(value)
 
 
 class Plugin(models.Model):
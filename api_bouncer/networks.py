@@ -0,0 +1,46 @@
+import bisect
+import ipaddress
+
+
+class NetworkSet(object):
+    """
+    Set of IPv4 and IPv6 networks supporting fast address lookups.
+
+    Networks are merged into sorted, disjoint integer ranges once, so
+    checking whether an address belongs to any of them is a binary search
+    instead of a scan of every network.
+    """
+    def __init__(self, networks=()):
+        ranges = {4: [], 6: []}
+        for network in networks:
+            network = ipaddress.ip_network(network, strict=False)
+            ranges[network.version].append((
+                int(network.network_address),
+                int(network.broadcast_address),
+            ))
+
+        self._starts = {}
+        self._ends = {}
+        for version, version_ranges in ranges.items():
+            merged = []
+            for start, end in sorted(version_ranges):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    def __len__(self):
+        """Number of disjoint ranges the networks were merged into"""
+        return len(self._starts[4]) + len(self._starts[6])
+
+    def __contains__(self, address):
+        if not isinstance(address, (ipaddress.IPv4Address,
+                                    ipaddress.IPv6Address)):
+            address = ipaddress.ip_address(address)
+
+        value = int(address)
+        starts = self._starts[address.version]
+        index = bisect.bisect_right(starts, value) - 1
+        return index >= 0 and value <= self._ends[address.version][index]
@@ -0,0 +1,41 @@
+from .acl import ACLPlugin
+from .ip_restriction import IpRestrictionPlugin
+from .key_auth import KeyAuthPlugin
+from .proxy_cache import ProxyCachePlugin
+from .rate_limiting import RateLimitingPlugin
+from .request_coalescing import RequestCoalescingPlugin
+from .request_size_limiting import RequestSizeLimitingPlugin
+from .request_termination import RequestTerminationPlugin
+from .response_compression import ResponseCompressionPlugin
+from .tracing import TracingPlugin
+
+
+# Phases of the plugin pipeline, in the order they run
+PHASES = ('rewrite', 'access', 'auth', 'acl', 'proxy')
+
+plugin_classes = {
+    plugin_class.name: plugin_class
+    for plugin_class in [
+        ACLPlugin,
+        IpRestrictionPlugin,
+        KeyAuthPlugin,
+        ProxyCachePlugin,
+        RateLimitingPlugin,
+        RequestCoalescingPlugin,
+        RequestSizeLimitingPlugin,
+        RequestTerminationPlugin,
+        ResponseCompressionPlugin,
+        TracingPlugin,
+    ]
+}
+
+
+def compile_pipeline(plugins):
+    """Instantiate plugins from their configs, in the order they run"""
+    pipeline = [
+        plugin_classes[name](config)
+        for name, config in plugins.items()
+        if name in plugin_classes
+    ]
+    pipeline.sort(key=lambda p: (PHASES.index(p.phase), -p.priority))
+    return tuple(pipeline)
@@ -0,0 +1,28 @@
+from django.http import JsonResponse
+
+from .base import BasePlugin
+
+
+class ACLPlugin(BasePlugin):
+    name = 'acl'
+    phase = 'acl'
+
+    def __init__(self, config):
+        super(ACLPlugin, self).__init__(config)
+        self.whitelist = frozenset(config.get('whitelist') or [])
+        self.blacklist = frozenset(config.get('blacklist') or [])
+
+    def process_request(self, request):
+        consumer = request.META['BOUNCER_CONSUMER']
+
+        if not consumer:
+            return JsonResponse({'errors': 'Invalid consumer'}, status=403)
+
+        if not self.check_acl(consumer.groups):
+            return JsonResponse({'errors': 'Forbidden'}, status=403)
+
+    def check_acl(self, groups):
+        return bool(
+            self.whitelist and not self.whitelist.isdisjoint(groups) or
+            self.blacklist and self.blacklist.isdisjoint(groups)
+        )
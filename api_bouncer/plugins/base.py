@@ -0,0 +1,33 @@
+class BasePlugin(object):
+    """
+    Base class of plugins.
+
+    Plugins are instantiated with their config when the routing table is
+    built, so any work depending only on the config is done once per api.
+    process_request returns a response to stop the request, or None to let
+    it through to the next plugin. process_response gets the response
+    before it's sent, whether or not the request was stopped, and returns
+    the response to send.
+    """
+    # Name of the plugin, as in schemas.plugins
+    name = None
+    # Phase of the pipeline the plugin runs in, see PHASES
+    phase = None
+    # Plugins with higher priority run first within the same phase
+    priority = 0
+
+    def __init__(self, config):
+        self.config = config
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+    def needs_response(self, request):
+        """
+        Whether process_response acts on the response of a request, so the
+        ASGI data plane can skip it otherwise
+        """
+        return type(self).process_response is not BasePlugin.process_response
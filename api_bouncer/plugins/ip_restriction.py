@@ -0,0 +1,46 @@
+import ipaddress
+
+from django.http import JsonResponse
+
+from .base import BasePlugin
+from ..networks import NetworkSet
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0].strip()
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return ip
+
+
+class IpRestrictionPlugin(BasePlugin):
+    name = 'ip-restriction'
+    phase = 'access'
+    priority = 10
+
+    def __init__(self, config):
+        super(IpRestrictionPlugin, self).__init__(config)
+        self.whitelist = NetworkSet(config.get('whitelist') or [])
+        self.blacklist = NetworkSet(config.get('blacklist') or [])
+
+    def process_request(self, request):
+        consumer_id = request.META.get('HTTP_CONSUMER_ID')
+
+        if (
+            not self.config.get('consumer_id') or
+            self.config.get('consumer_id') == consumer_id
+        ):
+            client_ip = get_client_ip(request)
+            if not self.check_ip_address(client_ip):
+                return JsonResponse({'errors': 'Forbidden'}, status=403)
+
+    def check_ip_address(self, client_ip):
+        client_ip = ipaddress.ip_address(client_ip)
+        if client_ip in self.blacklist:
+            return False
+
+        if self.whitelist and client_ip not in self.whitelist:
+            return False
+        return True
@@ -0,0 +1,57 @@
+import json
+
+from django.http import JsonResponse
+from rest_framework import status
+
+from .base import BasePlugin
+from ..credentials import get_credential
+from ..models import hash_key
+
+
+class KeyAuthPlugin(BasePlugin):
+    name = 'key-auth'
+    phase = 'auth'
+
+    def process_request(self, request):
+        config = self.config
+        apikey = self.get_key_from_headers(
+            request,
+            config['key_names'],
+            key_in_body=config['key_in_body']
+        )
+        credential = get_credential(apikey)
+        if not credential:
+            return JsonResponse(
+                data={'error': 'Unauthorized'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        # Later plugins act on the authenticated consumer
+        request.META['BOUNCER_CONSUMER'] = credential
+        request.META['BOUNCER_CREDENTIAL'] = hash_key(apikey)
+        if not config['hide_credentials']:
+            request.META.update({
+                'HTTP_X_CONSUMER_USERNAME': credential.username,
+                'HTTP_X_CONSUMER_ID': str(credential.id),
+            })
+        # Remove apikey from headers
+        for k in config['key_names']:
+            request.META.pop('HTTP_{}'.format(k.upper()), None)
+
+    def get_key_from_headers(self, request, key_names, key_in_body=False):
+        if key_in_body:
+            try:
+                body = json.loads(request.body.decode('utf-8'))
+                for k in key_names:
+                    if k in body:
+                        return body[k]
+                return None
+            except json.JSONDecodeError:
+                return None
+
+        for n in key_names:
+            name = n.upper().replace('-', '_')
+            key_name = 'HTTP_{0}'.format(name)
+            if key_name in request.META:
+                return request.META[key_name]
+
+        return None
@@ -0,0 +1,188 @@
+import time
+from collections import namedtuple
+
+from django.http import HttpResponse, HttpResponseNotModified
+
+from .base import BasePlugin
+from ..response_cache import (
+    CachedResponse,
+    get_cache_key,
+    get_entry_header,
+    get_freshness,
+    has_credentials,
+    parse_cache_control,
+    response_caches,
+    UNCACHED_HEADERS,
+)
+
+
+# What proxy-cache did for a request: its X-Cache-Status, cache key, the
+# cache and stale entry, if any, and whether it's being revalidated
+CacheLookup = namedtuple(
+    'CacheLookup',
+    ['status', 'key', 'cache', 'entry', 'revalidating'],
+)
+
+
+class ProxyCachePlugin(BasePlugin):
+    name = 'proxy-cache'
+    phase = 'proxy'
+
+    def __init__(self, config):
+        super(ProxyCachePlugin, self).__init__(config)
+        self.methods = frozenset(
+            method.upper() for method in config['methods']
+        )
+        self.status_codes = frozenset(config['status_codes'])
+        self.vary_headers = sorted(
+            set(header.lower() for header in config['vary_headers'])
+        )
+
+    def process_request(self, request):
+        if request.method not in self.methods or self.bypass(request):
+            request.META['BOUNCER_CACHE'] = CacheLookup(
+                'Bypass', None, None, None, False
+            )
+            return None
+
+        api = request.META['BOUNCER_ROUTE'].api
+        cache = response_caches.get(api.pk, self.config)
+        key = get_cache_key(request, self.vary_headers)
+        entry = cache.get(key)
+        now = time.time()
+
+        if entry is not None and entry.expires_at > now:
+            request.META['BOUNCER_CACHE'] = CacheLookup(
+                'Hit', key, cache, entry, False
+            )
+            return self.get_cached_response(request, entry, now)
+
+        if (
+            entry is not None and
+            now - entry.expires_at > self.config['stale_ttl']
+        ):
+            entry = None
+
+        revalidating = entry is not None and self.revalidate(request, entry)
+        request.META['BOUNCER_CACHE'] = CacheLookup(
+            'Miss', key, cache, entry, revalidating
+        )
+
+    def process_response(self, request, response):
+        lookup = request.META.get('BOUNCER_CACHE')
+        if lookup is None:
+            return response
+        if lookup.status != 'Miss':
+            response['X-Cache-Status'] = lookup.status
+            return response
+
+        now = time.time()
+        entry = lookup.entry
+        if lookup.revalidating:
+            # Conditions were added for the upstream, not by the client
+            request.META.pop('HTTP_IF_NONE_MATCH', None)
+            request.META.pop('HTTP_IF_MODIFIED_SINCE', None)
+
+        if entry is not None:
+            if lookup.revalidating and response.status_code == 304:
+                ttl = get_freshness(response, self.config['ttl'], now)
+                entry = entry._replace(
+                    stored_at=now,
+                    expires_at=now + (ttl or 0),
+                )
+                self.store(lookup, entry)
+                response = self.get_cached_response(request, entry, now)
+                response['X-Cache-Status'] = 'Revalidated'
+                return response
+
+            if response.status_code >= 500:
+                response = self.get_cached_response(request, entry, now)
+                response['X-Cache-Status'] = 'Stale'
+                return response
+
+        if self.is_cacheable(request, response):
+            ttl = get_freshness(response, self.config['ttl'], now)
+            if ttl:
+                self.store(lookup, CachedResponse(
+                    status=response.status_code,
+                    headers=tuple(
+                        (name, value) for name, value in response.items()
+                        if name.lower() not in UNCACHED_HEADERS
+                    ),
+                    content=response.content,
+                    stored_at=now,
+                    expires_at=now + ttl,
+                ))
+
+        response['X-Cache-Status'] = 'Miss'
+        return response
+
+    def bypass(self, request):
+        """Whether the client asked not to be served from cache"""
+        directives = parse_cache_control(
+            request.META.get('HTTP_CACHE_CONTROL', '')
+        )
+        return 'no-cache' in directives or 'no-store' in directives
+
+    def revalidate(self, request, entry):
+        """
+        Make the upstream request conditional on the stale entry, unless the
+        client already made it conditional itself.
+        """
+        if (
+            'HTTP_IF_NONE_MATCH' in request.META or
+            'HTTP_IF_MODIFIED_SINCE' in request.META
+        ):
+            return False
+
+        etag = get_entry_header(entry, 'ETag')
+        last_modified = get_entry_header(entry, 'Last-Modified')
+        if etag:
+            request.META['HTTP_IF_NONE_MATCH'] = etag
+        if last_modified:
+            request.META['HTTP_IF_MODIFIED_SINCE'] = last_modified
+        return bool(etag or last_modified)
+
+    def is_cacheable(self, request, response):
+        if (
+            response.streaming or
+            response.status_code not in self.status_codes or
+            response.cookies
+        ):
+            return False
+
+        # Responses to requests with credentials may be personal, unless
+        # the upstream says otherwise
+        if has_credentials(request) and 'public' not in parse_cache_control(
+            response.get('Cache-Control', '')
+        ):
+            return False
+
+        # Responses varying on headers not in the key can't be shared
+        vary = response.get('Vary', '')
+        return not any(
+            header.strip().lower() not in self.vary_headers
+            for header in vary.split(',') if header.strip()
+        )
+
+    def store(self, lookup, entry):
+        timeout = entry.expires_at - entry.stored_at + self.config['stale_ttl']
+        lookup.cache.set(lookup.key, entry, timeout)
+
+    def get_cached_response(self, request, entry, now):
+        etag = get_entry_header(entry, 'ETag')
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if etag and if_none_match and (
+            if_none_match.strip() == '*' or
+            etag in [tag.strip() for tag in if_none_match.split(',')]
+        ):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        response = HttpResponse(entry.content, status=entry.status)
+        del response['Content-Type']
+        for name, value in entry.headers:
+            response[name] = value
+        response['Age'] = str(int(max(0, now - entry.stored_at)))
+        return response
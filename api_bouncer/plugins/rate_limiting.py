@@ -0,0 +1,62 @@
+from django.http import JsonResponse
+
+from .base import BasePlugin
+from .ip_restriction import get_client_ip
+from ..ratelimit import backends, PERIODS
+
+
+class RateLimitingPlugin(BasePlugin):
+    name = 'rate-limiting'
+    # Run once consumers are authenticated and allowed in
+    phase = 'acl'
+    priority = -10
+
+    def __init__(self, config):
+        super(RateLimitingPlugin, self).__init__(config)
+        self.backend = backends[config['policy']]
+        self.names = [name for name in PERIODS if config.get(name)]
+        self.limits = [(PERIODS[name], config[name]) for name in self.names]
+
+    def process_request(self, request):
+        api = request.META['BOUNCER_ROUTE'].api
+        key = '{}:{}'.format(api.pk, self.get_identifier(request))
+        result = self.backend.consume(key, self.limits)
+
+        if not self.config['hide_client_headers']:
+            headers = request.META.setdefault('BOUNCER_RATELIMIT_HEADERS', {})
+            for name, (period, limit), remaining in zip(
+                self.names,
+                self.limits,
+                result.remaining,
+            ):
+                name = name.capitalize()
+                headers['X-RateLimit-Limit-{}'.format(name)] = str(limit)
+                headers['X-RateLimit-Remaining-{}'.format(name)] = (
+                    str(remaining)
+                )
+
+        if not result.allowed:
+            response = JsonResponse(
+                {'message': 'API rate limit exceeded'},
+                status=429
+            )
+            response['Retry-After'] = str(result.retry_after)
+            return response
+
+    def process_response(self, request, response):
+        headers = request.META.get('BOUNCER_RATELIMIT_HEADERS', {})
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def get_identifier(self, request):
+        """
+        Credential or consumer authenticated by key-auth the limits apply
+        to, falling back to the client ip.
+        """
+        credential = request.META.get('BOUNCER_CREDENTIAL')
+        if credential and self.config['limit_by'] == 'credential':
+            return credential
+        if credential and self.config['limit_by'] == 'consumer':
+            return request.META['BOUNCER_CONSUMER'].id
+        return get_client_ip(request)
@@ -0,0 +1,55 @@
+from .base import BasePlugin
+from ..coalescing import build_shared_response, flights, share_response
+from ..response_cache import get_cache_key, has_credentials
+
+
+# Request headers upstream responses always depend on
+CONDITIONAL_HEADERS = ('if-modified-since', 'if-none-match', 'range')
+
+
+class RequestCoalescingPlugin(BasePlugin):
+    name = 'request-coalescing'
+    # Run right before the upstream request, after cache lookups
+    phase = 'proxy'
+    priority = -10
+
+    def __init__(self, config):
+        super(RequestCoalescingPlugin, self).__init__(config)
+        self.methods = frozenset(
+            method.upper() for method in config['methods']
+        )
+        self.vary_headers = sorted(
+            set(header.lower() for header in config['vary_headers']) |
+            set(CONDITIONAL_HEADERS)
+        )
+
+    def process_request(self, request):
+        # Responses to requests with credentials may be personal
+        if request.method not in self.methods or has_credentials(request):
+            return None
+
+        api = request.META['BOUNCER_ROUTE'].api
+        key = (api.pk, get_cache_key(request, self.vary_headers))
+        timeout = self.config['timeout']
+        flight, leader = flights.join(key, self.config['max_waiters'], timeout)
+        if leader:
+            request.META['BOUNCER_FLIGHT'] = (key, flight)
+            return None
+        if flight is None:
+            return None
+
+        if 'BOUNCER_ASYNC' in request.META:
+            # Awaited by the ASGI data plane, so waiters don't hold threads
+            request.META['BOUNCER_WAIT'] = (flight, timeout)
+            return None
+
+        # Timeouts and unshareable responses go upstream
+        shared = flight.wait(timeout)
+        if shared is not None:
+            return build_shared_response(shared)
+
+    def process_response(self, request, response):
+        if 'BOUNCER_FLIGHT' in request.META:
+            key, flight = request.META.pop('BOUNCER_FLIGHT')
+            flights.land(key, flight, share_response(response))
+        return response
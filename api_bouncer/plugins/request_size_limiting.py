@@ -0,0 +1,52 @@
+from django.http import JsonResponse
+from rest_framework import status
+
+from .base import BasePlugin
+from ..proxy import request_too_large, SizeLimitedStream
+
+
+# Bytes in each size_unit of allowed_payload_size
+SIZE_UNITS = {
+    'bytes': 1,
+    'kilobytes': 1024,
+    'megabytes': 1024 * 1024,
+}
+
+
+def get_size_limit(config):
+    """Maximum size in bytes of request bodies"""
+    return config['allowed_payload_size'] * SIZE_UNITS[config['size_unit']]
+
+
+class RequestSizeLimitingPlugin(BasePlugin):
+    name = 'request-size-limiting'
+    # Run before anything reads the body, e.g. key-auth with key_in_body
+    phase = 'access'
+    priority = 30
+
+    def __init__(self, config):
+        super(RequestSizeLimitingPlugin, self).__init__(config)
+        self.limit = get_size_limit(config)
+
+    def process_request(self, request):
+        meta = request.META
+        if 'chunked' in meta.get('HTTP_TRANSFER_ENCODING', '').lower():
+            if self.config['require_content_length']:
+                return JsonResponse(
+                    data={'message': 'A valid Content-Length is required'},
+                    status=status.HTTP_411_LENGTH_REQUIRED
+                )
+            # The size of chunked bodies is only known once they are read,
+            # they are counted while being sent upstream
+            meta['wsgi.input'] = SizeLimitedStream(
+                meta['wsgi.input'],
+                self.limit
+            )
+            return None
+
+        try:
+            length = int(meta.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > self.limit:
+            return request_too_large()
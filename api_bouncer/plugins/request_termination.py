@@ -0,0 +1,21 @@
+from django.http import JsonResponse
+
+from .base import BasePlugin
+
+
+class RequestTerminationPlugin(BasePlugin):
+    name = 'request-termination'
+    phase = 'access'
+    priority = 20
+
+    def process_request(self, request):
+        consumer_id = request.META.get('HTTP_CONSUMER_ID')
+
+        if (
+            not self.config.get('consumer_id') or
+            self.config.get('consumer_id') == consumer_id
+        ):
+            return JsonResponse(
+                {'message': self.config['message']},
+                status=self.config['status_code']
+            )
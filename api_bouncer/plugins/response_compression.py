@@ -0,0 +1,86 @@
+from django.utils.cache import patch_vary_headers
+
+from .base import BasePlugin
+from ..compression import compress, Compressor, negotiate_encoding
+
+
+class ResponseCompressionPlugin(BasePlugin):
+    name = 'response-compression'
+    # Run first, so responses are compressed after every other plugin saw
+    # them, e.g. proxy-cache keeps uncompressed bodies
+    phase = 'proxy'
+    priority = 10
+
+    def __init__(self, config):
+        super(ResponseCompressionPlugin, self).__init__(config)
+        content_types = set(
+            content_type.lower() for content_type in config['content_types']
+        )
+        self.content_types = frozenset(
+            content_type for content_type in content_types
+            if not content_type.endswith('/*')
+        )
+        self.type_prefixes = tuple(
+            content_type[:-1] for content_type in content_types
+            if content_type.endswith('/*')
+        )
+
+    def process_response(self, request, response):
+        if not self.is_compressible(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        level = self.config['level']
+        if response.streaming:
+            compressor = Compressor(encoding, level)
+            response.streaming_content = compressor.stream(
+                response.streaming_content
+            )
+            # The ASGI data plane streams upstream bodies by itself
+            request.META['BOUNCER_COMPRESSOR'] = compressor
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            content = compress(response.content, encoding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # Compressed bodies aren't byte for byte the same as upstream ones
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def is_compressible(self, request, response):
+        if (
+            request.method == 'HEAD' or
+            response.status_code < 200 or
+            response.status_code in (204, 206, 304) or
+            response.has_header('Content-Encoding') or
+            'no-transform' in response.get('Cache-Control', '').lower()
+        ):
+            return False
+
+        content_type = response.get('Content-Type', '')
+        content_type = content_type.split(';', 1)[0].strip().lower()
+        if not (
+            content_type in self.content_types or
+            content_type.startswith(self.type_prefixes)
+        ):
+            return False
+
+        if response.streaming:
+            try:
+                length = int(response.get('Content-Length', ''))
+            except ValueError:
+                return True
+        else:
+            length = len(response.content)
+        return length >= self.config['min_size']
@@ -0,0 +1,60 @@
+import random
+
+from .base import BasePlugin
+from ..tracing import activate, deactivate, exporters, parse_traceparent, Trace
+
+
+class TracingPlugin(BasePlugin):
+    name = 'tracing'
+    # Run first, so spans cover every other plugin
+    phase = 'rewrite'
+
+    def __init__(self, config):
+        super(TracingPlugin, self).__init__(config)
+        self.exporter = exporters.get(config)
+
+    def process_request(self, request):
+        meta = request.META
+        parent = None
+        if 'HTTP_TRACEPARENT' in meta:
+            parent = parse_traceparent(meta['HTTP_TRACEPARENT'])
+
+        # Requests of a sampled client trace are always sampled, and those
+        # of an unsampled one never are
+        if parent is not None:
+            sampled = parent[2]
+        else:
+            sampled = random.random() < self.config['sample_rate']
+        if not sampled:
+            return None
+
+        start = meta.get('BOUNCER_START')
+        trace = Trace(
+            self.exporter,
+            trace_id=parent and parent[0],
+            parent_id=parent and parent[1],
+            start=start,
+        )
+        if start is not None and 'BOUNCER_ROUTED' in meta:
+            trace.add_span('bouncer.routing', start, meta['BOUNCER_ROUTED'])
+        meta['BOUNCER_TRACE'] = trace
+        meta['HTTP_TRACEPARENT'] = trace.get_traceparent()
+        activate(trace)
+
+    def needs_response(self, request):
+        # Only traces of sampled requests are finished
+        return 'BOUNCER_TRACE' in request.META
+
+    def process_response(self, request, response):
+        trace = request.META.get('BOUNCER_TRACE')
+        if trace is None:
+            return response
+
+        deactivate()
+        trace.finish({
+            'http.method': request.method,
+            'http.target': request.get_full_path(),
+            'http.status_code': response.status_code,
+            'bouncer.api': request.META['BOUNCER_ROUTE'].api.name,
+        })
+        return response
@@ -0,0 +1,204 @@
+import re
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+
+from .conf import get_setting
+
+
+# Headers meaningful only for a single transport-level connection
+HOP_BY_HOP_HEADERS = frozenset([
+    'connection',
+    'keep-alive',
+    'proxy-authenticate',
+    'proxy-authorization',
+    'te',
+    'trailers',
+    'transfer-encoding',
+    'upgrade',
+])
+
+# Messages of responses sent when the upstream couldn't respond
+UPSTREAM_ERRORS = {
+    502: 'Upstream connection failed',
+    503: 'No healthy upstream',
+    504: 'Upstream timed out',
+}
+
+
+class RequestBody(object):
+    """
+    File-like view of a client body of known length.
+
+    requests takes the Content-Length from `len` and http.client reads the
+    body in blocks as it sends it, so it's never held in memory.
+    """
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.len = length
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+class BodyTooLarge(Exception):
+    """Raised once a client body gets larger than its size limit"""
+
+
+class SizeLimitedStream(object):
+    """
+    Stream of a client body of unknown length, raising BodyTooLarge once
+    more than `limit` bytes were read from it.
+    """
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.size += len(chunk)
+        if self.size > self.limit:
+            raise BodyTooLarge()
+        return chunk
+
+    def readline(self, size=-1):
+        line = self.stream.readline(size)
+        self.size += len(line)
+        if self.size > self.limit:
+            raise BodyTooLarge()
+        return line
+
+
+def iter_request_body(stream, chunk_size):
+    """Yield a client body of unknown length, sent upstream as chunked"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def get_request_body(request):
+    """Raw client body to send upstream, without parsing it"""
+    meta = request.META
+    try:
+        length = int(meta.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+
+    if length > 0:
+        return RequestBody(request, length)
+
+    if 'chunked' in meta.get('HTTP_TRANSFER_ENCODING', '').lower():
+        # Django limits request.read() to CONTENT_LENGTH, read the
+        # (already de-chunked) body straight from the server instead
+        return iter_request_body(
+            meta['wsgi.input'],
+            get_setting('STREAM_CHUNK_SIZE'),
+        )
+
+    return None
+
+
+def get_request_headers(meta):
+    """Get end-to-end headers of the client request that have a value"""
+    regex = re.compile(r'^HTTP_')
+    headers = {
+        (regex.sub('', k)).replace('_', '-'): v
+        for k, v in meta.items()
+        if k.startswith('HTTP_') and v
+    }
+    headers = {
+        k: v for k, v in headers.items()
+        if k.lower() not in HOP_BY_HOP_HEADERS
+    }
+    if meta.get('CONTENT_TYPE'):
+        headers['CONTENT-TYPE'] = meta['CONTENT_TYPE']
+    return headers
+
+
+def get_content_length(headers):
+    try:
+        return int(headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def iter_upstream(resp, chunk_size):
+    """Yield the upstream body as it arrives, undecoded"""
+    try:
+        for chunk in resp.raw.stream(chunk_size, decode_content=False):
+            yield chunk
+    finally:
+        resp.close()
+
+
+def read_upstream(resp):
+    """Read the whole upstream body, undecoded"""
+    try:
+        return resp.raw.read(decode_content=False)
+    finally:
+        resp.close()
+
+
+def copy_headers(resp, response):
+    """Copy end-to-end headers from the upstream response"""
+    for name, value in resp.headers.items():
+        lower_name = name.lower()
+        if lower_name in HOP_BY_HOP_HEADERS or lower_name == 'set-cookie':
+            continue
+        response[name] = value
+
+    for cookie in resp.raw.headers.getlist('Set-Cookie'):
+        response.cookies.load(cookie)
+
+
+def should_stream(api, length):
+    """
+    Whether upstream bodies of `length` bytes, None if unknown, are streamed
+    to the client rather than buffered.
+
+    Bodies are streamed when the api has stream_response enabled and the
+    upstream body is larger than stream_threshold, or of unknown length.
+    """
+    return api.stream_response and (
+        length is None or length > api.stream_threshold
+    )
+
+
+def build_response(api, resp):
+    """Wrap an upstream response sent with stream=True"""
+    content_type = resp.headers.get('content-type', 'text/html')
+    length = get_content_length(resp.headers)
+
+    if should_stream(api, length):
+        response = StreamingHttpResponse(
+            iter_upstream(resp, get_setting('STREAM_CHUNK_SIZE')),
+            content_type=content_type,
+            status=resp.status_code,
+        )
+    else:
+        response = HttpResponse(
+            content=read_upstream(resp),
+            content_type=content_type,
+            status=resp.status_code,
+        )
+
+    copy_headers(resp, response)
+    return response
+
+
+def request_too_large():
+    """Response sent instead of proxying a body over its size limit"""
+    return JsonResponse(
+        data={'message': 'Request size limit exceeded'},
+        status=413,
+    )
+
+
+def upstream_error(status_code):
+    """Response sent instead of an upstream response that couldn't be had"""
+    return JsonResponse(
+        data={'message': UPSTREAM_ERRORS[status_code]},
+        status=status_code,
+    )
@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+from django.core.cache import caches
+
+from .conf import get_setting
+
+
+# Seconds in each period a limit can be set for
+PERIODS = OrderedDict([('second', 1), ('minute', 60), ('hour', 3600)])
+
+# Outcome of a request: whether it's allowed, what's left of each limit and
+# the seconds to wait before trying again when it isn't allowed
+RateLimitResult = namedtuple(
+    'RateLimitResult',
+    ['allowed', 'remaining', 'retry_after'],
+)
+
+
+class LocalBackend(object):
+    """
+    Token buckets kept in the memory of the process, refilled continuously
+    at limit / period tokens per second.
+
+    Up to maxsize keys are tracked, the least recently used ones being
+    forgotten first, which only gives them a full bucket again.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def consume(self, key, limits):
+        """Take a token from each (period, limit) bucket of key"""
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._buckets.get(key)
+            if buckets is None:
+                buckets = self._buckets[key] = {}
+            else:
+                self._buckets.move_to_end(key)
+
+            tokens = []
+            for period, limit in limits:
+                bucket = buckets.get(period)
+                if bucket is None:
+                    bucket = buckets[period] = [limit, now]
+                else:
+                    refill = (now - bucket[1]) * limit / period
+                    bucket[0] = min(limit, bucket[0] + refill)
+                    bucket[1] = now
+                tokens.append(bucket[0])
+
+            allowed = all(available >= 1 for available in tokens)
+            if allowed:
+                for period, limit in limits:
+                    buckets[period][0] -= 1
+
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return RateLimitResult(
+                allowed=True,
+                remaining=[int(available - 1) for available in tokens],
+                retry_after=0,
+            )
+
+        retry_after = max(
+            (1 - available) * period / limit
+            for (period, limit), available in zip(limits, tokens)
+            if available < 1
+        )
+        return RateLimitResult(
+            allowed=False,
+            remaining=[int(available) for available in tokens],
+            retry_after=int(math.ceil(retry_after)),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedBackend(object):
+    """
+    Fixed window counters kept in a Django cache, so workers sharing it,
+    e.g. through memcached or redis on the same host, share their limits.
+    """
+    def __init__(self, alias):
+        self.alias = alias
+
+    def consume(self, key, limits):
+        """Count a request in the current window of each (period, limit)"""
+        cache = caches[self.alias]
+        now = time.time()
+        keys = [
+            'bouncer:rl:{}:{}:{}'.format(key, period, int(now // period))
+            for period, limit in limits
+        ]
+
+        counts = cache.get_many(keys)
+        used = [counts.get(cache_key, 0) for cache_key in keys]
+        allowed = all(
+            count < limit for count, (period, limit) in zip(used, limits)
+        )
+        if not allowed:
+            retry_after = max(
+                period - now % period
+                for count, (period, limit) in zip(used, limits)
+                if count >= limit
+            )
+            return RateLimitResult(
+                allowed=False,
+                remaining=[
+                    max(0, limit - count)
+                    for count, (period, limit) in zip(used, limits)
+                ],
+                retry_after=int(math.ceil(retry_after)),
+            )
+
+        remaining = []
+        for cache_key, (period, limit) in zip(keys, limits):
+            cache.add(cache_key, 0, timeout=period + 1)
+            try:
+                count = cache.incr(cache_key)
+            except ValueError:
+                # Expired between add and incr
+                cache.add(cache_key, 1, timeout=period + 1)
+                count = 1
+            remaining.append(max(0, limit - count))
+
+        return RateLimitResult(
+            allowed=True,
+            remaining=remaining,
+            retry_after=0,
+        )
+
+
+backends = {
+    'local': LocalBackend(maxsize=get_setting('RATE_LIMITING_CACHE_SIZE')),
+    'shared': SharedBackend(alias=get_setting('RATE_LIMITING_CACHE')),
+}
@@ -0,0 +1,83 @@
+import threading
+
+
+def get_api_key(api, *args):
+    """Registry key of an api, given as an instance or its primary key"""
+    return getattr(api, 'pk', api)
+
+
+class ApiRegistry(object):
+    """
+    Per-process registry of objects kept per api, e.g. upstream clients or
+    health checkers, outliving the routes rebuilt with the routing table.
+
+    get(*args) returns the object of key(*args), the api by default, built
+    with factory(*args) on first use. When settings(*args) differ from
+    those it was built with, the object is changed in place by
+    update(object, *args), if given, or replaced by a new one. Replaced and
+    discarded objects are passed to close, if given.
+    """
+    def __init__(self, factory, key=get_api_key, settings=None, update=None,
+                 close=None):
+        self.factory = factory
+        self.key = key
+        self.settings = settings
+        self.update = update
+        self._close = close
+        self._lock = threading.Lock()
+        # (settings, object) pairs by key
+        self._entries = {}
+
+    def get(self, *args):
+        key = self.key(*args)
+        settings = self.settings(*args) if self.settings else None
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == settings:
+            return entry[1]
+
+        replaced = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = (settings, self.factory(*args))
+            elif entry[0] != settings:
+                if self.update is not None:
+                    self.update(entry[1], *args)
+                    entry = (settings, entry[1])
+                else:
+                    replaced = entry[1]
+                    entry = (settings, self.factory(*args))
+            self._entries[key] = entry
+        if replaced is not None and self._close is not None:
+            self._close(replaced)
+        return entry[1]
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None and self._close is not None:
+            self._close(entry[1])
+
+    def discard_if(self, predicate):
+        """Drop, and close, the objects for which predicate(key, obj) holds"""
+        with self._lock:
+            discarded = [
+                self._entries.pop(key)[1]
+                for key, (_, obj) in list(self._entries.items())
+                if predicate(key, obj)
+            ]
+        if self._close is not None:
+            for obj in discarded:
+                self._close(obj)
+
+    def clear(self):
+        self.discard_if(lambda key, obj: True)
+
+    def values(self):
+        return [obj for _, obj in list(self._entries.values())]
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,167 @@
+import hashlib
+import os
+from collections import namedtuple
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.http import parse_http_date_safe
+
+from .cache import SizedLRUCache
+from .models import normalize_host
+from .proxy import HOP_BY_HOP_HEADERS
+from .registry import ApiRegistry
+
+
+# Upstream response kept by proxy-cache. Times are wall clock timestamps,
+# as entries may be shared with other processes through the disk tier.
+CachedResponse = namedtuple(
+    'CachedResponse',
+    ['status', 'headers', 'content', 'stored_at', 'expires_at'],
+)
+
+# Headers of responses that aren't stored with them
+UNCACHED_HEADERS = HOP_BY_HOP_HEADERS | frozenset(['age', 'x-cache-status'])
+
+
+def parse_cache_control(value):
+    """Map Cache-Control directives to their argument, if any"""
+    directives = {}
+    for directive in value.split(','):
+        name, _, argument = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"')
+    return directives
+
+
+def get_freshness(response, default_ttl, now):
+    """
+    Seconds a response may be served from cache, or None if it mustn't be
+    stored at all. Only responses with a lifetime, or marked public, are.
+    """
+    directives = parse_cache_control(response.get('Cache-Control', ''))
+    if directives.keys() & {'no-store', 'no-cache', 'private'}:
+        return None
+
+    for directive in ('s-maxage', 'max-age'):
+        if directive in directives:
+            try:
+                return max(0, int(directives[directive]))
+            except ValueError:
+                return None
+
+    if response.has_header('Expires'):
+        # Invalid dates mean the response has already expired
+        expires = parse_http_date_safe(response['Expires'])
+        return max(0, expires - now) if expires else 0
+
+    if 'public' in directives:
+        return default_ttl
+    return None
+
+
+def has_credentials(request):
+    """Whether a request carries credentials the bouncer doesn't check"""
+    return bool(
+        request.META.get('HTTP_AUTHORIZATION') or
+        request.META.get('HTTP_COOKIE')
+    )
+
+
+def get_cache_key(request, vary_headers):
+    """
+    Digest of the request method, host, path, query, consumer and vary
+    headers
+    """
+    parts = [
+        request.method,
+        normalize_host(request.META.get('HTTP_HOST')),
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        # Set by auth plugins, upstream responses may depend on it
+        request.META.get('HTTP_X_CONSUMER_ID', ''),
+    ]
+    for header in vary_headers:
+        name = 'HTTP_{}'.format(header.upper().replace('-', '_'))
+        parts.append(request.META.get(name, ''))
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_entry_size(entry):
+    """Approximate memory used by an entry, in bytes"""
+    return 200 + len(entry.content) + sum(
+        len(name) + len(value) for name, value in entry.headers
+    )
+
+
+def get_entry_header(entry, name):
+    name = name.lower()
+    for header, value in entry.headers:
+        if header.lower() == name:
+            return value
+    return None
+
+
+class ResponseCache(object):
+    """
+    Cached responses of an api, in a memory tier of up to memory_size
+    bytes and, optionally, a disk tier.
+    """
+    def __init__(self, memory_size, disk=None):
+        self.memory = SizedLRUCache(memory_size)
+        self.disk = disk
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry, get_entry_size(entry))
+        return entry
+
+    def set(self, key, entry, timeout):
+        self.memory.set(key, entry, get_entry_size(entry))
+        if self.disk is not None:
+            self.disk.set(key, entry, timeout)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+def build_response_cache(api_id, config):
+    return ResponseCache(
+        config['memory_size'],
+        build_disk_cache(api_id, config),
+    )
+
+
+def build_disk_cache(api_id, config):
+    if not config['disk_path']:
+        return None
+    return FileBasedCache(
+        os.path.join(config['disk_path'], str(api_id)),
+        {
+            'TIMEOUT': None,
+            'OPTIONS': {'MAX_ENTRIES': config['disk_entries']},
+        },
+    )
+
+
+def resize_response_cache(cache, api_id, config):
+    cache.memory.resize(config['memory_size'])
+    cache.disk = build_disk_cache(api_id, config)
+
+
+# Response caches, by api. Caches outlive the plugins, which are rebuilt
+# with the routing table, and follow changes of their memory budget and
+# disk settings.
+response_caches = ApiRegistry(
+    build_response_cache,
+    settings=lambda api_id, config: (
+        config['memory_size'],
+        config['disk_path'],
+        config['disk_entries'],
+    ),
+    update=resize_response_cache,
+    close=ResponseCache.clear,
+)
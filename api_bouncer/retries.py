@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+from .conf import get_setting
+from .registry import ApiRegistry
+
+
+# Methods whose requests may be sent again without changing their effect
+IDEMPOTENT_METHODS = frozenset([
+    'DELETE',
+    'GET',
+    'HEAD',
+    'OPTIONS',
+    'PUT',
+    'TRACE',
+])
+
+
+def get_retries(api, method, body):
+    """
+    Number of times a request may be retried. Only idempotent requests
+    whose body, if any, can be sent again are.
+    """
+    if method not in IDEMPOTENT_METHODS or not (
+        body is None or isinstance(body, bytes)
+    ):
+        return 0
+    return api.retries
+
+
+def get_backoff(attempt):
+    """Seconds to wait before a retry, with exponential backoff and jitter"""
+    ceiling = min(
+        get_setting('RETRY_BACKOFF_MAX'),
+        get_setting('RETRY_BACKOFF') * 2 ** (attempt - 1),
+    )
+    return random.uniform(0, ceiling)
+
+
+class RetryBudget(object):
+    """
+    Retries allowed to an api, as a percentage of its requests over the
+    last `window` seconds, so failing upstreams don't get a retry storm on
+    top of their traffic. A few retries are always allowed, so apis with
+    little traffic can still retry.
+    """
+    def __init__(self, percent, window=10):
+        self._lock = threading.Lock()
+        self.percent = percent
+        self.window = window
+        # Requests and retries per second, in a ring of `window` buckets
+        self.seconds = [0] * window
+        self.requests = [0] * window
+        self.retries = [0] * window
+
+    def deposit(self):
+        """Count a request"""
+        with self._lock:
+            self.requests[self._bucket(int(time.monotonic()))] += 1
+
+    def withdraw(self):
+        """Count a retry, if the budget allows it"""
+        with self._lock:
+            now = int(time.monotonic())
+            bucket = self._bucket(now)
+            requests = retries = 0
+            for index, second in enumerate(self.seconds):
+                if now - second < self.window:
+                    requests += self.requests[index]
+                    retries += self.retries[index]
+
+            allowed = max(
+                get_setting('RETRY_BUDGET_MIN_RETRIES'),
+                requests * self.percent / 100,
+            )
+            if retries >= allowed:
+                return False
+            self.retries[bucket] += 1
+            return True
+
+    def _bucket(self, second):
+        index = second % self.window
+        if self.seconds[index] != second:
+            self.seconds[index] = second
+            self.requests[index] = self.retries[index] = 0
+        return index
+
+
+def set_retry_budget(budget, api):
+    budget.percent = api.retry_budget
+
+
+# Retry budgets, by api
+retry_budgets = ApiRegistry(
+    lambda api: RetryBudget(api.retry_budget),
+    settings=lambda api: api.retry_budget,
+    update=set_retry_budget,
+)
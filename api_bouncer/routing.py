@@ -0,0 +1,334 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+
+from .balancers import build_balancer
+from .cache import LRUCache
+from .conf import get_setting
+from .health import get_healthchecks, health_checkers
+from .models import ApiHost, normalize_host  # noqa
+from .plugins import compile_pipeline
+from .schemas import defaults
+
+
+class Route(namedtuple(
+    'Route',
+    [
+        'api',
+        'upstream_url',
+        'plugins',
+        'pipeline',
+        'uri',
+        'balancer',
+        'health',
+    ],
+)):
+    __slots__ = ()
+
+    def select_target(self, request):
+        """
+        Base url of the target a request is sent to, or None if none of the
+        targets is available.
+        """
+        if self.balancer is not None:
+            return self.balancer.select(request, self.health.is_available)
+        if self.health.is_available(self.upstream_url):
+            return self.upstream_url
+        return None
+
+    def release_target(self, target):
+        if self.balancer is not None:
+            self.balancer.release(target)
+
+    def get_upstream_path(self, path):
+        """Upstream path of a request path, without its uri if stripped"""
+        if self.uri and self.api.strip_uri:
+            path = path[len(self.uri):]
+            if not path.startswith('/'):
+                path = '/' + path
+        return path
+
+    def get_upstream_url(self, path, target=None):
+        """
+        Upstream url of a request path, without its uri if stripped, on the
+        target picked by the balancer if any.
+        """
+        return '{0}{1}'.format(
+            target or self.upstream_url,
+            self.get_upstream_path(path),
+        )
+
+
+_missing = object()
+
+
+def compile_route(api):
+    """
+    Build the route of an api, merging plugin configs with defaults and
+    compiling them into its plugin pipeline, and the balancer and health
+    checker of its upstream targets.
+    """
+    plugins = {}
+    for plugin in api.plugins.all():
+        config = dict(defaults.get(plugin.name, {}))
+        config.update(plugin.config or {})
+        plugins[plugin.name] = config
+
+    try:
+        upstream = api.upstream
+    except ObjectDoesNotExist:
+        upstream = None
+    # Upstreams without targets of any weight get an empty balancer, so
+    # their requests get a 503 rather than going to the upstream_url
+    balancer = (
+        build_balancer(upstream, api.upstream_url)
+        if upstream is not None else None
+    )
+    health = health_checkers.get(
+        api.pk,
+        get_healthchecks(upstream and upstream.healthchecks),
+    )
+    health.set_targets(
+        [target for target, _ in balancer.targets] if balancer is not None
+        else [api.upstream_url]
+    )
+
+    return Route(
+        api=api,
+        upstream_url=api.upstream_url,
+        plugins=MappingProxyType(plugins),
+        pipeline=compile_pipeline(plugins),
+        uri='',
+        balancer=balancer,
+        health=health,
+    )
+
+
+def build_router(apis):
+    """Build the path router of apis sharing a host"""
+    router = PathRouter()
+    for api in apis:
+        route = compile_route(api)
+        for uri in api.uris or ['']:
+            router.add(uri, api.methods, route._replace(uri=uri))
+    return router
+
+
+class RadixNode(object):
+    __slots__ = ('edges', 'values')
+
+    def __init__(self):
+        # First character of each edge label -> (label, child)
+        self.edges = {}
+        # Method, or None for any method -> value
+        self.values = None
+
+
+class PathRouter(object):
+    """
+    Radix tree of uri prefixes, each mapping methods to a value.
+
+    Matching walks the tree once along the path, keeping the value of the
+    longest prefix ending at a path segment boundary that accepts the
+    method, so its cost depends on the path length, not on the number of
+    prefixes.
+    """
+    def __init__(self):
+        self.root = RadixNode()
+
+    def add(self, prefix, methods, value):
+        node = self._insert(prefix)
+        if node.values is None:
+            node.values = {}
+        for method in methods or [None]:
+            node.values.setdefault(method and method.upper(), value)
+
+    def match(self, path, method):
+        node = self.root
+        pos = 0
+        value = None
+        while True:
+            if node.values and (
+                pos == 0 or
+                pos == len(path) or
+                path[pos] == '/' or
+                path[pos - 1] == '/'
+            ):
+                value = (
+                    node.values.get(method) or node.values.get(None) or value
+                )
+
+            edge = pos < len(path) and node.edges.get(path[pos])
+            if not edge or not path.startswith(edge[0], pos):
+                return value
+            pos += len(edge[0])
+            node = edge[1]
+
+    def _insert(self, path):
+        node = self.root
+        while path:
+            edge = node.edges.get(path[0])
+            if edge is None:
+                child = RadixNode()
+                node.edges[path[0]] = (path, child)
+                return child
+
+            label, child = edge
+            common = 0
+            while (
+                common < min(len(label), len(path)) and
+                label[common] == path[common]
+            ):
+                common += 1
+
+            if common < len(label):
+                # Split the edge where the path diverges
+                middle = RadixNode()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[path[0]] = (label[:common], middle)
+                child = middle
+
+            node = child
+            path = path[common:]
+        return node
+
+
+class WildcardHosts(object):
+    """
+    Trie of wildcard host patterns, keyed by label.
+
+    Patterns like *.example.com are stored by reversed labels and patterns
+    like api.* by labels, so matching a host takes one step per label
+    whatever the number of patterns. The longest matching pattern wins, and
+    leading wildcards win over trailing ones. A wildcard matches one or
+    more labels.
+    """
+    def __init__(self):
+        self._leading = {}
+        self._trailing = {}
+
+    def add(self, pattern, value):
+        if pattern.startswith('*.'):
+            node, labels = self._leading, reversed(pattern[2:].split('.'))
+        elif pattern.endswith('.*'):
+            node, labels = self._trailing, pattern[:-2].split('.')
+        else:
+            raise ValueError('Not a wildcard host: {}'.format(pattern))
+
+        for label in labels:
+            node = node.setdefault(label, {})
+        node.setdefault(_missing, value)
+
+    def get(self, host):
+        labels = host.split('.')
+        # Leave at least one label to be matched by the wildcard
+        value = self._match(self._leading, reversed(labels[1:]))
+        if value is _missing:
+            value = self._match(self._trailing, labels[:-1])
+        return None if value is _missing else value
+
+    def _match(self, node, labels):
+        value = _missing
+        for label in labels:
+            node = node.get(label)
+            if node is None:
+                break
+            value = node.get(_missing, value)
+        return value
+
+
+class RoutingTable(object):
+    """
+    Per-process cache of the path routers of normalized hosts.
+
+    Routers are loaded on first use with an indexed lookup of the host in
+    ApiHost, falling back to wildcard hosts, and kept until the table is
+    invalidated or ROUTES_TTL seconds have passed. Unknown hosts are cached
+    too, so they don't hit the database on every request.
+
+    Wildcard hosts are few, so they're all loaded at once in a trie.
+    """
+    def __init__(self):
+        ttl = get_setting('ROUTES_TTL')
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._routers = LRUCache(
+            maxsize=get_setting('ROUTES_CACHE_SIZE'),
+            ttl=ttl if ttl else float('inf'),
+        )
+        self._wildcards = None
+        self._wildcards_expire_at = 0
+
+    def get(self, host, path='/', method='GET'):
+        """Route of a request, None if no api matches it"""
+        router = self.get_router(host)
+        return router and router.match(path, method)
+
+    def get_router(self, host):
+        host = normalize_host(host)
+        if '*' in host:
+            return None
+
+        router = self._routers.get(host, _missing)
+        if router is _missing:
+            generation = self._generation
+            router = self.load(host)
+            # Don't cache routers loaded while the table was invalidated
+            if generation == self._generation:
+                self._routers.set(host, router)
+        return router
+
+    def invalidate(self):
+        self._generation += 1
+        self._routers.clear()
+        self._wildcards_expire_at = 0
+
+    def load(self, host):
+        api_hosts = (
+            ApiHost.objects
+            .select_related('api__upstream')
+            .prefetch_related('api__plugins', 'api__upstream__targets')
+            .filter(host=host)
+            .order_by('api__created_at')
+        )
+        if api_hosts:
+            return build_router(api_host.api for api_host in api_hosts)
+        return self.get_wildcards().get(host)
+
+    def get_wildcards(self):
+        if time.monotonic() >= self._wildcards_expire_at:
+            with self._lock:
+                if time.monotonic() >= self._wildcards_expire_at:
+                    self.build_wildcards()
+        return self._wildcards
+
+    def build_wildcards(self):
+        generation = self._generation
+        wildcards = WildcardHosts()
+        apis = {}
+        api_hosts = (
+            ApiHost.objects
+            .filter(Q(host__startswith='*.') | Q(host__endswith='.*'))
+            .select_related('api__upstream')
+            .prefetch_related('api__plugins', 'api__upstream__targets')
+            .order_by('api__created_at')
+        )
+        for api_host in api_hosts:
+            apis.setdefault(api_host.host, []).append(api_host.api)
+        for pattern, pattern_apis in apis.items():
+            wildcards.add(pattern, build_router(pattern_apis))
+
+        self._wildcards = wildcards
+        # Leave the trie expired if it was invalidated while building
+        if generation == self._generation:
+            ttl = get_setting('ROUTES_TTL')
+            self._wildcards_expire_at = (
+                time.monotonic() + ttl if ttl else float('inf')
+            )
+
+
+routing_table = RoutingTable()
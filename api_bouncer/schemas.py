@@ -61,6 +61,155 @@ plugins = {
         },
         'additionalProperties': False
     },
+    'rate-limiting': {
+        'type': 'object',
+        'properties': {
+            'second': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+            'minute': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+            'hour': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+            'limit_by': {
+                'enum': ['consumer', 'credential', 'ip'],
+            },
+            'policy': {
+                'enum': ['local', 'shared'],
+            },
+            'hide_client_headers': {
+                'type': 'boolean',
+            },
+        },
+        'additionalProperties': False
+    },
+    'proxy-cache': {
+        'type': 'object',
+        'properties': {
+            'methods': {
+                'type': 'array',
+                'items': {'type': 'string'},
+            },
+            'status_codes': {
+                'type': 'array',
+                'items': {'type': 'integer'},
+            },
+            'vary_headers': {
+                'type': 'array',
+                'items': {'type': 'string'},
+            },
+            'ttl': {
+                'type': 'integer',
+                'minimum': 0,
+            },
+            'stale_ttl': {
+                'type': 'integer',
+                'minimum': 0,
+            },
+            'memory_size': {
+                'type': 'integer',
+                'minimum': 0,
+            },
+            'disk_path': {
+                'type': 'string',
+            },
+            'disk_entries': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+        },
+        'additionalProperties': False
+    },
+    'request-coalescing': {
+        'type': 'object',
+        'properties': {
+            'methods': {
+                'type': 'array',
+                'items': {'enum': ['GET', 'HEAD', 'OPTIONS']},
+            },
+            'vary_headers': {
+                'type': 'array',
+                'items': {'type': 'string'},
+            },
+            'max_waiters': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+            'timeout': {
+                'type': 'number',
+                'minimum': 0,
+            },
+        },
+        'additionalProperties': False
+    },
+    'response-compression': {
+        'type': 'object',
+        'properties': {
+            'level': {
+                'type': 'integer',
+                'minimum': 1,
+                'maximum': 9,
+            },
+            'min_size': {
+                'type': 'integer',
+                'minimum': 0,
+            },
+            'content_types': {
+                'type': 'array',
+                'items': {'type': 'string'},
+            },
+        },
+        'additionalProperties': False
+    },
+    'request-size-limiting': {
+        'type': 'object',
+        'properties': {
+            'allowed_payload_size': {
+                'type': 'integer',
+                'minimum': 0,
+            },
+            'size_unit': {
+                'enum': ['bytes', 'kilobytes', 'megabytes'],
+            },
+            'require_content_length': {
+                'type': 'boolean',
+            },
+        },
+        'additionalProperties': False
+    },
+    'tracing': {
+        'type': 'object',
+        'properties': {
+            'sample_rate': {
+                'type': 'number',
+                'minimum': 0,
+                'maximum': 1,
+            },
+            'exporter': {
+                'enum': ['file', 'http'],
+            },
+            'path': {
+                'type': 'string',
+            },
+            'url': {
+                'type': 'string',
+            },
+            'batch_size': {
+                'type': 'integer',
+                'minimum': 1,
+            },
+            'flush_interval': {
+                'type': 'number',
+                'minimum': 0.1,
+            },
+        },
+        'additionalProperties': False
+    },
 }
 
 defaults = {
@@ -84,4 +233,126 @@ defaults = {
         'status_code': 503,
         'message': '',
     },
+    'rate-limiting': {
+        'limit_by': 'consumer',
+        'policy': 'local',
+        'hide_client_headers': False,
+    },
+    'proxy-cache': {
+        'methods': ['GET', 'HEAD'],
+        'status_codes': [200, 301, 404],
+        'vary_headers': [],
+        'ttl': 300,
+        'stale_ttl': 60,
+        'memory_size': 10485760,
+        'disk_path': '',
+        'disk_entries': 10000,
+    },
+    'request-coalescing': {
+        'methods': ['GET', 'HEAD'],
+        'vary_headers': [],
+        'max_waiters': 100,
+        'timeout': 10,
+    },
+    'response-compression': {
+        'level': 6,
+        'min_size': 1024,
+        'content_types': [
+            'text/*',
+            'application/javascript',
+            'application/json',
+            'application/xml',
+            'image/svg+xml',
+        ],
+    },
+    'request-size-limiting': {
+        'allowed_payload_size': 128,
+        'size_unit': 'megabytes',
+        'require_content_length': False,
+    },
+    'tracing': {
+        'sample_rate': 0.01,
+        'exporter': 'file',
+        'path': 'api-bouncer-spans.jsonl',
+        'url': 'http://localhost:9411/spans',
+        'batch_size': 100,
+        'flush_interval': 5,
+    },
+}
+
+# Health checks of the targets of an api, set on its upstream
+healthchecks = {
+    'type': 'object',
+    'properties': {
+        'passive': {
+            'type': 'object',
+            'properties': {
+                'failures': {
+                    'type': 'integer',
+                    'minimum': 0,
+                },
+                'timeouts': {
+                    'type': 'integer',
+                    'minimum': 0,
+                },
+                'http_statuses': {
+                    'type': 'array',
+                    'items': {'type': 'integer'},
+                },
+                'cooldown': {
+                    'type': 'number',
+                    'minimum': 0,
+                },
+            },
+            'additionalProperties': False
+        },
+        'active': {
+            'type': 'object',
+            'properties': {
+                'interval': {
+                    'type': 'number',
+                    'minimum': 0,
+                },
+                'path': {
+                    'type': 'string',
+                    'pattern': '^/',
+                },
+                'timeout': {
+                    'type': 'number',
+                    'minimum': 0,
+                },
+                'healthy_statuses': {
+                    'type': 'array',
+                    'items': {'type': 'integer'},
+                },
+                'successes': {
+                    'type': 'integer',
+                    'minimum': 1,
+                },
+                'failures': {
+                    'type': 'integer',
+                    'minimum': 1,
+                },
+            },
+            'additionalProperties': False
+        },
+    },
+    'additionalProperties': False
+}
+
+healthchecks_defaults = {
+    'passive': {
+        'failures': 5,
+        'timeouts': 3,
+        'http_statuses': [502, 503, 504],
+        'cooldown': 30,
+    },
+    'active': {
+        'interval': 0,
+        'path': '/',
+        'timeout': 1,
+        'healthy_statuses': [200, 301, 302],
+        'successes': 2,
+        'failures': 3,
+    },
 }
@@ -10,9 +10,14 @@ from .models import (
     Consumer,
     ConsumerACL,
     ConsumerKey,
+    hash_key,
+    normalize_host,
     Plugin,
+    Target,
+    Upstream,
 )
-from .schemas import plugins
+from .routing import routing_table
+from .schemas import healthchecks, plugins
 
 
 class ConsumerSerializer(serializers.ModelSerializer):
@@ -48,22 +53,25 @@ class ConsumerKeySerializer(serializers.ModelSerializer):
         slug_field='username',
         queryset=Consumer.objects.all()
     )
+    # Keys are only stored hashed, so they can only be read on creation
+    key = serializers.CharField(
+        required=False,
+        allow_null=True,
+        allow_blank=True,
+        min_length=8,
+        max_length=200,
+    )
 
     class Meta:
         model = ConsumerKey
-        fields = '__all__'
-        extra_kwargs = {
-            'key': {
-                'required': False,
-                'allow_null': True,
-                'allow_blank': True,
-            },
-        }
+        fields = ('id', 'created_at', 'consumer', 'key')
 
     def validate_key(self, value):
         """Verify if no key is given and generate one"""
         if not value:
             value = str(uuid.uuid4().int)
+        if ConsumerKey.objects.filter(key_digest=hash_key(value)).exists():
+            raise serializers.ValidationError('Key already in use')
         return value
 
 
@@ -109,6 +117,44 @@ class PluginSerializer(serializers.ModelSerializer):
         return data
 
 
+class TargetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Target
+        fields = ('id', 'created_at', 'target', 'weight')
+
+
+class UpstreamSerializer(serializers.ModelSerializer):
+    api = serializers.SlugRelatedField(
+        many=False,
+        read_only=True,
+        slug_field='name'
+    )
+    targets = TargetSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Upstream
+        fields = '__all__'
+
+    def validate_healthchecks(self, value):
+        try:
+            jsonschema.validate(value, healthchecks)
+        except jsonschema.ValidationError as e:
+            raise serializers.ValidationError(e.message)
+        return value
+
+    def validate(self, data):
+        hash_on = data.get('hash_on', getattr(self.instance, 'hash_on', None))
+        hash_on_header = data.get(
+            'hash_on_header',
+            getattr(self.instance, 'hash_on_header', '')
+        )
+        if hash_on == 'header' and not hash_on_header:
+            raise serializers.ValidationError({
+                'hash_on_header': ['Required to hash on a header'],
+            })
+        return data
+
+
 class ApiSerializer(serializers.ModelSerializer):
     plugins = PluginSerializer(
         many=True,
@@ -120,13 +166,32 @@ class ApiSerializer(serializers.ModelSerializer):
         model = Api
         fields = '__all__'
 
+    def validate_hosts(self, value):
+        hosts = [normalize_host(host) for host in value]
+        if len(set(hosts)) < len(hosts):
+            raise serializers.ValidationError('Duplicated host')
+        return value
+
+    def validate(self, data):
+        """Verify no other api routes the same hosts, uris and methods"""
+        api = Api(pk=self.instance and self.instance.pk)
+        for field in ('hosts', 'uris', 'methods'):
+            setattr(api, field, data.get(
+                field,
+                getattr(self.instance, field, None)
+            ))
+        if api.get_conflicting_hosts():
+            raise serializers.ValidationError({
+                'hosts': ['Host already in use'],
+            })
+        return data
+
 
 class BouncerSerializer(serializers.Serializer):
-    api = serializers.CharField(allow_blank=False, allow_null=False)
+    host = serializers.CharField(allow_blank=False, allow_null=False)
     headers = serializers.DictField(child=serializers.CharField())
 
-    def validate_api(self, value):
-        api = Api.objects.get(name=value)
-        if not api:
+    def validate_host(self, value):
+        if not routing_table.get_router(value):
             raise serializers.ValidationError('Unknown API')
         return value
@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .credentials import credential_cache, invalidate_consumer
+from .health import health_checkers
+from .models import (
+    Api,
+    ApiHost,
+    Consumer,
+    ConsumerACL,
+    ConsumerKey,
+    Plugin,
+    Target,
+    Upstream,
+)
+from .response_cache import response_caches
+from .retries import retry_budgets
+from .routing import routing_table
+from .tracing import install_query_tracer
+from .upstream import upstream_clients
+
+
+# Registries of objects kept per api, dropped along with their api
+API_REGISTRIES = (
+    health_checkers,
+    response_caches,
+    retry_budgets,
+    upstream_clients,
+)
+
+
+def invalidate(func, *args):
+    """
+    Run an invalidation now and again once the transaction is committed, so
+    entries loaded by other threads before the commit don't linger.
+    """
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+@receiver([post_save, post_delete], sender=Api)
+@receiver([post_save, post_delete], sender=ApiHost)
+@receiver([post_save, post_delete], sender=Plugin)
+@receiver([post_save, post_delete], sender=Target)
+@receiver([post_save, post_delete], sender=Upstream)
+def invalidate_routing_table(sender, **kwargs):
+    invalidate(routing_table.invalidate)
+
+
+@receiver(post_delete, sender=Api)
+def discard_api_objects(sender, instance, **kwargs):
+    for registry in API_REGISTRIES:
+        registry.discard(instance.pk)
+
+
+@receiver(post_delete, sender=Plugin)
+def discard_plugin_response_cache(sender, instance, **kwargs):
+    if instance.name == 'proxy-cache':
+        response_caches.discard(instance.api_id)
+
+
+@receiver([post_save, post_delete], sender=ConsumerKey)
+def invalidate_consumer_key(sender, instance, **kwargs):
+    # Also drop the consumer, as the key may have just been changed
+    invalidate(credential_cache.delete, instance.key_digest)
+    invalidate(invalidate_consumer, instance.consumer_id)
+
+
+@receiver([post_save, post_delete], sender=Consumer)
+def invalidate_consumer_credentials(sender, instance, **kwargs):
+    invalidate(invalidate_consumer, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ConsumerACL)
+def invalidate_consumer_acl(sender, instance, **kwargs):
+    invalidate(invalidate_consumer, instance.consumer_id)
+
+
+@receiver(connection_created)
+def trace_queries(sender, connection, **kwargs):
+    install_query_tracer(connection)
@@ -0,0 +1,283 @@
+import json
+import queue
+import random
+import re
+import threading
+import time
+
+import requests
+
+from .registry import ApiRegistry
+
+
+TRACEPARENT_REGEX = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$'
+)
+
+# Trace of the request being handled by the current thread, if sampled
+_current = threading.local()
+
+
+def parse_traceparent(value):
+    """
+    Trace id, parent span id and whether the parent was sampled, from a
+    W3C traceparent header, or None if it's missing or invalid.
+    """
+    match = TRACEPARENT_REGEX.match((value or '').strip().lower())
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def format_traceparent(trace_id, span_id, sampled=True):
+    return '00-{}-{}-{}'.format(trace_id, span_id, '01' if sampled else '00')
+
+
+def new_span_id():
+    return '{:016x}'.format(random.getrandbits(64) or 1)
+
+
+def new_trace_id():
+    return '{:032x}'.format(random.getrandbits(128) or 1)
+
+
+class Trace(object):
+    """
+    Spans of a sampled request, exported once it's finished.
+
+    Spans are timed with time.perf_counter, as the bouncer metrics, and
+    converted to Unix nanoseconds. Every span is a child of the request
+    span, itself a child of the client span if the client sent a
+    traceparent. The upstream span id is picked upfront, to be sent to the
+    upstream as its parent.
+    """
+    def __init__(self, exporter, trace_id=None, parent_id=None, start=None):
+        self.exporter = exporter
+        self.trace_id = trace_id or new_trace_id()
+        self.parent_id = parent_id
+        self.span_id = new_span_id()
+        self.upstream_span_id = new_span_id()
+        self.offset = time.time() - time.perf_counter()
+        self.start = time.perf_counter() if start is None else start
+        self.spans = []
+        self.finished = False
+
+    def get_traceparent(self):
+        """traceparent sent upstream"""
+        return format_traceparent(self.trace_id, self.upstream_span_id)
+
+    def add_span(self, name, start, end, attributes=None, span_id=None):
+        if self.finished:
+            return
+        self.spans.append({
+            'trace_id': self.trace_id,
+            'span_id': span_id or new_span_id(),
+            'parent_id': self.span_id,
+            'name': name,
+            'start_time': int((start + self.offset) * 1e9),
+            'end_time': int((end + self.offset) * 1e9),
+            'attributes': attributes or {},
+        })
+
+    def finish(self, attributes=None):
+        """Add the request span and export the trace"""
+        if self.finished:
+            return
+        self.spans.append({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': 'bouncer.request',
+            'start_time': int((self.start + self.offset) * 1e9),
+            'end_time': int((time.perf_counter() + self.offset) * 1e9),
+            'attributes': attributes or {},
+        })
+        self.finished = True
+        self.exporter.export(self.spans)
+
+
+def activate(trace):
+    """Trace the database queries of the current thread into a trace"""
+    _current.trace = trace
+
+
+def deactivate():
+    _current.trace = None
+
+
+class TracedCursor(object):
+    """
+    Database cursor adding a span per query of the sampled request being
+    handled by the current thread, if any.
+    """
+    def __init__(self, cursor, connection):
+        self.cursor = cursor
+        self.connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.cursor.__exit__(*exc_info)
+
+    def execute(self, sql, params=None):
+        return self.trace(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self.trace(self.cursor.executemany, sql, param_list)
+
+    def trace(self, execute, sql, params):
+        trace = getattr(_current, 'trace', None)
+        if trace is None:
+            return execute(sql, params)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params)
+        finally:
+            trace.add_span('db.query', start, time.perf_counter(), {
+                'db.statement': sql,
+                'db.vendor': self.connection.vendor,
+            })
+
+
+def install_query_tracer(connection):
+    """Wrap the cursors of a connection, once, to trace their queries"""
+    if getattr(connection, 'bouncer_traced', False):
+        return
+    connection.bouncer_traced = True
+    # Both are called by connection.cursor(), depending on whether queries
+    # are logged
+    for name in ('make_cursor', 'make_debug_cursor'):
+        make_cursor = getattr(connection, name)
+        setattr(connection, name, lambda cursor, make_cursor=make_cursor: (
+            TracedCursor(make_cursor(cursor), connection)
+        ))
+
+
+class FileWriter(object):
+    """Append spans to a file, as JSON lines"""
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, spans):
+        with open(self.path, 'a') as f:
+            for span in spans:
+                f.write(json.dumps(span, sort_keys=True))
+                f.write('\n')
+
+
+class HTTPWriter(object):
+    """POST spans to a collector, as a JSON object"""
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def __call__(self, spans):
+        resp = self.session.post(
+            self.url,
+            json={'spans': spans},
+            timeout=self.timeout,
+        )
+        resp.close()
+        resp.raise_for_status()
+
+
+class BatchExporter(object):
+    """
+    Export spans in batches from a daemon thread, so requests never wait
+    on it. The thread writes queued spans every flush_interval seconds, or
+    as soon as a batch is full. Spans are dropped when the queue is full or
+    can't be written.
+    """
+    def __init__(self, write, batch_size=100, flush_interval=5,
+                 max_queue_size=10000):
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(max_queue_size)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def export(self, spans):
+        for span in spans:
+            try:
+                self.queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+        if self._thread is None:
+            self.start()
+        if self.queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self.run,
+                    name='api-bouncer-tracing',
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every queued span, in batches"""
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                try:
+                    self.write(batch)
+                except (OSError, requests.RequestException):
+                    self.dropped += len(batch)
+
+
+def get_exporter_key(config):
+    """Destination and batching of the spans of a tracing config"""
+    if config['exporter'] == 'http':
+        key = ('http', config['url'])
+    else:
+        key = ('file', config['path'])
+    return key + (config['batch_size'], config['flush_interval'])
+
+
+def build_exporter(config):
+    write = (
+        HTTPWriter(config['url'])
+        if config['exporter'] == 'http'
+        else FileWriter(config['path'])
+    )
+    return BatchExporter(
+        write,
+        batch_size=config['batch_size'],
+        flush_interval=config['flush_interval'],
+    )
+
+
+# Span exporters, by destination
+exporters = ApiRegistry(build_exporter, key=get_exporter_key)
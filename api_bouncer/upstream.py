@@ -0,0 +1,74 @@
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from .conf import get_setting
+from .registry import ApiRegistry
+
+
+class UpstreamClient(object):
+    """
+    Long-lived HTTP session keeping connections alive to an upstream, with
+    a connection pool per target host.
+    """
+    def __init__(self, upstream_url, pools=1):
+        self.upstream_url = upstream_url
+        self.pools = pools
+        self.last_used = time.monotonic()
+        self.session = Session()
+        # Sessions are shared by all consumers, never keep upstream cookies
+        self.session.cookies.set_policy(
+            DefaultCookiePolicy(allowed_domains=[])
+        )
+        # Bodies are passed through undecoded, only ask upstreams to
+        # compress them when the client does
+        self.session.headers['Accept-Encoding'] = 'identity'
+
+        adapter = HTTPAdapter(
+            pool_connections=pools,
+            pool_maxsize=get_setting('UPSTREAM_POOL_SIZE'),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+
+class UpstreamClients(ApiRegistry):
+    """
+    Upstream clients, by api.
+
+    A client is replaced when the upstream_url of its api or its number of
+    targets changes, and closed once it has been idle for
+    UPSTREAM_IDLE_TIMEOUT seconds.
+    """
+    def __init__(self):
+        super(UpstreamClients, self).__init__(
+            lambda api, pools=1: UpstreamClient(api.upstream_url, pools),
+            settings=lambda api, pools=1: (api.upstream_url, pools),
+            close=UpstreamClient.close,
+        )
+        self._next_eviction = 0
+
+    def get(self, api, pools=1):
+        now = time.monotonic()
+        if now >= self._next_eviction:
+            self.evict_idle(now)
+
+        client = super(UpstreamClients, self).get(api, pools)
+        client.last_used = now
+        return client
+
+    def evict_idle(self, now=None):
+        now = now or time.monotonic()
+        timeout = get_setting('UPSTREAM_IDLE_TIMEOUT')
+        self._next_eviction = now + timeout
+        self.discard_if(
+            lambda api_id, client: now - client.last_used >= timeout
+        )
+
+
+upstream_clients = UpstreamClients()
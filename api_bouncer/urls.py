@@ -13,5 +13,7 @@ router.register(r'plugins', views.PluginViewSet)
 
 urlpatterns = [
     url(r'^', include(router.urls)),
+    # Under a prefix of its own, not to shadow paths of proxied apis
+    url(r'^_bouncer/metrics/$', views.metrics, name='metrics'),
     url(r'^', views.api_bouncer, name='api-bouncer'),
 ]
@@ -52,6 +52,17 @@ class WhitelistBlacklistMutuallyExclusive(BaseValidator):
             })
 
 
+class RateLimitValidator(BaseValidator):
+    def __call__(self):
+        # At least one limit is required
+        if not any(
+            self.config.get(period) for period in ('second', 'minute', 'hour')
+        ):
+            raise serializers.ValidationError({
+                'config': 'At least one of second, minute or hour is required',
+            })
+
+
 validator_classes = {
     'ip-restriction': [
         WhitelistBlacklistMutuallyExclusive,
@@ -59,5 +70,6 @@ validator_classes = {
         ConsumerValidator,
     ],
     'request-termination': [ConsumerValidator, ],
-    'acl': [WhitelistBlacklistMutuallyExclusive, ]
+    'acl': [WhitelistBlacklistMutuallyExclusive, ],
+    'rate-limiting': [RateLimitValidator, ],
 }
@@ -1,7 +1,7 @@
-import re
+import time
 
 from django.http import HttpResponse, JsonResponse
-from requests import Request, Session
+from requests import exceptions, Request
 from rest_framework import (
     mixins,
     permissions,
@@ -9,15 +9,33 @@ from rest_framework import (
     status,
     viewsets,
 )
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import (
+    api_view,
+    detail_route,
+    permission_classes,
+)
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 
+from .metrics import registry, upstream_duration
 from .models import (
     Api,
     Consumer,
     ConsumerACL,
     ConsumerKey,
     Plugin,
+    Target,
+    Upstream,
+)
+from .proxy import (
+    BodyTooLarge,
+    build_response,
+    get_request_body,
+    get_request_headers,
+    request_too_large,
+    upstream_error,
 )
+from .retries import get_backoff, get_retries, retry_budgets
+from .routing import compile_route, routing_table
 from .schemas import (
     defaults,
     plugins,
@@ -29,49 +47,32 @@ from .serializers import (
     ConsumerKeySerializer,
     ConsumerSerializer,
     PluginSerializer,
+    TargetSerializer,
+    UpstreamSerializer,
 )
+from .upstream import upstream_clients
 
 
 def api_bouncer(request):
-    def get_headers(meta):
-        """Get all headers beginning with HTTP_ and that have a value"""
-        regex = re.compile(r'^HTTP_')
-        return {
-            (regex.sub('', k)).replace('_', '-'): v
-            for k, v in meta.items()
-            if k.startswith('HTTP_') and v
-        }
-
-    dest_host = request.META.get('HTTP_HOST')
-    api = Api.objects.filter(hosts__contains=[dest_host]).first()
+    if 'BOUNCER_ROUTE' in request.META:
+        route = request.META['BOUNCER_ROUTE']
+    else:
+        route = routing_table.get(
+            request.META.get('HTTP_HOST'),
+            request.path_info,
+            request.method,
+        )
 
-    if not api:
+    if not route:
         return JsonResponse(data={}, status=status.HTTP_200_OK)
 
     serializer = BouncerSerializer(data={
-        'api': api.name,
-        'headers': get_headers(request.META),
+        'host': request.META.get('HTTP_HOST'),
+        'headers': get_request_headers(request.META),
     })
 
     if serializer.is_valid():
-        url = '{0}{1}'.format(api.upstream_url, request.path)
-        session = Session()
-        req = Request(
-            request.method,
-            url,
-            params=request.GET,
-            data=request.POST,
-            headers=serializer.data['headers']
-        )
-        prepped = session.prepare_request(req)
-        resp = session.send(prepped)
-        content_type = resp.headers.get('content-type', 'text/html')
-
-        return HttpResponse(
-            content=resp.content,
-            content_type=content_type,
-            status=resp.status_code,
-        )
+        return proxy_request(route, request, serializer.data['headers'])
 
     return JsonResponse(
         data={'errors': serializer.errors},
@@ -79,6 +80,93 @@ def api_bouncer(request):
     )
 
 
+def proxy_request(route, request, headers):
+    """
+    Send a request to a target of its route. Connection failures of
+    idempotent requests are retried, on the next available target, as
+    long as the retry budget of the api allows it.
+    """
+    api = route.api
+    body = get_request_body(request)
+    retries = get_retries(api, request.method, body)
+    budget = retry_budgets.get(api)
+    budget.deposit()
+    session = upstream_clients.get(
+        api,
+        pools=len(route.balancer) if route.balancer else 1
+    ).session
+
+    attempt = 0
+    while True:
+        target = route.select_target(request)
+        if target is None:
+            return upstream_error(status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            req = Request(
+                request.method,
+                route.get_upstream_url(request.path, target),
+                params=request.GET,
+                data=body,
+                headers=headers
+            )
+            prepped = session.prepare_request(req)
+            start = time.perf_counter()
+            try:
+                resp = session.send(
+                    prepped,
+                    stream=True,
+                    timeout=api.get_timeout()
+                )
+            except exceptions.ConnectionError as e:
+                # No response was received, idempotent requests can be
+                # sent again
+                timeout = isinstance(e, exceptions.ConnectTimeout)
+                route.health.report(target, timeout=timeout, error=True)
+                if attempt < retries and budget.withdraw():
+                    attempt += 1
+                    time.sleep(get_backoff(attempt))
+                    continue
+                return upstream_error(
+                    status.HTTP_504_GATEWAY_TIMEOUT if timeout
+                    else status.HTTP_502_BAD_GATEWAY
+                )
+            except exceptions.Timeout:
+                route.health.report(target, timeout=True)
+                return upstream_error(status.HTTP_504_GATEWAY_TIMEOUT)
+            except BodyTooLarge:
+                # Chunked body over the request-size-limiting limit
+                return request_too_large()
+
+            end = time.perf_counter()
+            upstream_duration.observe(end - start, api.name, target)
+            trace = request.META.get('BOUNCER_TRACE')
+            if trace is not None:
+                trace.add_span('upstream', start, end, {
+                    'bouncer.target': target,
+                    'http.status_code': resp.status_code,
+                }, span_id=trace.upstream_span_id)
+            route.health.report(target, status=resp.status_code)
+            try:
+                return build_response(api, resp)
+            except ReadTimeoutError:
+                return upstream_error(status.HTTP_504_GATEWAY_TIMEOUT)
+            except ProtocolError:
+                return upstream_error(status.HTTP_502_BAD_GATEWAY)
+        finally:
+            route.release_target(target)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def metrics(request):
+    """Metrics of the process, in the Prometheus text format"""
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 class ApiViewSet(viewsets.ModelViewSet):
     serializer_class = ApiSerializer
     queryset = Api.objects.prefetch_related('plugins').all()
@@ -133,6 +221,81 @@ class ApiViewSet(viewsets.ModelViewSet):
             status.HTTP_400_BAD_REQUEST
         )
 
+    @detail_route(
+        methods=['get', 'put'],
+        permission_classes=[permissions.IsAdminUser],
+        url_path='upstream'
+    )
+    def upstream(self, request, name=None):
+        api = self.get_object()
+        upstream = Upstream.objects.filter(api=api).first()
+        if request.method == 'GET':
+            if upstream is None:
+                return response.Response(
+                    {'errors': 'Upstream not found'},
+                    status.HTTP_404_NOT_FOUND
+                )
+            return response.Response(UpstreamSerializer(upstream).data)
+
+        serializer = UpstreamSerializer(
+            upstream or Upstream(api=api),
+            data=request.data,
+            partial=True
+        )
+        if serializer.is_valid():
+            serializer.save()
+            return response.Response(
+                serializer.data,
+                status=status.HTTP_200_OK
+            )
+
+        return response.Response(
+            serializer.errors,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    @detail_route(
+        methods=['get'],
+        permission_classes=[permissions.IsAdminUser],
+        url_path='health'
+    )
+    def health(self, request, name=None):
+        """Health of the api targets, as seen by the current process"""
+        health = compile_route(self.get_object()).health
+        return response.Response({
+            'healthchecks': health.config,
+            'targets': health.get_status(),
+        })
+
+    @detail_route(
+        methods=['post'],
+        permission_classes=[permissions.IsAdminUser],
+        url_path='targets'
+    )
+    def add_target(self, request, name=None):
+        api = self.get_object()
+        upstream, _ = Upstream.objects.get_or_create(api=api)
+        target = upstream.targets.filter(
+            target=request.data.get('target')
+        ).first()
+
+        serializer = TargetSerializer(
+            target or Target(upstream=upstream),
+            data=request.data
+        )
+        if serializer.is_valid():
+            serializer.save()
+            return response.Response(
+                serializer.data,
+                status=status.HTTP_201_CREATED if target is None
+                else status.HTTP_200_OK
+            )
+
+        return response.Response(
+            serializer.errors,
+            status.HTTP_400_BAD_REQUEST
+        )
+
 
 class ConsumerViewSet(viewsets.ModelViewSet):
     serializer_class = ConsumerSerializer
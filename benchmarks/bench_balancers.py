@@ -0,0 +1,74 @@
+"""
+Measure the cost of picking a target with each balancer, and of building
+it, for upstreams of up to 1,000 targets.
+
+    $ python benchmarks/bench_balancers.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from django.test import RequestFactory  # noqa: E402, I202
+
+from api_bouncer.balancers import (  # noqa: E402
+    ConsistentHashBalancer,
+    LeastConnectionsBalancer,
+    RoundRobinBalancer,
+)
+
+SIZES = (10, 100, 1000)
+BALANCERS = (
+    ('round-robin', RoundRobinBalancer),
+    ('least-connections', LeastConnectionsBalancer),
+    ('consistent-hash', lambda targets: ConsistentHashBalancer(
+        targets, 'header', 'X-User'
+    )),
+)
+
+
+def select(balancer, requests):
+    for request in requests:
+        balancer.release(balancer.select(request))
+
+
+def bench(balancer, requests):
+    """Best time per selection, in microseconds"""
+    timer = timeit.Timer(lambda: select(balancer, requests))
+    best = min(timer.repeat(repeat=3, number=10))
+    return best / (10 * len(requests)) * 1e6
+
+
+def main():
+    rand = random.Random(42)
+    factory = RequestFactory()
+    requests = [
+        factory.get('/', HTTP_X_USER='user-{}'.format(i)) for i in range(100)
+    ]
+
+    print('{:>8} {:>18} {:>14} {:>14}'.format(
+        'targets', 'balancer', 'select (us)', 'build (ms)'
+    ))
+    for size in SIZES:
+        targets = [
+            ('http://10.0.{}.{}:8080'.format(i // 256, i % 256),
+             rand.randint(1, 1000))
+            for i in range(size)
+        ]
+        for name, balancer_class in BALANCERS:
+            start = timeit.default_timer()
+            balancer = balancer_class(targets)
+            build_time = (timeit.default_timer() - start) * 1e3
+            print('{:>8} {:>18} {:>14.2f} {:>14.2f}'.format(
+                size, name, bench(balancer, requests), build_time
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure the CPU cost of response-compression per MB of body, at each
+level, for bodies compressed at once and streamed in chunks.
+
+    $ python benchmarks/bench_compression.py
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_bouncer.compression import compress, Compressor  # noqa: E402
+
+LEVELS = (1, 6, 9)
+ENCODINGS = ('gzip', 'deflate')
+CHUNK_SIZE = 65536
+
+
+def make_body(size):
+    """JSON body of about `size` bytes, as compressible as API payloads"""
+    rand = random.Random(42)
+    items = []
+    length = 0
+    while length < size:
+        item = json.dumps({
+            'id': rand.randint(1, 10 ** 9),
+            'name': 'user-{}'.format(rand.randint(1, 10 ** 6)),
+            'active': rand.random() > 0.5,
+            'score': round(rand.random() * 100, 2),
+            'tags': rand.sample(['api', 'bouncer', 'proxy', 'cache'], 2),
+        })
+        items.append(item)
+        length += len(item) + 2
+    return '[{}]'.format(', '.join(items)).encode('utf-8')
+
+
+def bench(compress_body, body, repeat=5):
+    """Best CPU time to compress the body, in ms per MB, and its size"""
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        size = compress_body(body)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e3 / (len(body) / 2 ** 20), size
+
+
+def buffered(encoding, level):
+    return lambda body: len(compress(body, encoding, level))
+
+
+def streamed(encoding, level):
+    def compress_body(body):
+        compressor = Compressor(encoding, level)
+        chunks = (
+            body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)
+        )
+        return sum(len(chunk) for chunk in compressor.stream(chunks))
+    return compress_body
+
+
+def main():
+    body = make_body(4 * 2 ** 20)
+    print('{:>8} {:>6} {:>9} {:>12} {:>8}'.format(
+        'encoding', 'level', 'mode', 'cpu (ms/MB)', 'ratio'
+    ))
+    for encoding in ENCODINGS:
+        for level in LEVELS:
+            for mode, compress_body in (
+                ('buffered', buffered(encoding, level)),
+                ('streamed', streamed(encoding, level)),
+            ):
+                cpu, size = bench(compress_body, body)
+                print('{:>8} {:>6} {:>9} {:>12.2f} {:>8.2f}'.format(
+                    encoding, level, mode, cpu, len(body) / size
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""
+Measure requests bounced end to end: through the WSGI handler, every
+middleware in settings.MIDDLEWARE and the api_bouncer view, to a stub
+upstream served from a thread of this process.
+
+For each fixture size, as many apis, consumers, keys and plugins are
+created in a test database. For each plugin combination, requests are
+then sent by a random working set of consumers, each calling one api. The
+first request of each consumer is measured apart, as cold, since it loads
+its route and credential into the bouncer caches.
+
+    $ python benchmarks/bench_e2e.py --output bench-e2e.json
+
+Results are printed and written as JSON, to compare runs. The settings
+are taken from DJANGO_SETTINGS_MODULE, tests.settings by default, with
+DEBUG off and database connections kept open between requests.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from django.conf import settings  # noqa: E402, I202
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from api_bouncer.credentials import credential_cache  # noqa: E402
+from api_bouncer.models import (  # noqa: E402
+    Api,
+    ApiHost,
+    Consumer,
+    ConsumerACL,
+    ConsumerKey,
+    Plugin,
+)
+from api_bouncer.routing import routing_table  # noqa: E402
+from api_bouncer.schemas import defaults  # noqa: E402
+
+SIZES = (1, 1000, 100000)
+BATCH_SIZE = 1000
+GROUP = 'bench'
+
+# Plugins of each combination, with what their defaults need to let every
+# request of the benchmark through
+COMBINATIONS = (
+    ('none', ()),
+    ('key-auth', ('key-auth',)),
+    ('key-auth+acl', ('key-auth', 'acl')),
+    ('key-auth+acl+rate-limiting', ('key-auth', 'acl', 'rate-limiting')),
+    ('ip-restriction+request-size-limiting+response-compression', (
+        'ip-restriction',
+        'request-size-limiting',
+        'response-compression',
+    )),
+    ('proxy-cache', ('proxy-cache',)),
+)
+CONFIGS = {
+    'acl': {'whitelist': [GROUP]},
+    'ip-restriction': {'blacklist': ['10.0.0.1']},
+    'rate-limiting': {'second': 10 ** 9},
+}
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    """Stub upstream, answering every request with the same JSON body"""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent apart, don't wait for acks in between
+    disable_nagle_algorithm = True
+    body = json.dumps([
+        {'id': index, 'name': 'item-{}'.format(index), 'active': True}
+        for index in range(50)
+    ]).encode('utf-8')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        # Lets proxy-cache store it
+        self.send_header('Cache-Control', 'max-age=60')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_upstream():
+    server = UpstreamServer(('127.0.0.1', 0), UpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bulk_create(model, objs):
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+
+def create_fixtures(size, upstream_url):
+    """Create `size` apis and consumers, with a key and acl each"""
+    call_command('flush', interactive=False, verbosity=0)
+    reset_caches()
+
+    apis = [
+        Api(
+            name='api-{}'.format(index),
+            hosts=['api-{}.bench.local'.format(index)],
+            upstream_url=upstream_url,
+        )
+        for index in range(size)
+    ]
+    # bulk_create doesn't call Api.save, so hosts are synced here
+    bulk_create(Api, apis)
+    bulk_create(ApiHost, [
+        ApiHost(api=api, host=api.hosts[0]) for api in apis
+    ])
+
+    consumers = [
+        Consumer(username='consumer-{}'.format(index))
+        for index in range(size)
+    ]
+    bulk_create(Consumer, consumers)
+    keys = []
+    for index, consumer in enumerate(consumers):
+        key = ConsumerKey(consumer=consumer)
+        key.key = 'key-{}'.format(index)
+        keys.append(key)
+    bulk_create(ConsumerKey, keys)
+    bulk_create(ConsumerACL, [
+        ConsumerACL(consumer=consumer, group=GROUP) for consumer in consumers
+    ])
+    return apis, [key.key for key in keys]
+
+
+def set_plugins(apis, names):
+    """Replace the plugins of every api with a combination"""
+    # Deleting through the ORM would send a signal per plugin
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {}'.format(
+            connection.ops.quote_name(Plugin._meta.db_table)
+        ))
+    bulk_create(Plugin, [
+        Plugin(api=api, name=name, config=dict(
+            defaults[name],
+            **CONFIGS.get(name, {})
+        ))
+        for api in apis
+        for name in names
+    ])
+    reset_caches()
+
+
+def reset_caches():
+    routing_table.invalidate()
+    credential_cache.clear()
+
+
+def make_environ(api, key):
+    return RequestFactory().get(
+        '/items/1',
+        HTTP_HOST=api.hosts[0],
+        HTTP_APIKEY=key,
+        HTTP_ACCEPT_ENCODING='gzip',
+    ).environ
+
+
+def run(handler, environs):
+    """Send requests, one at a time, and summarize their latency"""
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split(' ', 1)[0]))
+
+    latencies = []
+    queries = 0
+    # Log queries even with DEBUG off. The log is cleared when each request
+    # starts, so it holds the queries of the last one.
+    connection.force_debug_cursor = True
+    try:
+        for environ in environs:
+            start = time.perf_counter()
+            response = handler(dict(environ), start_response)
+            for chunk in response:
+                pass
+            response.close()
+            latencies.append(time.perf_counter() - start)
+            queries += len(connection.queries_log)
+    finally:
+        connection.force_debug_cursor = False
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': sum(1 for status in statuses if status >= 400),
+        'requests_per_second': count / sum(latencies),
+        'p50_ms': latencies[int(0.5 * (count - 1))] * 1e3,
+        'p99_ms': latencies[int(0.99 * (count - 1))] * 1e3,
+        'queries_per_request': queries / count,
+    }
+
+
+def bench(size, combinations, working_set, requests, upstream_url):
+    start = time.perf_counter()
+    apis, keys = create_fixtures(size, upstream_url)
+    setup_time = time.perf_counter() - start
+
+    # Consumers of the working set, each calling one of its apis
+    rand = random.Random(size)
+    indexes = rand.sample(range(size), min(working_set, size))
+    clients = [(apis[index], keys[index]) for index in indexes]
+    cold = [make_environ(api, key) for api, key in clients]
+    warm = [make_environ(*rand.choice(clients)) for _ in range(requests)]
+    handler = WSGIHandler()
+
+    results = []
+    for name, plugins in combinations:
+        set_plugins(apis, plugins)
+        results.append({
+            'size': size,
+            'combination': name,
+            'plugins': list(plugins),
+            'setup_seconds': setup_time,
+            'cold': run(handler, cold),
+            'warm': run(handler, warm),
+        })
+    return results
+
+
+def print_result(result):
+    for phase in ('cold', 'warm'):
+        stats = result[phase]
+        print('{:>7} {:<58} {:>5} {:>9.0f} {:>8.2f} {:>8.2f} {:>8.2f} {:>6}'
+              .format(
+                  result['size'],
+                  result['combination'],
+                  phase,
+                  stats['requests_per_second'],
+                  stats['p50_ms'],
+                  stats['p99_ms'],
+                  stats['queries_per_request'],
+                  stats['errors'],
+              ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=SIZES,
+        help='Numbers of apis, consumers and keys of each fixture',
+    )
+    parser.add_argument(
+        '--combinations', nargs='+', metavar='NAME',
+        choices=[name for name, plugins in COMBINATIONS],
+        help='Plugin combinations to run, all of them by default',
+    )
+    parser.add_argument(
+        '--working-set', type=int, default=100,
+        help='Number of consumers sending requests, each to its own api',
+    )
+    parser.add_argument(
+        '--requests', type=int, default=2000,
+        help='Number of warm requests per combination',
+    )
+    parser.add_argument(
+        '--output', default='bench-e2e.json',
+        help='Path of the JSON results',
+    )
+    args = parser.parse_args()
+    combinations = [
+        (name, plugins) for name, plugins in COMBINATIONS
+        if not args.combinations or name in args.combinations
+    ]
+
+    settings.DEBUG = False
+    connection.settings_dict['CONN_MAX_AGE'] = None
+    old_name = connection.creation.create_test_db(
+        verbosity=0,
+        autoclobber=True,
+        serialize=False,
+    )
+    upstream = start_upstream()
+    upstream_url = 'http://127.0.0.1:{}'.format(upstream.server_port)
+
+    print('{:>7} {:<58} {:>5} {:>9} {:>8} {:>8} {:>8} {:>6}'.format(
+        'size', 'plugins', 'phase', 'req/s', 'p50 ms', 'p99 ms', 'queries',
+        'errors',
+    ))
+    results = []
+    try:
+        for size in args.sizes:
+            for result in bench(
+                size,
+                combinations,
+                args.working_set,
+                args.requests,
+                upstream_url,
+            ):
+                print_result(result)
+                results.append(result)
+    finally:
+        upstream.shutdown()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'middleware': list(settings.MIDDLEWARE),
+            'working_set': args.working_set,
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+    print('Results written to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare ip-restriction lookups through a NetworkSet with the linear scan it
+replaced, which parsed every network on every request.
+
+    $ python benchmarks/bench_ip_restriction.py
+"""
+import ipaddress
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_bouncer.networks import NetworkSet  # noqa: E402
+
+SIZES = (10, 1000, 100000)
+
+
+def random_networks(size, seed=42):
+    rand = random.Random(seed)
+    networks = []
+    for i in range(size):
+        if i % 4:
+            prefix = rand.randint(16, 32)
+            address = ipaddress.IPv4Address(rand.getrandbits(32))
+            network = ipaddress.IPv4Network(
+                '{}/{}'.format(address, prefix),
+                strict=False,
+            )
+        else:
+            prefix = rand.randint(32, 128)
+            address = ipaddress.IPv6Address(rand.getrandbits(128))
+            network = ipaddress.IPv6Network(
+                '{}/{}'.format(address, prefix),
+                strict=False,
+            )
+        networks.append(str(network))
+    return networks
+
+
+def linear_lookup(client_ip, networks):
+    client_ip = ipaddress.ip_address(client_ip)
+    return any(client_ip in ipaddress.ip_network(ip) for ip in networks)
+
+
+def set_lookup(client_ip, networks):
+    return ipaddress.ip_address(client_ip) in networks
+
+
+def bench(func, client_ips, networks):
+    """Best time per lookup, in microseconds"""
+    number = max(1, 10000 // (len(networks) or 1))
+    timer = timeit.Timer(
+        lambda: [func(ip, networks) for ip in client_ips]
+    )
+    best = min(timer.repeat(repeat=3 if number > 1 else 1, number=number))
+    return best / (number * len(client_ips)) * 1e6
+
+
+def main():
+    rand = random.Random(0)
+    client_ips = [
+        str(ipaddress.IPv4Address(rand.getrandbits(32))) for _ in range(5)
+    ] + [
+        str(ipaddress.IPv6Address(rand.getrandbits(128))) for _ in range(5)
+    ]
+
+    print('{:>8} {:>14} {:>14} {:>14}'.format(
+        'networks', 'linear (us)', 'set (us)', 'compile (ms)'
+    ))
+    for size in SIZES:
+        networks = random_networks(size)
+        start = timeit.default_timer()
+        network_set = NetworkSet(networks)
+        compile_time = (timeit.default_timer() - start) * 1e3
+
+        linear = bench(linear_lookup, client_ips, networks)
+        compiled = bench(set_lookup, client_ips, network_set)
+        print('{:>8} {:>14.2f} {:>14.2f} {:>14.2f}'.format(
+            size, linear, compiled, compile_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure the cost of recording metrics, from one thread and from several
+threads at once, and of rendering them for a scrape.
+
+    $ python benchmarks/bench_metrics.py
+"""
+import os
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_bouncer.metrics import Registry  # noqa: E402
+
+RECORDS = 100000
+THREADS = (1, 8)
+
+
+def record(counter, histogram, labels):
+    for index in range(RECORDS):
+        counter.inc(*labels)
+        histogram.observe(index % 5000 / 1e6, *labels)
+
+
+def bench(threads):
+    """
+    Time to increment a counter and observe a latency, in microseconds,
+    and to render the metrics, in milliseconds
+    """
+    registry = Registry()
+    counter = registry.counter('requests_total', 'Requests.', ['api'])
+    histogram = registry.histogram('duration_seconds', 'Duration.', ['api'])
+    workers = [
+        threading.Thread(
+            target=record,
+            args=(counter, histogram, ('api-{}'.format(i % 4),)),
+        )
+        for i in range(threads)
+    ]
+    start = timeit.default_timer()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    registry.render()
+    render_time = (timeit.default_timer() - start) * 1e3
+    return elapsed / (threads * RECORDS) * 1e6, render_time
+
+
+def main():
+    print('{:>8} {:>14} {:>12}'.format(
+        'threads', 'record (us)', 'render (ms)'
+    ))
+    for threads in THREADS:
+        print('{:>8} {:>14.2f} {:>12.2f}'.format(threads, *bench(threads)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Compare uri matching through a PathRouter with trying a regex per uri, on
+a single host holding many routes.
+
+    $ python benchmarks/bench_router.py
+"""
+import os
+import random
+import re
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from api_bouncer.routing import PathRouter  # noqa: E402
+
+SIZES = (10, 1000, 10000)
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+
+def random_uris(size, seed=42):
+    rand = random.Random(seed)
+    uris = set()
+    while len(uris) < size:
+        segments = [
+            ''.join(rand.choice(string.ascii_lowercase) for _ in range(6))
+            for _ in range(rand.randint(1, 4))
+        ]
+        uris.add('/' + '/'.join(segments))
+    return sorted(uris)
+
+
+def regex_routes(uris):
+    # Longest uris first, so the first match is the longest prefix
+    return [
+        (re.compile(re.escape(uri) + '(/|$)'), uri)
+        for uri in sorted(uris, key=len, reverse=True)
+    ]
+
+
+def regex_lookup(routes, path, method):
+    for regex, uri in routes:
+        if regex.match(path):
+            return uri
+
+
+def router_lookup(router, path, method):
+    return router.match(path, method)
+
+
+def bench(func, routes, requests):
+    """Best time per lookup, in microseconds"""
+    timer = timeit.Timer(
+        lambda: [func(routes, path, method) for path, method in requests]
+    )
+    best = min(timer.repeat(repeat=3, number=10))
+    return best / (10 * len(requests)) * 1e6
+
+
+def main():
+    print('{:>8} {:>14} {:>14} {:>14}'.format(
+        'routes', 'regex (us)', 'radix (us)', 'compile (ms)'
+    ))
+    for size in SIZES:
+        uris = random_uris(size)
+        rand = random.Random(0)
+        requests = [
+            (rand.choice(uris) + '/items/1', rand.choice(METHODS))
+            for _ in range(50)
+        ] + [('/unknown/path', 'GET')] * 10
+
+        start = timeit.default_timer()
+        router = PathRouter()
+        for uri in uris:
+            router.add(uri, [], uri)
+        compile_time = (timeit.default_timer() - start) * 1e3
+
+        regexes = regex_routes(uris)
+        for path, method in requests:
+            assert (
+                router_lookup(router, path, method) ==
+                regex_lookup(regexes, path, method)
+            )
+
+        linear = bench(regex_lookup, regexes, requests)
+        radix = bench(router_lookup, router, requests)
+        print('{:>8} {:>14.2f} {:>14.2f} {:>14.2f}'.format(
+            size, linear, radix, compile_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -26,11 +26,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'api_bouncer.middleware.bouncer.BouncerMiddleware',
-    'api_bouncer.middleware.acl.ACLMiddleware',
-    'api_bouncer.middleware.key_auth.KeyAuthMiddleware',
-    'api_bouncer.middleware.ip_restriction.IpRestrictionMiddleware',
-    'api_bouncer.middleware.request_termination.RequestTerminationMiddleware',
+    'api_bouncer.middleware.pipeline.BouncerPipeline',
 ]
 
 ROOT_URLCONF = 'tests.urls'
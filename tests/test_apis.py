@@ -129,6 +129,79 @@ class ApiTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(Api.objects.count(), 0)
 
+    def test_create_api_wildcard_hosts(self):
+        """
+        Ensure wildcards are allowed as first or last label of hosts.
+        """
+        data = {
+            'name': 'example-api',
+            'hosts': ['*.example.com', 'example.*'],
+            'upstream_url': 'https://httpbin.org'
+        }
+        self.client.login(username='john', password='john123john')
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data['hosts'] = ['*.example.*']
+        response = self.client.put(
+            '{}example-api/'.format(self.url),
+            data,
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_api_host_in_use(self):
+        """
+        Ensure hosts can't be shared by several apis.
+        """
+        Api.objects.create(
+            name='httpbin',
+            hosts=['example.com'],
+            upstream_url='https://httpbin.org'
+        )
+        data = {
+            'name': 'example-api',
+            'hosts': ['www.example.com', 'EXAMPLE.com'],
+            'upstream_url': 'https://httpbin.org'
+        }
+        self.client.login(username='john', password='john123john')
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['hosts'], ['Host already in use'])
+        self.assertEqual(Api.objects.count(), 1)
+
+    def test_create_api_shared_host(self):
+        """
+        Ensure hosts can be shared by apis routing other uris or methods.
+        """
+        Api.objects.create(
+            name='httpbin',
+            hosts=['example.com'],
+            uris=['/users'],
+            methods=['GET'],
+            upstream_url='https://httpbin.org'
+        )
+        data = {
+            'name': 'example-api',
+            'hosts': ['example.com'],
+            'uris': ['/users'],
+            'methods': ['POST'],
+            'upstream_url': 'https://httpbin.org'
+        }
+        self.client.login(username='john', password='john123john')
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data['name'] = 'other-api'
+        data['methods'] = []
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['hosts'], ['Host already in use'])
+
+        data['uris'] = ['/users/admin']
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
     def test_details_api_ok(self):
         """
         Ensure we can get the details of a api object.
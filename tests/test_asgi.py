@@ -0,0 +1,306 @@
+import asyncio
+import gzip
+import json
+import time
+import unittest
+
+from django.test import SimpleTestCase
+from rest_framework.test import APITransactionTestCase
+
+from api_bouncer.metrics import registry
+from api_bouncer.models import Api, Plugin
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from api_bouncer.async_proxy import (
+        AsyncUpstreamClients,
+        BouncerASGIHandler,
+    )
+except ImportError:
+    web = None
+
+UPSTREAM_LATENCY = 0.5
+
+
+async def slow_upstream(request):
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    body = await request.read()
+    return web.json_response({
+        'path': request.path,
+        'raw_path': request.raw_path,
+        'query': request.query_string,
+        'body': body.decode('utf-8'),
+        'headers': dict(request.headers),
+    }, headers={'Cache-Control': 'max-age=60'})
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class AsyncUpstreamClientsTests(SimpleTestCase):
+    def test_client_replaced(self):
+        """
+        Ensure clients replaced by a change of upstream_url are closed once
+        their requests are done, not under them.
+        """
+        async def replace_client():
+            clients = AsyncUpstreamClients()
+            api = Api(pk=1, name='stub', upstream_url='http://a.local')
+            client = clients.acquire(api)
+            clients.release(clients.acquire(api))
+            api.upstream_url = 'http://b.local'
+            new_client = clients.acquire(api)
+            self.assertIsNot(new_client, client)
+            await asyncio.sleep(0)
+            self.assertFalse(client.session.closed)
+
+            clients.release(client)
+            await asyncio.sleep(0)
+            self.assertTrue(client.session.closed)
+            self.assertFalse(new_client.session.closed)
+            clients.release(new_client)
+            await clients.close()
+            self.assertTrue(new_client.session.closed)
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        loop.run_until_complete(replace_client())
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class ASGIHandlerTests(APITransactionTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.upstream_handler)
+        self.upstream_calls = 0
+        self.upstream = TestServer(app)
+        self.loop.run_until_complete(self.upstream.start_server())
+
+        self.example_api = Api.objects.create(
+            name='stub',
+            hosts=['stub.local'],
+            upstream_url=str(self.upstream.make_url('')).rstrip('/')
+        )
+        self.handler = BouncerASGIHandler()
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.handler.close())
+        self.loop.run_until_complete(self.upstream.close())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    async def upstream_handler(self, request):
+        self.upstream_calls += 1
+        return await slow_upstream(request)
+
+    async def call(self, path, method='GET', body=b'', headers=None,
+                   query_string=b'msg=Bounce'):
+        messages = []
+        headers = headers or [(b'host', b'stub.local')]
+        if body:
+            headers.append((b'content-length', str(len(body)).encode()))
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.handler({
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query_string,
+            'headers': headers,
+        }, receive, send)
+
+        status = messages[0]['status']
+        self.headers = dict(messages[0]['headers'])
+        content = b''.join(m.get('body', b'') for m in messages[1:])
+        return status, content
+
+    def test_proxy_request(self):
+        """
+        Ensure requests are proxied to the upstream with their body.
+        """
+        status, content = self.loop.run_until_complete(
+            self.call('/post', method='POST', body=b'{"msg": "Bounce"}')
+        )
+        data = json.loads(content.decode('utf-8'))
+        self.assertEqual(status, 200)
+        self.assertEqual(data['path'], '/post')
+        self.assertEqual(data['query'], 'msg=Bounce')
+        self.assertEqual(data['body'], '{"msg": "Bounce"}')
+        self.assertEqual(data['headers']['Content-Length'], '17')
+
+    def test_encoded_url(self):
+        """
+        Ensure encoded paths and queries reach the upstream encoded.
+        """
+        status, content = self.loop.run_until_complete(self.call(
+            '/a b/\u00e9/100%',
+            query_string=b'q=a%20b&name=%C3%A9',
+        ))
+        data = json.loads(content.decode('utf-8'))
+        self.assertEqual(status, 200)
+        self.assertEqual(data['path'], '/a b/\u00e9/100%')
+        self.assertEqual(
+            data['raw_path'],
+            '/a%20b/%C3%A9/100%25?q=a%20b&name=%C3%A9'
+        )
+        self.assertEqual(data['query'], 'q=a b&name=\u00e9')
+
+    def test_request_counted(self):
+        """
+        Ensure proxied requests are counted and timed, even without plugins
+        acting on responses.
+        """
+        registry.clear()
+        status, content = self.loop.run_until_complete(self.call('/get'))
+        self.assertEqual(status, 200)
+
+        series = registry.collect()
+        self.assertEqual(
+            series[('bouncer_requests_total', ('stub', '', '2xx'))],
+            1
+        )
+        self.assertEqual(
+            series[('bouncer_request_duration_seconds', ('stub', ''))].count,
+            1
+        )
+
+    def test_connect_timeout_retried(self):
+        """
+        Ensure requests are retried when connecting to the upstream timed
+        out, as under WSGI.
+        """
+        request_upstream = self.handler.request_upstream
+        attempts = []
+
+        async def connect_timeout_once(*args):
+            attempts.append(args)
+            if len(attempts) == 1:
+                raise getattr(
+                    aiohttp,
+                    'ConnectionTimeoutError',
+                    aiohttp.ServerTimeoutError,
+                )('Connection timeout to host stub.local')
+            return await request_upstream(*args)
+
+        self.handler.request_upstream = connect_timeout_once
+        status, content = self.loop.run_until_complete(self.call('/get'))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(attempts), 2)
+
+    def test_unknown_host(self):
+        """
+        Ensure requests to unknown hosts get an empty response.
+        """
+        status, content = self.loop.run_until_complete(
+            self.call('/get', headers=[(b'host', b'the-unknown.com')])
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(content.decode('utf-8')), {})
+
+    def test_plugins_applied(self):
+        """
+        Ensure plugin middleware can stop requests before the upstream.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-termination',
+            config={'status_code': 503, 'message': 'Maintenance'}
+        )
+        status, content = self.loop.run_until_complete(self.call('/get'))
+        self.assertEqual(status, 503)
+        self.assertEqual(
+            json.loads(content.decode('utf-8')),
+            {'message': 'Maintenance'}
+        )
+
+    def test_request_size_limited(self):
+        """
+        Ensure bodies over the request-size-limiting limit get a 413.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-size-limiting',
+            config={'allowed_payload_size': 10, 'size_unit': 'bytes'}
+        )
+        status, content = self.loop.run_until_complete(
+            self.call('/post', method='POST', body=b'{"msg": "Bounce"}')
+        )
+        self.assertEqual(status, 413)
+
+    def test_response_compressed(self):
+        """
+        Ensure streamed upstream bodies are compressed as they arrive.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='response-compression',
+            config={'min_size': 0}
+        )
+        status, content = self.loop.run_until_complete(self.call(
+            '/get',
+            headers=[(b'host', b'stub.local'), (b'accept-encoding', b'gzip')]
+        ))
+        data = json.loads(gzip.decompress(content).decode('utf-8'))
+        self.assertEqual(status, 200)
+        self.assertEqual(data['path'], '/get')
+
+    def test_response_cached(self):
+        """
+        Ensure upstream responses are buffered and kept by proxy-cache.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='proxy-cache',
+            config={}
+        )
+        for cache_status in (b'Miss', b'Hit'):
+            status, content = self.loop.run_until_complete(self.call('/get'))
+            self.assertEqual(status, 200)
+            self.assertEqual(self.headers[b'X-Cache-Status'], cache_status)
+            self.assertEqual(
+                json.loads(content.decode('utf-8'))['path'],
+                '/get'
+            )
+        self.assertEqual(self.upstream_calls, 1)
+
+    def test_requests_coalesced(self):
+        """
+        Ensure identical concurrent requests share one upstream response.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-coalescing',
+            config={}
+        )
+
+        async def concurrent_calls():
+            calls = [self.call('/get') for _ in range(10)]
+            return await asyncio.gather(*calls)
+
+        results = self.loop.run_until_complete(concurrent_calls())
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(results[0][0], 200)
+        self.assertEqual(self.upstream_calls, 1)
+
+    def test_concurrent_slow_upstream_calls(self):
+        """
+        Ensure concurrent slow upstream calls overlap, finishing in about
+        one upstream latency instead of one after another.
+        """
+        async def concurrent_calls():
+            calls = [self.call('/get') for _ in range(50)]
+            return await asyncio.gather(*calls)
+
+        start = time.monotonic()
+        results = self.loop.run_until_complete(concurrent_calls())
+        elapsed = time.monotonic() - start
+
+        self.assertTrue(all(status == 200 for status, _ in results))
+        self.assertLess(elapsed, UPSTREAM_LATENCY * 3)
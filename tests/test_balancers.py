@@ -0,0 +1,208 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.balancers import (
+    ConsistentHashBalancer,
+    LeastConnectionsBalancer,
+    RoundRobinBalancer,
+)
+from api_bouncer.models import Api, Target, Upstream
+from api_bouncer.routing import routing_table
+
+User = get_user_model()
+
+
+class BalancerTests(SimpleTestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_round_robin(self):
+        """
+        Ensure targets get requests in proportion to their weight.
+        """
+        balancer = RoundRobinBalancer([
+            ('http://a:80', 300),
+            ('http://b:80', 100),
+            ('http://c:80', 0),
+            ('http://d:80', 200),
+        ])
+        targets = [balancer.select(self.request) for _ in range(600)]
+        self.assertEqual(Counter(targets), {
+            'http://a:80': 300,
+            'http://b:80': 100,
+            'http://d:80': 200,
+        })
+        # Requests are interleaved rather than sent in batches
+        self.assertEqual(len(set(targets[:6])), 3)
+
+    def test_round_robin_order(self):
+        """
+        Ensure targets of uneven weights take interleaved turns.
+        """
+        balancer = RoundRobinBalancer([('a', 1), ('b', 3), ('d', 2)])
+        self.assertEqual(
+            [balancer.select(self.request) for _ in range(12)],
+            ['b', 'd', 'b', 'a', 'b', 'd'] * 2
+        )
+
+    def test_least_connections(self):
+        """
+        Ensure targets with the fewest requests in flight are picked.
+        """
+        balancer = LeastConnectionsBalancer([
+            ('http://a:80', 100),
+            ('http://b:80', 200),
+        ])
+        targets = [balancer.select(self.request) for _ in range(6)]
+        self.assertEqual(Counter(targets), {
+            'http://a:80': 2,
+            'http://b:80': 4,
+        })
+
+        balancer.release('http://a:80')
+        balancer.release('http://a:80')
+        self.assertEqual(balancer.select(self.request), 'http://a:80')
+        for _ in range(100):
+            balancer.release(balancer.select(self.request))
+        self.assertLessEqual(len(balancer.heap), 4 * 2 + 64)
+
+    def test_consistent_hash(self):
+        """
+        Ensure keys stick to a target, and only a share of them move when a
+        target is added.
+        """
+        targets = [('http://t{}:80'.format(i), 100) for i in range(10)]
+        balancer = ConsistentHashBalancer(targets, 'header', 'X-User')
+        requests = [
+            RequestFactory().get('/', HTTP_X_USER='user-{}'.format(i))
+            for i in range(1000)
+        ]
+        before = [balancer.select(request) for request in requests]
+        self.assertEqual(before, [balancer.select(r) for r in requests])
+        self.assertEqual(len(set(before)), 10)
+
+        targets.append(('http://t10:80', 100))
+        balancer = ConsistentHashBalancer(targets, 'header', 'X-User')
+        after = [balancer.select(request) for request in requests]
+        moved = sum(1 for a, b in zip(before, after) if a != b)
+        self.assertLess(moved, 200)
+        self.assertTrue(all(
+            b == 'http://t10:80' for a, b in zip(before, after) if a != b
+        ))
+
+    def test_consistent_hash_falls_back_to_client_ip(self):
+        """
+        Ensure requests without a hash key are hashed on the client ip.
+        """
+        balancer = ConsistentHashBalancer(
+            [('http://t{}:80'.format(i), 100) for i in range(10)],
+            'consumer'
+        )
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            balancer.select(request),
+            balancer.select(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1'))
+        )
+
+
+class UpstreamTests(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'john',
+            'john@localhost.local',
+            'john123john'
+        )
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org/v1'
+        )
+        self.url = '/apis/{}/'.format(self.example_api.name)
+
+    def test_api_upstream(self):
+        """
+        Ensure the upstream of an api can be set and read.
+        """
+        self.client.login(username='john', password='john123john')
+        response = self.client.get(self.url + 'upstream/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        data = {'algorithm': 'consistent-hash', 'hash_on': 'header'}
+        response = self.client.put(self.url + 'upstream/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data['hash_on_header'] = 'X-User'
+        response = self.client.put(self.url + 'upstream/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url + 'upstream/')
+        self.assertEqual(response.data['algorithm'], 'consistent-hash')
+        self.assertEqual(response.data['api'], 'httpbin')
+        self.assertEqual(response.data['targets'], [])
+
+    def test_api_add_target(self):
+        """
+        Ensure targets can be added, and their weight changed.
+        """
+        self.client.login(username='john', password='john123john')
+        data = {'target': '10.0.0.1:8080', 'weight': 50}
+        response = self.client.post(self.url + 'targets/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data['weight'] = 0
+        response = self.client.post(self.url + 'targets/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        target = Target.objects.get()
+        self.assertEqual(target.weight, 0)
+        self.assertEqual(target.upstream.algorithm, 'round-robin')
+
+        data = {'target': 'http://10.0.0.2'}
+        response = self.client.post(self.url + 'targets/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_route_balances_targets(self):
+        """
+        Ensure requests are sent to the targets, on the upstream_url path.
+        """
+        route = routing_table.get('httpbin.org')
+        self.assertIsNone(route.balancer)
+        self.assertEqual(
+            route.get_upstream_url('/get'),
+            'https://httpbin.org/v1/get'
+        )
+
+        upstream = Upstream.objects.create(api=self.example_api)
+        for target in ('10.0.0.1:8080', '10.0.0.2:8080'):
+            Target.objects.create(upstream=upstream, target=target)
+
+        route = routing_table.get('httpbin.org')
+        request = RequestFactory().get('/get')
+        urls = set(
+            route.get_upstream_url('/get', route.balancer.select(request))
+            for _ in range(2)
+        )
+        self.assertEqual(urls, {
+            'https://10.0.0.1:8080/v1/get',
+            'https://10.0.0.2:8080/v1/get',
+        })
+
+    def test_route_without_targets(self):
+        """
+        Ensure upstreams without targets of any weight get no request,
+        rather than their requests going to the upstream_url.
+        """
+        upstream = Upstream.objects.create(api=self.example_api)
+        request = RequestFactory().get('/get')
+        self.assertIsNone(
+            routing_table.get('httpbin.org').select_target(request)
+        )
+
+        for target in ('10.0.0.1:8080', '10.0.0.2:8080'):
+            Target.objects.create(upstream=upstream, target=target, weight=0)
+        self.assertIsNone(
+            routing_table.get('httpbin.org').select_target(request)
+        )
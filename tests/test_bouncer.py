@@ -1,8 +1,14 @@
+import json
+import uuid
+
 from django.contrib.auth import get_user_model
+from django.test import RequestFactory
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api_bouncer.models import Api
+from api_bouncer.middleware.bouncer import BouncerMiddleware
+from api_bouncer.models import Api, Consumer, ConsumerACL
+from api_bouncer.routing import routing_table
 
 User = get_user_model()
 
@@ -30,6 +36,22 @@ class BouncerTests(APITestCase):
         self.assertEqual(response.status_code, 418)
         self.assertIn('teapot', response.content.decode('utf-8'))
 
+    def test_bounce_api_request_strip_uri(self):
+        """
+        Ensure requests are routed by uri, which is stripped if asked to.
+        """
+        Api.objects.create(
+            name='httpbin-anything',
+            hosts=['httpbin.org'],
+            uris=['/proxied'],
+            strip_uri=True,
+            upstream_url='https://httpbin.org/anything'
+        )
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.get('/proxied/teapot')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['url'].endswith('/anything/teapot'))
+
     def test_bounce_api_request_unknown_host(self):
         """
         Ensure we send a response when the hosts making the request is not
@@ -40,3 +62,101 @@ class BouncerTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), {})
+
+    def test_bounce_api_request_streamed(self):
+        """
+        Ensure responses above the threshold are streamed when enabled.
+        """
+        self.example_api.stream_response = True
+        self.example_api.stream_threshold = 512
+        self.example_api.save()
+
+        url = '/bytes/1024'
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(b''.join(response.streaming_content)), 1024)
+
+    def test_bounce_api_request_buffered_below_threshold(self):
+        """
+        Ensure responses below the threshold are buffered.
+        """
+        self.example_api.stream_response = True
+        self.example_api.stream_threshold = 2048
+        self.example_api.save()
+
+        url = '/bytes/1024'
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.content), 1024)
+
+    def test_bounce_api_request_json_body(self):
+        """
+        Ensure request bodies are forwarded as-is, whatever their type.
+        """
+        url = '/post'
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.post(
+            url,
+            data=json.dumps({'msg': 'Bounce'}),
+            content_type='application/json'
+        )
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(data['json'], {'msg': 'Bounce'})
+        self.assertEqual(data['headers']['Content-Length'], '17')
+
+    def test_bounce_api_request_binary_body(self):
+        """
+        Ensure binary request bodies are forwarded as-is.
+        """
+        url = '/post'
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.post(
+            url,
+            data=b'\x00\x01\x02',
+            content_type='application/octet-stream'
+        )
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            data['data'],
+            'data:application/octet-stream;base64,AAEC'
+        )
+
+    def test_consumer_loaded_lazily(self):
+        """
+        Ensure consumers are only loaded, once, when a plugin uses them.
+        """
+        consumer = Consumer.objects.create(username='django')
+        ConsumerACL.objects.create(consumer=consumer, group='group1')
+        routing_table.get('httpbin.org')
+        request = RequestFactory().get(
+            '/get',
+            HTTP_HOST='httpbin.org',
+            HTTP_CONSUMER_ID=str(consumer.id)
+        )
+
+        with self.assertNumQueries(0):
+            BouncerMiddleware().process_request(request)
+        with self.assertNumQueries(1):
+            bouncer_consumer = request.META['BOUNCER_CONSUMER']
+            self.assertEqual(bouncer_consumer.username, 'django')
+            self.assertEqual(bouncer_consumer.groups, frozenset(['group1']))
+            self.assertEqual(bouncer_consumer.id, consumer.id)
+
+    def test_unknown_consumer_loaded_lazily(self):
+        """
+        Ensure unknown or invalid consumer ids load no consumer.
+        """
+        for consumer_id in ['', 'not-an-uuid', str(uuid.uuid4())]:
+            request = RequestFactory().get(
+                '/get',
+                HTTP_HOST='httpbin.org',
+                HTTP_CONSUMER_ID=consumer_id
+            )
+            BouncerMiddleware().process_request(request)
+            self.assertFalse(request.META['BOUNCER_CONSUMER'])
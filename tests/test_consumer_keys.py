@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api_bouncer.models import Consumer, ConsumerKey
+from api_bouncer.models import Consumer, ConsumerKey, hash_key
 
 User = get_user_model()
 
@@ -57,7 +57,11 @@ class ConsumerKeyTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(ConsumerKey.objects.count(), 1)
         self.assertEqual(ConsumerKey.objects.get().consumer.username, 'django')
-        self.assertEqual(ConsumerKey.objects.get().key, data['key'])
+        self.assertEqual(response.data['key'], data['key'])
+        self.assertEqual(
+            ConsumerKey.objects.get().key_digest,
+            hash_key(data['key'])
+        )
 
     def test_create_consumer_key_given_key_too_short(self):
         """
@@ -82,3 +86,40 @@ class ConsumerKeyTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertNotEqual(response.data['key'], '')
+
+    def test_create_consumer_key_stored_hashed(self):
+        """
+        Ensure keys are only stored as a digest and can't be read back.
+        """
+        data = {'key': 'abc123456'}
+        self.client.login(username='john', password='john123john')
+        url = self.url.format(self.consumer.username)
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        consumer_key = ConsumerKey.objects.get()
+        self.assertEqual(len(consumer_key.key_digest), 64)
+        self.assertNotIn(data['key'], consumer_key.key_digest)
+        self.assertIsNone(consumer_key.key)
+
+    def test_create_consumer_key_duplicated(self):
+        """
+        Ensure a key can't be used twice.
+        """
+        data = {'key': 'abc123456'}
+        other_consumer = Consumer.objects.create(username='flask')
+        self.client.login(username='john', password='john123john')
+        response = self.client.post(
+            self.url.format(self.consumer.username),
+            data,
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(
+            self.url.format(other_consumer.username),
+            data,
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ConsumerKey.objects.count(), 1)
@@ -0,0 +1,110 @@
+import time
+
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from api_bouncer.cache import LRUCache
+from api_bouncer.credentials import credential_cache, get_credential
+from api_bouncer.models import Consumer, ConsumerACL, ConsumerKey
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_least_recently_used_evicted(self):
+        """
+        Ensure the least recently used entries are evicted first.
+        """
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """
+        Ensure entries expire after their ttl.
+        """
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_hit_miss_counters(self):
+        """
+        Ensure hits and misses are counted.
+        """
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', None)
+        cache.get('a', 'missing')
+        cache.get('b', 'missing')
+        cache.get('c', 'missing')
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 2)
+
+
+class CredentialCacheTests(APITestCase):
+    def setUp(self):
+        credential_cache.clear()
+        self.consumer = Consumer.objects.create(username='django')
+        self.consumer_key = ConsumerKey.objects.create(
+            consumer=self.consumer,
+            key='you_know_nothing'
+        )
+        ConsumerACL.objects.create(consumer=self.consumer, group='group1')
+
+    def test_valid_key_cached(self):
+        """
+        Ensure valid keys hit the database only once.
+        """
+        credential = get_credential('you_know_nothing')
+        self.assertEqual(credential.id, self.consumer.id)
+        self.assertEqual(credential.username, 'django')
+        self.assertEqual(credential.groups, frozenset(['group1']))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_credential('you_know_nothing'), credential)
+        self.assertEqual(credential_cache.hits, 1)
+        self.assertEqual(credential_cache.misses, 1)
+
+    def test_invalid_key_cached(self):
+        """
+        Ensure invalid keys are cached too.
+        """
+        self.assertIsNone(get_credential('winter_is_coming'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_credential('winter_is_coming'))
+            self.assertIsNone(get_credential(None))
+
+    def test_invalidated_on_key_change(self):
+        """
+        Ensure cached keys are forgotten when keys are added or deleted.
+        """
+        self.assertIsNone(get_credential('winter_is_coming'))
+        ConsumerKey.objects.create(
+            consumer=self.consumer,
+            key='winter_is_coming'
+        )
+        self.assertIsNotNone(get_credential('winter_is_coming'))
+
+        get_credential('you_know_nothing')
+        self.consumer_key.delete()
+        self.assertIsNone(get_credential('you_know_nothing'))
+
+    def test_invalidated_on_consumer_change(self):
+        """
+        Ensure cached consumers are forgotten when they or their acls change.
+        """
+        get_credential('you_know_nothing')
+        self.consumer.username = 'flask'
+        self.consumer.save()
+        self.assertEqual(get_credential('you_know_nothing').username, 'flask')
+
+        ConsumerACL.objects.create(consumer=self.consumer, group='group2')
+        self.assertEqual(
+            get_credential('you_know_nothing').groups,
+            frozenset(['group1', 'group2'])
+        )
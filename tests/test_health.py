@@ -0,0 +1,184 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.balancers import (
+    ConsistentHashBalancer,
+    LeastConnectionsBalancer,
+    RoundRobinBalancer,
+)
+from api_bouncer.health import get_healthchecks, HealthChecker
+from api_bouncer.models import Api, Upstream
+
+User = get_user_model()
+
+
+class FakeResponse(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+class FakeSession(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return FakeResponse(self.status_code)
+
+
+class HealthCheckerTests(SimpleTestCase):
+    def get_checker(self, **config):
+        checker = HealthChecker(get_healthchecks(config))
+        checker.set_targets(['http://a:80', 'http://b:80'])
+        return checker
+
+    def test_circuit_breaker(self):
+        """
+        Ensure consecutive failures open the circuit of a target until its
+        cool-down is over, and a single failure reopens it afterwards.
+        """
+        checker = self.get_checker(passive={'failures': 2, 'cooldown': 0.1})
+        checker.report('http://a:80', error=True)
+        checker.report('http://a:80', status=200)
+        checker.report('http://a:80', status=503)
+        self.assertTrue(checker.is_available('http://a:80'))
+
+        checker.report('http://a:80', error=True)
+        self.assertFalse(checker.is_available('http://a:80'))
+        self.assertTrue(checker.is_available('http://b:80'))
+        self.assertEqual(checker.get_status()[0]['circuit'], 'open')
+
+        time.sleep(0.15)
+        self.assertTrue(checker.is_available('http://a:80'))
+        checker.report('http://a:80', error=True)
+        self.assertFalse(checker.is_available('http://a:80'))
+
+        time.sleep(0.15)
+        checker.report('http://a:80', status=200)
+        checker.report('http://a:80', error=True)
+        self.assertTrue(checker.is_available('http://a:80'))
+
+    def test_circuit_breaker_timeouts(self):
+        """
+        Ensure timeouts are counted apart from other failures.
+        """
+        checker = self.get_checker(passive={'failures': 0, 'timeouts': 1})
+        for _ in range(10):
+            checker.report('http://a:80', error=True)
+        self.assertTrue(checker.is_available('http://a:80'))
+        checker.report('http://a:80', timeout=True)
+        self.assertFalse(checker.is_available('http://a:80'))
+
+    def test_active_probes(self):
+        """
+        Ensure targets failing probes are unhealthy until enough probes
+        succeed.
+        """
+        checker = self.get_checker(active={
+            'interval': 5,
+            'path': '/status',
+            'failures': 2,
+            'successes': 2,
+        })
+        session = FakeSession(500)
+        checker.probe(session)
+        self.assertTrue(checker.is_available('http://a:80'))
+        checker.probe(session)
+        self.assertFalse(checker.is_available('http://a:80'))
+        self.assertIn('http://a:80/status', session.urls)
+
+        session.status_code = 200
+        checker.probe(session)
+        self.assertFalse(checker.is_available('http://a:80'))
+        checker.probe(session)
+        self.assertTrue(checker.is_available('http://a:80'))
+
+    def test_balancers_skip_unavailable_targets(self):
+        """
+        Ensure balancers only pick available targets.
+        """
+        targets = [('http://t{}:80'.format(i), 100) for i in range(5)]
+        available = {'http://t3:80'}
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        for balancer in (
+            RoundRobinBalancer(targets),
+            LeastConnectionsBalancer(targets),
+            ConsistentHashBalancer(targets),
+        ):
+            for _ in range(10):
+                target = balancer.select(request, available.__contains__)
+                self.assertEqual(target, 'http://t3:80')
+                balancer.release(target)
+            self.assertIsNone(balancer.select(request, lambda target: False))
+
+
+class HealthTests(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'john',
+            'john@localhost.local',
+            'john123john'
+        )
+        # Nothing listens on port 1, so connections are refused right away
+        self.example_api = Api.objects.create(
+            name='down',
+            hosts=['down.example.com'],
+            upstream_url='http://127.0.0.1:1'
+        )
+        self.url = '/apis/{}/'.format(self.example_api.name)
+
+    def test_api_healthchecks(self):
+        """
+        Ensure health checks are validated and set on the api upstream.
+        """
+        self.client.login(username='john', password='john123john')
+        data = {'healthchecks': {'passive': {'failures': -1}}}
+        response = self.client.put(self.url + 'upstream/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data = {'healthchecks': {'passive': {'failures': 2}}}
+        response = self.client.put(self.url + 'upstream/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url + 'health/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        passive = response.data['healthchecks']['passive']
+        self.assertEqual(passive['failures'], 2)
+        self.assertEqual(passive['timeouts'], 3)
+        target = response.data['targets'][0]
+        self.assertEqual(target['target'], 'http://127.0.0.1:1')
+        self.assertEqual(target['circuit'], 'closed')
+
+    def test_bounce_unavailable_upstream(self):
+        """
+        Ensure failed connections get a 502, and a 503 without waiting once
+        the circuit is open.
+        """
+        Upstream.objects.create(
+            api=self.example_api,
+            healthchecks={'passive': {'failures': 2, 'cooldown': 60}}
+        )
+        self.client.credentials(HTTP_HOST='down.example.com')
+        for _ in range(2):
+            response = self.client.get('/get')
+            self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+
+        response = self.client.get('/get')
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(response.json(), {'message': 'No healthy upstream'})
+
+        self.client.credentials()
+        self.client.login(username='john', password='john123john')
+        response = self.client.get(self.url + 'health/')
+        self.assertEqual(response.data['targets'][0]['circuit'], 'open')
@@ -0,0 +1,160 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import resolve
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.metrics import (
+    get_bucket,
+    get_bucket_bounds,
+    HistogramData,
+    Registry,
+    registry,
+)
+from api_bouncer.middleware.pipeline import BouncerPipeline
+from api_bouncer.models import Api, Plugin
+from api_bouncer.views import api_bouncer
+
+User = get_user_model()
+
+
+class HistogramTests(SimpleTestCase):
+    def test_buckets(self):
+        """
+        Ensure latencies fall in buckets at most 1/16 wide of their value.
+        """
+        for microseconds in (0, 1, 31, 32, 33, 1000, 123456, 2 ** 35):
+            index = get_bucket(microseconds)
+            lowest, highest = get_bucket_bounds(index)
+            self.assertLessEqual(lowest, microseconds)
+            self.assertLessEqual(microseconds, highest)
+            self.assertLessEqual(highest - lowest, microseconds / 16)
+        self.assertEqual(get_bucket(32) + 1, get_bucket(34))
+
+    def test_quantiles_and_cumulative_counts(self):
+        """
+        Ensure quantiles and exported buckets are derived from the counts.
+        """
+        data = HistogramData()
+        for milliseconds in range(1, 101):
+            data.record(milliseconds / 1000)
+        self.assertAlmostEqual(data.get_quantile(0.5), 0.05, delta=0.004)
+        self.assertAlmostEqual(data.get_quantile(0.99), 0.099, delta=0.007)
+        self.assertEqual(data.get_cumulative_counts([0.0105, 1]), [10, 100])
+        self.assertAlmostEqual(data.sum, 5.05)
+
+
+class RegistryTests(SimpleTestCase):
+    def test_merge_thread_shards(self):
+        """
+        Ensure series recorded by each thread are merged when collected.
+        """
+        metrics = Registry()
+        counter = metrics.counter('requests_total', 'Requests.', ['api'])
+        histogram = metrics.histogram('duration_seconds', 'Duration.')
+
+        def record():
+            for _ in range(1000):
+                counter.inc('httpbin')
+                histogram.observe(0.002)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        series = metrics.collect()
+        self.assertEqual(series[('requests_total', ('httpbin',))], 4000)
+        self.assertEqual(series[('duration_seconds', ())].count, 4000)
+
+        text = metrics.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{api="httpbin"} 4000', text)
+        self.assertIn('duration_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('duration_seconds_bucket{le="0.0025"} 4000', text)
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 4000', text)
+        self.assertIn('duration_seconds_count 4000', text)
+
+    def test_fold_dead_shards(self):
+        """
+        Ensure shards of threads that exited are folded, keeping their
+        series.
+        """
+        metrics = Registry()
+        counter = metrics.counter('requests_total', 'Requests.', ['api'])
+        histogram = metrics.histogram('duration_seconds', 'Duration.')
+
+        def record():
+            counter.inc('httpbin')
+            histogram.observe(0.002)
+
+        for _ in range(10):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+        record()
+
+        series = metrics.collect()
+        self.assertEqual(series[('requests_total', ('httpbin',))], 11)
+        self.assertEqual(series[('duration_seconds', ())].count, 11)
+        self.assertEqual(list(metrics._shards), [threading.current_thread()])
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'john',
+            'john@localhost.local',
+            'john123john'
+        )
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-termination',
+            config={'status_code': 503}
+        )
+        registry.clear()
+
+    def test_metrics_endpoint(self):
+        """
+        Ensure requests, routing and plugins are measured and exposed to
+        admins only.
+        """
+        pipeline = BouncerPipeline(lambda request: HttpResponse())
+        for _ in range(3):
+            pipeline(RequestFactory().get('/get', HTTP_HOST='httpbin.org'))
+
+        response = self.client.get('/_bouncer/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.login(username='john', password='john123john')
+        response = self.client.get('/_bouncer/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode('utf-8')
+        self.assertIn(
+            'bouncer_requests_total{api="httpbin",consumer="",status="5xx"} 3',
+            text
+        )
+        self.assertIn(
+            'bouncer_request_duration_seconds_count'
+            '{api="httpbin",consumer=""} 3',
+            text
+        )
+        self.assertIn(
+            'bouncer_plugin_duration_seconds_count{api="httpbin",'
+            'plugin="request-termination",hook="request"} 3',
+            text
+        )
+        self.assertIn('bouncer_routing_duration_seconds_count', text)
+
+        # Paths of proxied apis aren't shadowed
+        self.assertEqual(resolve('/metrics/').func, api_bouncer)
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.test import RequestFactory
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api_bouncer.models import Api, Consumer, ConsumerACL
+from api_bouncer.credentials import get_consumer
+from api_bouncer.models import Api, Consumer, ConsumerACL, ConsumerKey
+from api_bouncer.plugins.acl import ACLPlugin
 
 User = get_user_model()
 
@@ -148,3 +151,44 @@ class ACLMiddlewareTests(APITestCase):
         self.client.credentials(HTTP_HOST='httpbin.org')
         response = self.client.get('/get')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_check_acl_without_queries(self):
+        """
+        Ensure acls are checked against loaded groups without queries.
+        """
+        consumer = get_consumer(self.consumer.pk)
+        request = RequestFactory().get('/get')
+        request.META['BOUNCER_CONSUMER'] = consumer
+        whitelist = ACLPlugin({'whitelist': ['group1'], 'blacklist': []})
+        blacklist = ACLPlugin({'whitelist': [], 'blacklist': ['group1']})
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(whitelist.process_request(request))
+            response = blacklist.process_request(request)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_acl_uses_authenticated_consumer(self):
+        """
+        Ensure acls apply to the consumer authenticated by key-auth.
+        """
+        ConsumerKey.objects.create(
+            consumer=self.consumer,
+            key='you_know_nothing'
+        )
+        self.client.login(username='john', password='john123john')
+        self.client.post(self.url, {'name': 'key-auth'})
+        data_ok = {
+            'name': 'acl',
+            'config': {
+                'whitelist': ['group1'],
+            }
+        }
+        response = self.client.post(self.url, data_ok, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(
+            HTTP_HOST='httpbin.org',
+            HTTP_APIKEY='you_know_nothing'
+        )
+        response = self.client.get('/get')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,249 @@
+import shutil
+import tempfile
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.cache import SizedLRUCache
+from api_bouncer.middleware.pipeline import BouncerPipeline
+from api_bouncer.models import Api, Plugin
+from api_bouncer.response_cache import response_caches
+from api_bouncer.schemas import defaults
+
+
+class SizedLRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        """
+        Ensure entries are evicted once their total size is above maxsize.
+        """
+        cache = SizedLRUCache(maxsize=10)
+        cache.set('a', 1, size=4)
+        cache.set('b', 2, size=4)
+        cache.get('a')
+        cache.set('c', 3, size=4)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.size, 8)
+
+        self.assertFalse(cache.set('d', 4, size=11))
+        self.assertIsNone(cache.get('d'))
+
+        cache.resize(4)
+        self.assertEqual(len(cache), 1)
+
+
+class ProxyCacheMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        self.upstream_calls = []
+        self.upstream_status = 200
+        self.upstream_headers = {'ETag': '"v1"', 'Cache-Control': 'public'}
+        self.pipeline = BouncerPipeline(self.upstream)
+
+    def tearDown(self):
+        response_caches.discard(self.example_api.pk)
+
+    def upstream(self, request):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        self.upstream_calls.append(if_none_match)
+        if if_none_match == '"v1"':
+            return HttpResponse(status=304)
+
+        response = HttpResponse(
+            'call {}'.format(len(self.upstream_calls)),
+            status=self.upstream_status
+        )
+        for name, value in self.upstream_headers.items():
+            response[name] = value
+        return response
+
+    def add_proxy_cache(self, **config):
+        Plugin.objects.create(
+            api=self.example_api,
+            name='proxy-cache',
+            config=config
+        )
+
+    def bounce(self, path='/get', method='get', **extra):
+        request = getattr(RequestFactory(), method)(
+            path,
+            HTTP_HOST='httpbin.org',
+            **extra
+        )
+        return self.pipeline(request)
+
+    def test_proxy_cache_hit(self):
+        """
+        Ensure cacheable responses are served from cache afterwards.
+        """
+        self.add_proxy_cache()
+        response = self.bounce()
+        self.assertEqual(response['X-Cache-Status'], 'Miss')
+
+        response = self.bounce()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache-Status'], 'Hit')
+        self.assertEqual(response['ETag'], '"v1"')
+        self.assertEqual(response.content, b'call 1')
+        self.assertEqual(len(self.upstream_calls), 1)
+
+        response = self.bounce(path='/get?page=2')
+        self.assertEqual(response['X-Cache-Status'], 'Miss')
+
+    def test_proxy_cache_if_none_match(self):
+        """
+        Ensure clients holding the cached version get a 304.
+        """
+        self.add_proxy_cache()
+        self.bounce()
+        response = self.bounce(HTTP_IF_NONE_MATCH='"v1"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(self.upstream_calls), 1)
+
+    def test_proxy_cache_bypass(self):
+        """
+        Ensure uncacheable methods and no-cache requests skip the cache.
+        """
+        self.add_proxy_cache()
+        self.bounce()
+        response = self.bounce(method='post')
+        self.assertEqual(response['X-Cache-Status'], 'Bypass')
+        response = self.bounce(HTTP_CACHE_CONTROL='no-cache')
+        self.assertEqual(response['X-Cache-Status'], 'Bypass')
+        self.assertEqual(len(self.upstream_calls), 3)
+
+    def test_proxy_cache_honors_cache_control(self):
+        """
+        Ensure private and no-store responses aren't stored.
+        """
+        self.add_proxy_cache()
+        for cache_control in ('private', 'no-store', 'max-age=0'):
+            self.upstream_headers['Cache-Control'] = cache_control
+            self.bounce()
+            response = self.bounce()
+            self.assertEqual(response['X-Cache-Status'], 'Miss')
+
+    def test_proxy_cache_needs_freshness(self):
+        """
+        Ensure only responses with a lifetime, or marked public, are stored.
+        """
+        self.add_proxy_cache()
+        self.upstream_headers = {}
+        self.bounce()
+        response = self.bounce()
+        self.assertEqual(response['X-Cache-Status'], 'Miss')
+
+        self.upstream_headers = {'Expires': 'Thu, 01 Jan 2099 00:00:00 GMT'}
+        self.bounce(path='/expires')
+        response = self.bounce(path='/expires')
+        self.assertEqual(response['X-Cache-Status'], 'Hit')
+
+    def test_proxy_cache_credentials(self):
+        """
+        Ensure responses are cached per consumer, and responses to requests
+        with credentials only if public.
+        """
+        self.add_proxy_cache()
+        self.upstream_headers = {'Cache-Control': 'max-age=60'}
+        self.bounce(HTTP_X_CONSUMER_ID='1')
+        response = self.bounce(HTTP_X_CONSUMER_ID='2')
+        self.assertEqual(response['X-Cache-Status'], 'Miss')
+        response = self.bounce(HTTP_X_CONSUMER_ID='1')
+        self.assertEqual(response['X-Cache-Status'], 'Hit')
+
+        for credentials in (
+            {'HTTP_AUTHORIZATION': 'Bearer secret'},
+            {'HTTP_COOKIE': 'session=secret'},
+        ):
+            self.bounce(path='/private', **credentials)
+            response = self.bounce(path='/private')
+            self.assertEqual(response['X-Cache-Status'], 'Miss')
+            response_caches.discard(self.example_api.pk)
+
+        self.upstream_headers = {'Cache-Control': 'public, max-age=60'}
+        self.bounce(path='/public', HTTP_AUTHORIZATION='Bearer secret')
+        response = self.bounce(path='/public')
+        self.assertEqual(response['X-Cache-Status'], 'Hit')
+
+    def test_proxy_cache_vary_headers(self):
+        """
+        Ensure responses are cached per value of the vary headers.
+        """
+        self.add_proxy_cache(vary_headers=['Accept-Language'])
+        self.bounce(HTTP_ACCEPT_LANGUAGE='en')
+        response = self.bounce(HTTP_ACCEPT_LANGUAGE='es')
+        self.assertEqual(response['X-Cache-Status'], 'Miss')
+        response = self.bounce(HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(response['X-Cache-Status'], 'Hit')
+
+        self.upstream_headers['Vary'] = 'Cookie'
+        self.bounce(path='/cookies')
+        response = self.bounce(path='/cookies')
+        self.assertEqual(response['X-Cache-Status'], 'Miss')
+
+    def test_proxy_cache_revalidated(self):
+        """
+        Ensure expired responses are revalidated with their ETag.
+        """
+        self.add_proxy_cache()
+        self.upstream_headers['Cache-Control'] = 'max-age=1'
+        self.bounce()
+        time.sleep(1.1)
+
+        response = self.bounce()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache-Status'], 'Revalidated')
+        self.assertEqual(response.content, b'call 1')
+        self.assertEqual(self.upstream_calls, [None, '"v1"'])
+
+    def test_proxy_cache_stale_on_error(self):
+        """
+        Ensure expired responses are served when the upstream fails.
+        """
+        self.add_proxy_cache()
+        self.upstream_headers = {'Cache-Control': 'max-age=1'}
+        self.bounce()
+        time.sleep(1.1)
+
+        self.upstream_status = 502
+        response = self.bounce()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache-Status'], 'Stale')
+        self.assertEqual(response.content, b'call 1')
+
+    def get_response_cache(self, **config):
+        config = dict(defaults['proxy-cache'], **config)
+        return response_caches.get(self.example_api.pk, config)
+
+    def test_proxy_cache_memory_budget(self):
+        """
+        Ensure an api doesn't cache more than its memory budget.
+        """
+        self.add_proxy_cache(memory_size=1000)
+        for page in range(10):
+            self.bounce(path='/get?page={}'.format(page))
+        cache = self.get_response_cache(memory_size=1000)
+        self.assertLessEqual(cache.memory.size, 1000)
+        self.assertLess(len(cache.memory), 10)
+
+    def test_proxy_cache_disk_tier(self):
+        """
+        Ensure responses evicted from memory are served from disk.
+        """
+        disk_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, disk_path)
+        self.add_proxy_cache(disk_path=disk_path)
+        self.bounce()
+        cache = self.get_response_cache(disk_path=disk_path)
+        cache.memory.clear()
+
+        response = self.bounce()
+        self.assertEqual(response['X-Cache-Status'], 'Hit')
+        self.assertEqual(len(self.upstream_calls), 1)
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.middleware.pipeline import BouncerPipeline
+from api_bouncer.models import Api, Consumer, ConsumerKey, Plugin
+
+User = get_user_model()
+
+
+class RateLimitingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'john',
+            'john@localhost.local',
+            'john123john'
+        )
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        self.url = '/apis/{}/plugins/'.format(self.example_api.name)
+        self.pipeline = BouncerPipeline(lambda request: HttpResponse('OK'))
+
+    def add_rate_limiting(self, **config):
+        Plugin.objects.create(
+            api=self.example_api,
+            name='rate-limiting',
+            config=config
+        )
+
+    def bounce(self, **extra):
+        request = RequestFactory().get(
+            '/get',
+            HTTP_HOST='httpbin.org',
+            **extra
+        )
+        return self.pipeline(request)
+
+    def test_rate_limiting_requires_a_limit(self):
+        """
+        Ensure at least one limit is required.
+        """
+        self.client.login(username='john', password='john123john')
+        data = {'name': 'rate-limiting', 'config': {'limit_by': 'ip'}}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data['config']['minute'] = 10
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rate_limiting_headers(self):
+        """
+        Ensure limits and what's left of them are sent to clients.
+        """
+        self.add_rate_limiting(second=5, hour=100)
+        response = self.bounce()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-RateLimit-Limit-Second'], '5')
+        self.assertEqual(response['X-RateLimit-Remaining-Second'], '4')
+        self.assertEqual(response['X-RateLimit-Limit-Hour'], '100')
+        self.assertEqual(response['X-RateLimit-Remaining-Hour'], '99')
+        self.assertFalse(response.has_header('X-RateLimit-Limit-Minute'))
+
+    def test_rate_limiting_hide_client_headers(self):
+        """
+        Ensure headers can be hidden from clients.
+        """
+        self.add_rate_limiting(minute=5, hide_client_headers=True)
+        response = self.bounce()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('X-RateLimit-Limit-Minute'))
+
+    def test_rate_limiting_exceeded(self):
+        """
+        Ensure requests above the limit are rejected, per client ip.
+        """
+        self.add_rate_limiting(minute=2, limit_by='ip')
+        self.assertEqual(self.bounce().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.bounce().status_code, status.HTTP_200_OK)
+
+        response = self.bounce()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['X-RateLimit-Remaining-Minute'], '0')
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        response = self.bounce(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rate_limiting_shared_policy(self):
+        """
+        Ensure requests are counted in the shared cache with that policy.
+        """
+        self.add_rate_limiting(minute=1, policy='shared')
+        self.assertEqual(self.bounce().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.bounce().status_code, 429)
+
+    def test_rate_limiting_by_consumer(self):
+        """
+        Ensure consumers authenticated by key-auth have their own limits,
+        whatever their ip.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='key-auth',
+            config={'key_names': ['apikey']}
+        )
+        self.add_rate_limiting(minute=1, limit_by='consumer')
+        for username in ('django', 'flask'):
+            consumer = Consumer.objects.create(username=username)
+            consumer_key = ConsumerKey(consumer=consumer)
+            consumer_key.key = '{}-secret-key'.format(username)
+            consumer_key.save()
+
+        response = self.bounce(HTTP_APIKEY='django-secret-key')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.bounce(HTTP_APIKEY='flask-secret-key')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.bounce(
+            HTTP_APIKEY='django-secret-key',
+            REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_rate_limiting_without_queries(self):
+        """
+        Ensure limits are checked without hitting the database.
+        """
+        self.add_rate_limiting(second=100, limit_by='ip')
+        self.bounce()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.bounce().status_code, status.HTTP_200_OK)
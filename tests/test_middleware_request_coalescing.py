@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.test import APITestCase
+
+from api_bouncer.coalescing import (
+    abort_flight,
+    Flights,
+    flights,
+    SharedResponse,
+)
+from api_bouncer.middleware.pipeline import BouncerPipeline
+from api_bouncer.models import Api, Plugin
+from api_bouncer.routing import routing_table
+
+
+class FlightsTests(SimpleTestCase):
+    def test_expired_flight_replaced(self):
+        """
+        Ensure flights never landed stop holding their key once expired.
+        """
+        registry = Flights()
+        stale, leader = registry.join('key', max_waiters=10, timeout=0)
+        self.assertTrue(leader)
+
+        flight, leader = registry.join('key', max_waiters=10, timeout=10)
+        self.assertTrue(leader)
+        self.assertIsNot(flight, stale)
+        self.assertEqual(registry.join('key', 10, 10), (flight, False))
+
+    def test_abort_flight(self):
+        """
+        Ensure waiters of a leader that failed are released empty-handed.
+        """
+        flight, leader = flights.join('abort', max_waiters=10, timeout=10)
+        request = RequestFactory().get('/get')
+        request.META['BOUNCER_FLIGHT'] = ('abort', flight)
+
+        abort_flight(request)
+        self.assertNotIn('BOUNCER_FLIGHT', request.META)
+        self.assertTrue(flight.done.is_set())
+        self.assertIsNone(flight.wait(0))
+        self.assertNotIn('abort', flights._flights)
+        abort_flight(request)
+
+    def test_wait_async(self):
+        """
+        Ensure event loops wait on flights landed by other threads without
+        blocking, until the timeout at most.
+        """
+        registry = Flights()
+        flight, _ = registry.join('key', max_waiters=10, timeout=10)
+        shared = SharedResponse(200, (), b'shared')
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def wait():
+            waiter = asyncio.ensure_future(flight.wait_async(5))
+            await asyncio.sleep(0.01)
+            threading.Thread(
+                target=registry.land,
+                args=('key', flight, shared),
+            ).start()
+            return await waiter
+
+        self.assertEqual(loop.run_until_complete(wait()), shared)
+        self.assertEqual(
+            loop.run_until_complete(flight.wait_async(5)),
+            shared
+        )
+
+        flight, _ = registry.join('other', max_waiters=10, timeout=10)
+        self.assertIsNone(loop.run_until_complete(flight.wait_async(0.01)))
+
+
+class RequestCoalescingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        self.upstream_calls = []
+        self.upstream_cookie = None
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.pipeline = BouncerPipeline(self.upstream)
+
+    def upstream(self, request):
+        self.upstream_calls.append(request.get_full_path())
+        response = HttpResponse('call {}'.format(len(self.upstream_calls)))
+        if self.upstream_cookie:
+            response.set_cookie('session', self.upstream_cookie)
+        if len(self.upstream_calls) == 1:
+            # Hold the first request in flight until released
+            self.entered.set()
+            self.release.wait(5)
+        return response
+
+    def add_request_coalescing(self, **config):
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-coalescing',
+            config=config
+        )
+        # Load the route here, threads don't see the test transaction
+        routing_table.get('httpbin.org', '/get', 'GET')
+
+    def bounce(self, path='/get', method='get', **extra):
+        request = getattr(RequestFactory(), method)(
+            path,
+            HTTP_HOST='httpbin.org',
+            **extra
+        )
+        return self.pipeline(request)
+
+    def start(self, count=1, **kwargs):
+        """Bounce requests in threads, returning their responses"""
+        responses = []
+        threads = [
+            threading.Thread(
+                target=lambda: responses.append(self.bounce(**kwargs))
+            )
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        self.addCleanup(self.join, threads)
+        return threads, responses
+
+    def join(self, threads):
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+
+    def wait_for_waiters(self, count):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            waiters = sum(
+                flight.waiters for flight in flights._flights.values()
+            )
+            if waiters >= count:
+                return
+            time.sleep(0.01)
+        self.fail('Requests did not join the flight')
+
+    def test_request_coalescing(self):
+        """
+        Ensure identical requests in flight share one upstream request.
+        """
+        self.add_request_coalescing()
+        leader, leader_responses = self.start()
+        self.entered.wait(5)
+        waiters, responses = self.start(count=3)
+        self.wait_for_waiters(3)
+
+        self.join(leader + waiters)
+        self.assertEqual(self.upstream_calls, ['/get'])
+        self.assertEqual(
+            [response.content for response in leader_responses + responses],
+            [b'call 1'] * 4
+        )
+        self.assertEqual(len(flights), 0)
+
+    def test_request_coalescing_different_requests(self):
+        """
+        Ensure other paths, queries, methods and consumers aren't coalesced.
+        """
+        self.add_request_coalescing()
+        leader, _ = self.start()
+        self.entered.wait(5)
+
+        self.assertEqual(self.bounce(path='/get?page=2').content, b'call 2')
+        self.assertEqual(self.bounce(path='/ip').content, b'call 3')
+        self.assertEqual(self.bounce(method='post').content, b'call 4')
+        self.assertEqual(
+            self.bounce(HTTP_X_CONSUMER_ID='2').content,
+            b'call 5'
+        )
+
+    def test_request_coalescing_credentials(self):
+        """
+        Ensure requests with credentials aren't coalesced.
+        """
+        self.add_request_coalescing()
+        leader, _ = self.start()
+        self.entered.wait(5)
+
+        response = self.bounce(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.content, b'call 2')
+        response = self.bounce(HTTP_COOKIE='session=secret')
+        self.assertEqual(response.content, b'call 3')
+
+    def test_request_coalescing_max_waiters(self):
+        """
+        Ensure requests above max_waiters go upstream by themselves.
+        """
+        self.add_request_coalescing(max_waiters=1)
+        leader, _ = self.start()
+        self.entered.wait(5)
+        waiters, responses = self.start()
+        self.wait_for_waiters(1)
+
+        self.assertEqual(self.bounce().content, b'call 2')
+        self.join(leader + waiters)
+        self.assertEqual(responses[0].content, b'call 1')
+
+    def test_request_coalescing_timeout(self):
+        """
+        Ensure waiters go upstream once the timeout is reached.
+        """
+        self.add_request_coalescing(timeout=0.1)
+        leader, _ = self.start()
+        self.entered.wait(5)
+
+        self.assertEqual(self.bounce().content, b'call 2')
+
+    def test_request_coalescing_unshareable_response(self):
+        """
+        Ensure responses setting cookies aren't shared with waiters.
+        """
+        self.upstream_cookie = 'secret'
+        self.add_request_coalescing()
+        leader, _ = self.start()
+        self.entered.wait(5)
+        waiters, responses = self.start()
+        self.wait_for_waiters(1)
+
+        self.join(leader + waiters)
+        self.assertEqual(responses[0].content, b'call 2')
+        self.assertEqual(len(self.upstream_calls), 2)
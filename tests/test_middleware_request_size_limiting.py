@@ -0,0 +1,108 @@
+import io
+
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.models import Api, Plugin
+from api_bouncer.plugins.request_size_limiting import (
+    RequestSizeLimitingPlugin,
+)
+from api_bouncer.proxy import BodyTooLarge, iter_request_body
+from api_bouncer.schemas import defaults
+
+
+class RequestSizeLimitingPluginTests(SimpleTestCase):
+    def get_plugin(self, **config):
+        return RequestSizeLimitingPlugin(
+            dict(defaults['request-size-limiting'], **config)
+        )
+
+    def test_content_length(self):
+        """
+        Ensure bodies are checked against their Content-Length, unread.
+        """
+        plugin = self.get_plugin(allowed_payload_size=1, size_unit='kilobytes')
+        request = RequestFactory().post(
+            '/post',
+            data=b'x' * 1025,
+            content_type='text/plain'
+        )
+        response = plugin.process_request(request)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertEqual(request.read(), b'x' * 1025)
+
+        request = RequestFactory().post(
+            '/post',
+            data=b'x' * 1024,
+            content_type='text/plain'
+        )
+        self.assertIsNone(plugin.process_request(request))
+
+    def test_chunked_body(self):
+        """
+        Ensure chunked bodies are counted as they're read.
+        """
+        plugin = self.get_plugin(allowed_payload_size=10, size_unit='bytes')
+        request = RequestFactory().post(
+            '/post',
+            HTTP_TRANSFER_ENCODING='chunked',
+            **{'wsgi.input': io.BytesIO(b'x' * 25)}
+        )
+        self.assertIsNone(plugin.process_request(request))
+        chunks = iter_request_body(request.META['wsgi.input'], 5)
+        self.assertEqual(next(chunks), b'xxxxx')
+        self.assertEqual(next(chunks), b'xxxxx')
+        with self.assertRaises(BodyTooLarge):
+            next(chunks)
+
+        plugin = self.get_plugin(require_content_length=True)
+        response = plugin.process_request(request)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_411_LENGTH_REQUIRED
+        )
+
+
+class RequestSizeLimitingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        Plugin.objects.create(
+            api=self.example_api,
+            name='key-auth',
+            config={'key_in_body': True}
+        )
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-size-limiting',
+            config={'allowed_payload_size': 20, 'size_unit': 'bytes'}
+        )
+
+    def test_reject_before_auth(self):
+        """
+        Ensure oversized bodies are rejected before key-auth reads them.
+        """
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.post(
+            '/post',
+            {'apikey': 'a-very-long-api-key'},
+            format='json'
+        )
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertEqual(
+            response.json(),
+            {'message': 'Request size limit exceeded'}
+        )
+
+        response = self.client.post('/post', {'apikey': 'k'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
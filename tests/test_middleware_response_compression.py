@@ -0,0 +1,129 @@
+import gzip
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.test import APITestCase
+
+from api_bouncer.compression import Compressor, negotiate_encoding
+from api_bouncer.middleware.pipeline import BouncerPipeline
+from api_bouncer.models import Api, Plugin
+
+BODY = b'{"message": "hello"}' * 100
+
+
+class CompressionTests(SimpleTestCase):
+    def test_negotiate_encoding(self):
+        """
+        Ensure the content coding preferred by the client is picked.
+        """
+        self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'gzip')
+        self.assertEqual(negotiate_encoding('deflate'), 'deflate')
+        self.assertEqual(negotiate_encoding('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(negotiate_encoding('*'), 'gzip')
+        self.assertIsNone(negotiate_encoding('gzip;q=0, br'))
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertIsNone(negotiate_encoding(None))
+
+    def test_compressor_stream(self):
+        """
+        Ensure each chunk is compressed as it comes.
+        """
+        compressor = Compressor('gzip', 6)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for chunk in (BODY, BODY):
+            data = compressor.compress(chunk)
+            self.assertEqual(decompressor.decompress(data), chunk)
+        decompressor.decompress(compressor.finish())
+        self.assertTrue(decompressor.eof)
+
+
+class ResponseCompressionMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        self.upstream_response = HttpResponse(
+            BODY,
+            content_type='application/json'
+        )
+        self.pipeline = BouncerPipeline(lambda request: self.upstream_response)
+
+    def add_response_compression(self, **config):
+        Plugin.objects.create(
+            api=self.example_api,
+            name='response-compression',
+            config=config
+        )
+
+    def bounce(self, method='get', **extra):
+        request = getattr(RequestFactory(), method)(
+            '/get',
+            HTTP_HOST='httpbin.org',
+            **extra
+        )
+        return self.pipeline(request)
+
+    def test_compress_response(self):
+        """
+        Ensure responses are compressed with the coding the client accepts.
+        """
+        self.add_response_compression()
+        self.upstream_response['ETag'] = '"v1"'
+        response = self.bounce(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(
+            response['Content-Length'],
+            str(len(response.content))
+        )
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_compress_streaming_response(self):
+        """
+        Ensure streamed responses are compressed without being buffered.
+        """
+        self.add_response_compression()
+        chunks = [BODY, BODY]
+        self.upstream_response = StreamingHttpResponse(
+            iter(chunks),
+            content_type='application/json'
+        )
+        response = self.bounce(HTTP_ACCEPT_ENCODING='deflate')
+        self.assertEqual(response['Content-Encoding'], 'deflate')
+        self.assertFalse(response.has_header('Content-Length'))
+
+        decompressor = zlib.decompressobj()
+        streamed = response.streaming_content
+        self.assertEqual(decompressor.decompress(next(streamed)), BODY)
+        self.assertEqual(decompressor.decompress(next(streamed)), BODY)
+        decompressor.decompress(b''.join(streamed))
+        self.assertTrue(decompressor.eof)
+
+    def test_skip_response(self):
+        """
+        Ensure small, compressed or disallowed responses are left as-is,
+        as well as responses to clients not accepting compression.
+        """
+        self.add_response_compression(min_size=10, content_types=['text/*'])
+        response = self.bounce(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        self.upstream_response = HttpResponse('small')
+        response = self.bounce(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        self.upstream_response = HttpResponse(BODY)
+        response = self.bounce()
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, BODY)
+
+        self.upstream_response = HttpResponse(b'compressed' * 10)
+        self.upstream_response['Content-Encoding'] = 'br'
+        response = self.bounce(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response.content, b'compressed' * 10)
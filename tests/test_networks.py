@@ -0,0 +1,52 @@
+import ipaddress
+
+from django.test import SimpleTestCase
+
+from api_bouncer.networks import NetworkSet
+
+
+class NetworkSetTests(SimpleTestCase):
+    def test_ipv4_membership(self):
+        """
+        Ensure IPv4 addresses are matched against IPv4 networks.
+        """
+        networks = NetworkSet(['192.168.1.0/24', '10.0.0.1'])
+        self.assertIn('192.168.1.0', networks)
+        self.assertIn('192.168.1.255', networks)
+        self.assertIn(ipaddress.ip_address('10.0.0.1'), networks)
+        self.assertNotIn('192.168.2.0', networks)
+        self.assertNotIn('192.168.0.255', networks)
+        self.assertNotIn('10.0.0.2', networks)
+
+    def test_ipv6_membership(self):
+        """
+        Ensure IPv6 addresses are matched against IPv6 networks only.
+        """
+        networks = NetworkSet(['2001:db00::0/24', '0.0.0.0/0'])
+        self.assertIn('2001:db00::1', networks)
+        self.assertNotIn('2001:dc00::1', networks)
+        self.assertNotIn('::ffff:0:0', networks)
+
+    def test_networks_merged(self):
+        """
+        Ensure overlapping and adjacent networks are merged.
+        """
+        networks = NetworkSet([
+            '10.0.0.0/24',
+            '10.0.1.0/24',
+            '10.0.0.128/25',
+            '10.0.3.0/24',
+        ])
+        self.assertEqual(len(networks), 2)
+        self.assertIn('10.0.1.255', networks)
+        self.assertNotIn('10.0.2.0', networks)
+        self.assertIn('10.0.3.0', networks)
+
+    def test_empty(self):
+        """
+        Ensure empty sets are falsy and match nothing.
+        """
+        networks = NetworkSet()
+        self.assertFalse(networks)
+        self.assertNotIn('127.0.0.1', networks)
+        self.assertNotIn('::1', networks)
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.models import Api, Plugin
+from api_bouncer.routing import routing_table
+
+User = get_user_model()
+
+
+class BouncerPipelineTests(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'john',
+            'john@localhost.local',
+            'john123john'
+        )
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        self.url = '/apis/{}/plugins/'.format(self.example_api.name)
+
+    def add_plugins(self, *names):
+        self.client.login(username='john', password='john123john')
+        for name in names:
+            response = self.client.post(self.url, {'name': name})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.logout()
+
+    def test_pipeline_order(self):
+        """
+        Ensure plugins are compiled in phase order, cheap checks first.
+        """
+        self.add_plugins('acl', 'key-auth', 'ip-restriction')
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-termination',
+            config={'status_code': 503}
+        )
+        route = routing_table.get('httpbin.org')
+        self.assertEqual(
+            [plugin.name for plugin in route.pipeline],
+            ['request-termination', 'ip-restriction', 'key-auth', 'acl']
+        )
+
+    def test_pipeline_skips_unconfigured_plugins(self):
+        """
+        Ensure only plugins configured for the api are in its pipeline.
+        """
+        self.add_plugins('key-auth')
+        route = routing_table.get('httpbin.org')
+        self.assertEqual(
+            [plugin.name for plugin in route.pipeline],
+            ['key-auth']
+        )
+
+    def test_access_phase_runs_before_auth(self):
+        """
+        Ensure request-termination stops requests before key-auth runs.
+        """
+        self.add_plugins('key-auth')
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-termination',
+            config={'status_code': 503, 'message': 'Maintenance'}
+        )
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.get('/get')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'message': 'Maintenance'})
+
+    @override_settings(MIDDLEWARE=[
+        'api_bouncer.middleware.bouncer.BouncerMiddleware',
+        'api_bouncer.middleware.key_auth.KeyAuthMiddleware',
+        'api_bouncer.middleware.request_termination.'
+        'RequestTerminationMiddleware',
+    ])
+    def test_plugin_middleware(self):
+        """
+        Ensure plugins can still be enabled with their own middleware.
+        """
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-termination',
+            config={'status_code': 503}
+        )
+        self.client.credentials(HTTP_HOST='httpbin.org')
+        response = self.client.get('/get')
+        self.assertEqual(response.status_code, 503)
@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase
+
+from api_bouncer.models import Api
+from api_bouncer.registry import ApiRegistry
+
+
+class Client(object):
+    def __init__(self, api):
+        self.upstream_url = api.upstream_url
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ApiRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.api = Api(pk=1, name='httpbin', upstream_url='http://a.local')
+
+    def test_object_reused(self):
+        """
+        Ensure objects are built once per api, whether given as an instance
+        or its primary key.
+        """
+        registry = ApiRegistry(Client)
+        client = registry.get(self.api)
+        self.assertIs(registry.get(self.api), client)
+        self.assertIs(registry.get(Api(pk=1, name='httpbin')), client)
+        self.assertIn(1, registry)
+        self.assertEqual(registry.values(), [client])
+
+    def test_object_replaced(self):
+        """
+        Ensure objects are replaced when their settings change, and the
+        replaced ones closed.
+        """
+        registry = ApiRegistry(
+            Client,
+            settings=lambda api: api.upstream_url,
+            close=Client.close,
+        )
+        client = registry.get(self.api)
+        self.api.upstream_url = 'http://b.local'
+        new_client = registry.get(self.api)
+        self.assertIsNot(new_client, client)
+        self.assertTrue(client.closed)
+        self.assertEqual(new_client.upstream_url, 'http://b.local')
+
+    def test_object_updated(self):
+        """
+        Ensure objects are updated in place when given an update.
+        """
+        registry = ApiRegistry(
+            Client,
+            settings=lambda api: api.upstream_url,
+            update=lambda client, api: setattr(
+                client, 'upstream_url', api.upstream_url
+            ),
+        )
+        client = registry.get(self.api)
+        self.api.upstream_url = 'http://b.local'
+        self.assertIs(registry.get(self.api), client)
+        self.assertEqual(client.upstream_url, 'http://b.local')
+
+    def test_discard(self):
+        """
+        Ensure discarded objects are dropped and closed.
+        """
+        registry = ApiRegistry(Client, close=Client.close)
+        client = registry.get(self.api)
+        other = registry.get(Api(pk=2, name='other', upstream_url=''))
+        registry.discard(1)
+        self.assertTrue(client.closed)
+        self.assertNotIn(1, registry)
+        self.assertIsNot(registry.get(self.api), client)
+
+        registry.discard_if(lambda api_id, client: api_id == 2)
+        self.assertTrue(other.closed)
+        registry.clear()
+        self.assertEqual(len(registry), 0)
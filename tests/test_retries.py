@@ -0,0 +1,110 @@
+import socket
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings, SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_bouncer.models import Api
+from api_bouncer.retries import get_backoff, get_retries, RetryBudget
+
+User = get_user_model()
+
+
+class RetriesTests(SimpleTestCase):
+    def test_get_retries(self):
+        """
+        Ensure only idempotent requests with a buffered body are retried.
+        """
+        api = Api(retries=3)
+        self.assertEqual(get_retries(api, 'GET', None), 3)
+        self.assertEqual(get_retries(api, 'PUT', b'{}'), 3)
+        self.assertEqual(get_retries(api, 'PUT', iter([b'{}'])), 0)
+        self.assertEqual(get_retries(api, 'POST', None), 0)
+        self.assertEqual(get_retries(api, 'PATCH', b'{}'), 0)
+
+    @override_settings(API_BOUNCER={
+        'RETRY_BACKOFF': 0.1,
+        'RETRY_BACKOFF_MAX': 0.3,
+    })
+    def test_get_backoff(self):
+        """
+        Ensure backoffs grow exponentially, up to RETRY_BACKOFF_MAX.
+        """
+        for attempt, ceiling in ((1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)):
+            backoffs = [get_backoff(attempt) for _ in range(100)]
+            self.assertTrue(all(0 <= b <= ceiling for b in backoffs))
+            self.assertGreater(max(backoffs), ceiling / 2)
+
+    @override_settings(API_BOUNCER={'RETRY_BUDGET_MIN_RETRIES': 2})
+    def test_retry_budget(self):
+        """
+        Ensure retries are capped by a percentage of requests, with a few
+        always allowed.
+        """
+        budget = RetryBudget(10)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+        for _ in range(50):
+            budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+
+class TimeoutTests(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'john',
+            'john@localhost.local',
+            'john123john'
+        )
+
+    def test_retry_failed_connections(self):
+        """
+        Ensure idempotent requests are retried when connections fail, and
+        other requests aren't.
+        """
+        # Nothing listens on port 1, so connections are refused right away
+        api = Api.objects.create(
+            name='down',
+            hosts=['down.example.com'],
+            upstream_url='http://127.0.0.1:1',
+            retries=2
+        )
+        self.client.credentials(HTTP_HOST='down.example.com')
+        response = self.client.get('/get')
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+        response = self.client.post('/post')
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+
+        self.client.credentials()
+        self.client.login(username='john', password='john123john')
+        response = self.client.get('/apis/{}/health/'.format(api.name))
+        self.assertEqual(response.data['targets'][0]['failures'], 4)
+
+    def test_read_timeout(self):
+        """
+        Ensure upstreams not answering within the read timeout get a 504.
+        """
+        # Accepts connections but never answers
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(5)
+        self.addCleanup(listener.close)
+
+        Api.objects.create(
+            name='slow',
+            hosts=['slow.example.com'],
+            upstream_url='http://127.0.0.1:{}'.format(
+                listener.getsockname()[1]
+            ),
+            read_timeout=100
+        )
+        self.client.credentials(HTTP_HOST='slow.example.com')
+        response = self.client.get('/get')
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(response.json(), {'message': 'Upstream timed out'})
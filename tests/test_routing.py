@@ -0,0 +1,199 @@
+from rest_framework.test import APITestCase
+
+from api_bouncer.models import Api, ApiHost, Plugin
+from api_bouncer.routing import (
+    normalize_host,
+    PathRouter,
+    routing_table,
+    WildcardHosts,
+)
+
+
+class RoutingTableTests(APITestCase):
+    def setUp(self):
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org', 'www.httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        self.plugin = Plugin.objects.create(
+            api=self.example_api,
+            name='key-auth',
+            config={'key_names': ['x-apikey']}
+        )
+
+    def test_normalize_host(self):
+        """
+        Ensure hosts are lower-cased and stripped from port and trailing dot.
+        """
+        self.assertEqual(normalize_host('HttpBin.org:8080'), 'httpbin.org')
+        self.assertEqual(normalize_host('httpbin.org.'), 'httpbin.org')
+        self.assertEqual(normalize_host(None), '')
+        self.assertEqual(normalize_host('[::1]:8080'), '[::1]')
+
+    def test_route_merges_plugin_defaults(self):
+        """
+        Ensure routes hold the api, its upstream and merged plugin configs.
+        """
+        route = routing_table.get('HTTPBIN.org:80')
+        self.assertEqual(route.api, self.example_api)
+        self.assertEqual(route.upstream_url, 'https://httpbin.org')
+        self.assertEqual(route.plugins['key-auth']['key_names'], ['x-apikey'])
+        self.assertFalse(route.plugins['key-auth']['key_in_body'])
+        self.assertEqual(routing_table.get('www.httpbin.org').api, route.api)
+        self.assertIsNone(routing_table.get('the-unknown.com'))
+
+    def test_lookup_without_queries(self):
+        """
+        Ensure hosts are loaded with a single lookup and then cached, unknown
+        hosts included.
+        """
+        with self.assertNumQueries(2):
+            routing_table.get('httpbin.org')
+        with self.assertNumQueries(1):
+            routing_table.get('the-unknown.com')
+        with self.assertNumQueries(0):
+            routing_table.get('httpbin.org')
+            routing_table.get('the-unknown.com')
+
+    def test_hosts_synced(self):
+        """
+        Ensure api hosts are stored normalized and follow the api hosts.
+        """
+        self.assertEqual(
+            set(ApiHost.objects.values_list('host', flat=True)),
+            {'httpbin.org', 'www.httpbin.org'}
+        )
+        self.example_api.hosts = ['HttpBin.org.', 'eu.httpbin.org']
+        self.example_api.save()
+        self.assertEqual(
+            set(self.example_api.api_hosts.values_list('host', flat=True)),
+            {'httpbin.org', 'eu.httpbin.org'}
+        )
+        self.assertIsNone(routing_table.get('www.httpbin.org'))
+        self.assertEqual(
+            routing_table.get('eu.httpbin.org').api,
+            self.example_api
+        )
+
+    def test_rebuilt_on_api_change(self):
+        """
+        Ensure the table is rebuilt when an api is saved or deleted.
+        """
+        routing_table.get('httpbin.org')
+        self.example_api.upstream_url = 'https://eu.httpbin.org'
+        self.example_api.save()
+        route = routing_table.get('httpbin.org')
+        self.assertEqual(route.upstream_url, 'https://eu.httpbin.org')
+
+        self.example_api.delete()
+        self.assertIsNone(routing_table.get('httpbin.org'))
+        self.assertFalse(ApiHost.objects.exists())
+
+    def test_rebuilt_on_plugin_change(self):
+        """
+        Ensure the table is rebuilt when a plugin is saved or deleted.
+        """
+        routing_table.get('httpbin.org')
+        Plugin.objects.create(
+            api=self.example_api,
+            name='request-termination',
+            config={'status_code': 503}
+        )
+        route = routing_table.get('httpbin.org')
+        self.assertIn('request-termination', route.plugins)
+
+        self.plugin.delete()
+        route = routing_table.get('httpbin.org')
+        self.assertNotIn('key-auth', route.plugins)
+
+    def test_wildcard_hosts(self):
+        """
+        Ensure wildcards match one or more labels, and the most specific
+        wildcard wins.
+        """
+        wildcards = WildcardHosts()
+        wildcards.add('*.example.com', 'example')
+        wildcards.add('*.eu.example.com', 'eu')
+        wildcards.add('api.*', 'api')
+
+        self.assertEqual(wildcards.get('www.example.com'), 'example')
+        self.assertEqual(wildcards.get('a.b.example.com'), 'example')
+        self.assertEqual(wildcards.get('www.eu.example.com'), 'eu')
+        self.assertEqual(wildcards.get('api.example.org'), 'api')
+        self.assertEqual(wildcards.get('api.example.com'), 'example')
+        self.assertIsNone(wildcards.get('example.com'))
+        self.assertIsNone(wildcards.get('api'))
+
+    def test_route_wildcard_hosts(self):
+        """
+        Ensure wildcard hosts are routed, after exact hosts.
+        """
+        tenants_api = Api.objects.create(
+            name='tenants',
+            hosts=['*.httpbin.org', 'tenants.*'],
+            upstream_url='https://tenants.httpbin.org'
+        )
+        route = routing_table.get('www.httpbin.org')
+        self.assertEqual(route.api, self.example_api)
+        route = routing_table.get('acme.httpbin.org')
+        self.assertEqual(route.api, tenants_api)
+        self.assertEqual(routing_table.get('tenants.local').api, tenants_api)
+        self.assertIsNone(routing_table.get('*.httpbin.org'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                routing_table.get('umbrella.httpbin.org').api,
+                tenants_api
+            )
+
+    def test_path_router(self):
+        """
+        Ensure the longest prefix accepting the method wins, and prefixes
+        only match whole path segments.
+        """
+        router = PathRouter()
+        router.add('', [], 'root')
+        router.add('/users', [], 'users')
+        router.add('/users/admin', ['POST'], 'admin')
+        router.add('/use', ['GET'], 'use')
+
+        self.assertEqual(router.match('/', 'GET'), 'root')
+        self.assertEqual(router.match('/users', 'GET'), 'users')
+        self.assertEqual(router.match('/users/1', 'GET'), 'users')
+        self.assertEqual(router.match('/users/admin/1', 'POST'), 'admin')
+        self.assertEqual(router.match('/users/admin', 'GET'), 'users')
+        self.assertEqual(router.match('/use/1', 'GET'), 'use')
+        self.assertEqual(router.match('/use', 'PUT'), 'root')
+        self.assertEqual(router.match('/usersx', 'GET'), 'root')
+
+    def test_route_uris_and_methods(self):
+        """
+        Ensure apis sharing a host are routed by uri and method, and their
+        uri is stripped from upstream urls if asked to.
+        """
+        users_api = Api.objects.create(
+            name='users',
+            hosts=['httpbin.org'],
+            uris=['/users'],
+            methods=['GET'],
+            strip_uri=True,
+            upstream_url='https://users.httpbin.org'
+        )
+        route = routing_table.get('httpbin.org', '/users/1', 'GET')
+        self.assertEqual(route.api, users_api)
+        self.assertEqual(
+            route.get_upstream_url('/users/1'),
+            'https://users.httpbin.org/1'
+        )
+        self.assertEqual(
+            route.get_upstream_url('/users'),
+            'https://users.httpbin.org/'
+        )
+
+        route = routing_table.get('httpbin.org', '/users/1', 'POST')
+        self.assertEqual(route.api, self.example_api)
+        self.assertEqual(
+            route.get_upstream_url('/users/1'),
+            'https://httpbin.org/users/1'
+        )
@@ -0,0 +1,263 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.test import APITestCase
+
+from api_bouncer.middleware.pipeline import BouncerPipeline
+from api_bouncer.models import Api, Plugin
+from api_bouncer.plugins.tracing import TracingPlugin
+from api_bouncer.schemas import defaults
+from api_bouncer.tracing import (
+    activate,
+    BatchExporter,
+    deactivate,
+    FileWriter,
+    format_traceparent,
+    HTTPWriter,
+    install_query_tracer,
+    parse_traceparent,
+    Trace,
+)
+
+TRACE_ID = '0af7651916cd43dd8448eb211c80319c'
+TRACEPARENT = '00-{}-b7ad6b7169203331-01'.format(TRACE_ID)
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    """Collector stand-in, keeping the batches it's sent"""
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        self.server.batches.append(json.loads(self.rfile.read(length)))
+        self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeCursor(object):
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, sql, params=None):
+        self.queries.append(sql)
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeConnection(object):
+    vendor = 'fake'
+
+    def make_cursor(self, cursor):
+        return cursor
+
+    def make_debug_cursor(self, cursor):
+        return cursor
+
+
+class TracingTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'spans.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_spans(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_parse_traceparent(self):
+        """
+        Ensure valid traceparent headers are parsed and others ignored.
+        """
+        self.assertEqual(
+            parse_traceparent(TRACEPARENT),
+            (TRACE_ID, 'b7ad6b7169203331', True)
+        )
+        self.assertEqual(
+            parse_traceparent(format_traceparent(TRACE_ID, 'b7ad6b7169203331',
+                                                 sampled=False)),
+            (TRACE_ID, 'b7ad6b7169203331', False)
+        )
+        self.assertIsNone(parse_traceparent('00-{}-{}-01'.format(
+            '0' * 32, 'b7ad6b7169203331'
+        )))
+        self.assertIsNone(parse_traceparent('not-a-traceparent'))
+        self.assertIsNone(parse_traceparent(None))
+
+    def test_sampling(self):
+        """
+        Ensure requests are sampled at the sample rate, unless their client
+        trace says otherwise.
+        """
+        route = type('Route', (), {'api': Api(name='httpbin')})
+        plugin = TracingPlugin(dict(
+            defaults['tracing'],
+            sample_rate=0,
+            path=self.path,
+        ))
+
+        request = RequestFactory().get('/get')
+        self.assertIsNone(plugin.process_request(request))
+        self.assertNotIn('BOUNCER_TRACE', request.META)
+        self.assertNotIn('HTTP_TRACEPARENT', request.META)
+        self.assertFalse(plugin.needs_response(request))
+
+        request = RequestFactory().get('/get', HTTP_TRACEPARENT=TRACEPARENT)
+        request.META['BOUNCER_ROUTE'] = route
+        plugin.process_request(request)
+        trace = request.META['BOUNCER_TRACE']
+        self.assertTrue(plugin.needs_response(request))
+        self.assertEqual(
+            request.META['HTTP_TRACEPARENT'],
+            '00-{}-{}-01'.format(TRACE_ID, trace.upstream_span_id)
+        )
+        plugin.process_response(request, HttpResponse(status=201))
+        plugin.exporter.flush()
+
+        span, = self.read_spans()
+        self.assertEqual(span['name'], 'bouncer.request')
+        self.assertEqual(span['trace_id'], TRACE_ID)
+        self.assertEqual(span['parent_id'], 'b7ad6b7169203331')
+        self.assertEqual(span['attributes']['http.status_code'], 201)
+
+    def test_query_tracer(self):
+        """
+        Ensure queries get spans while a trace is active, once per query
+        however many times connections are set up.
+        """
+        connection = FakeConnection()
+        install_query_tracer(connection)
+        install_query_tracer(connection)
+        trace = Trace(exporter=None)
+
+        cursor = connection.make_cursor(FakeCursor())
+        cursor.execute('SELECT 1')
+        activate(trace)
+        try:
+            with connection.make_debug_cursor(FakeCursor()) as cursor:
+                cursor.execute('SELECT 2')
+        finally:
+            deactivate()
+        cursor.execute('SELECT 3')
+
+        self.assertEqual(cursor.queries, ['SELECT 2', 'SELECT 3'])
+        span, = trace.spans
+        self.assertEqual(span['name'], 'db.query')
+        self.assertEqual(span['attributes'], {
+            'db.statement': 'SELECT 2',
+            'db.vendor': 'fake',
+        })
+
+    def test_file_exporter(self):
+        """
+        Ensure spans are written in batches by the exporter thread.
+        """
+        exporter = BatchExporter(FileWriter(self.path), batch_size=2)
+        written = threading.Event()
+        write = exporter.write
+        exporter.write = lambda batch: (write(batch), written.set())
+
+        exporter.export([{'name': 'a'}])
+        self.assertFalse(os.path.exists(self.path))
+        exporter.export([{'name': 'b'}, {'name': 'c'}])
+        self.assertTrue(written.wait(5))
+        exporter.flush()
+        self.assertEqual(
+            [span['name'] for span in self.read_spans()],
+            ['a', 'b', 'c']
+        )
+
+    def test_http_exporter(self):
+        """
+        Ensure spans are posted to collectors, and dropped if they fail.
+        """
+        collector = HTTPServer(('127.0.0.1', 0), CollectorHandler)
+        collector.batches = []
+        threading.Thread(target=collector.serve_forever, daemon=True).start()
+        self.addCleanup(collector.server_close)
+        self.addCleanup(collector.shutdown)
+
+        url = 'http://127.0.0.1:{}/spans'.format(collector.server_port)
+        exporter = BatchExporter(HTTPWriter(url), batch_size=2)
+        exporter.queue.put({'name': 'a'})
+        exporter.queue.put({'name': 'b'})
+        exporter.queue.put({'name': 'c'})
+        exporter.flush()
+        self.assertEqual(collector.batches, [
+            {'spans': [{'name': 'a'}, {'name': 'b'}]},
+            {'spans': [{'name': 'c'}]},
+        ])
+
+        exporter = BatchExporter(HTTPWriter('http://127.0.0.1:1/spans'))
+        exporter.queue.put({'name': 'a'})
+        exporter.flush()
+        self.assertEqual(exporter.dropped, 1)
+
+
+class TracingMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'spans.jsonl')
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+        Plugin.objects.create(
+            api=self.example_api,
+            name='tracing',
+            config={'sample_rate': 1, 'path': self.path}
+        )
+        Plugin.objects.create(
+            api=self.example_api,
+            name='ip-restriction',
+            config={'blacklist': ['10.0.0.1']}
+        )
+        self.traceparents = []
+        self.pipeline = BouncerPipeline(self.upstream)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def upstream(self, request):
+        self.traceparents.append(request.META.get('HTTP_TRACEPARENT'))
+        Api.objects.count()
+        return HttpResponse()
+
+    def test_trace_request(self):
+        """
+        Ensure sampled requests get spans for routing, plugins and database
+        queries, and send their trace context upstream.
+        """
+        request = RequestFactory().get(
+            '/get',
+            HTTP_HOST='httpbin.org',
+            HTTP_TRACEPARENT=TRACEPARENT
+        )
+        self.pipeline(request)
+        for plugin in request.META['BOUNCER_ROUTE'].pipeline:
+            if plugin.name == 'tracing':
+                plugin.exporter.flush()
+
+        trace = request.META['BOUNCER_TRACE']
+        self.assertEqual(
+            self.traceparents,
+            ['00-{}-{}-01'.format(TRACE_ID, trace.upstream_span_id)]
+        )
+        with open(self.path) as f:
+            spans = [json.loads(line) for line in f]
+        names = [span['name'] for span in spans]
+        self.assertEqual(names[0], 'bouncer.routing')
+        self.assertIn('plugin.ip-restriction', names)
+        self.assertIn('db.query', names)
+        self.assertEqual(names[-1], 'bouncer.request')
+        self.assertTrue(all(span['trace_id'] == TRACE_ID for span in spans))
@@ -0,0 +1,71 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api_bouncer.models import Api
+from api_bouncer.upstream import upstream_clients
+
+
+class UpstreamClientsTests(APITestCase):
+    def setUp(self):
+        self.example_api = Api.objects.create(
+            name='httpbin',
+            hosts=['httpbin.org'],
+            upstream_url='https://httpbin.org'
+        )
+
+    def test_client_is_reused(self):
+        """
+        Ensure the same client is used for every request to an api.
+        """
+        client = upstream_clients.get(self.example_api)
+        self.assertIs(upstream_clients.get(self.example_api), client)
+        self.assertEqual(client.upstream_url, 'https://httpbin.org')
+
+    def test_client_replaced_on_upstream_change(self):
+        """
+        Ensure a new client is created when the upstream url changes.
+        """
+        client = upstream_clients.get(self.example_api)
+        self.example_api.upstream_url = 'https://eu.httpbin.org'
+        self.example_api.save()
+        new_client = upstream_clients.get(self.example_api)
+        self.assertIsNot(new_client, client)
+        self.assertEqual(new_client.upstream_url, 'https://eu.httpbin.org')
+
+    def test_client_discarded_on_api_delete(self):
+        """
+        Ensure the client of an api is closed when the api is deleted.
+        """
+        client = upstream_clients.get(self.example_api)
+        api_id = self.example_api.pk
+        self.example_api.delete()
+        self.assertNotIn(api_id, upstream_clients)
+        self.example_api.pk = api_id
+        self.assertIsNot(upstream_clients.get(self.example_api), client)
+
+    @override_settings(API_BOUNCER={'UPSTREAM_IDLE_TIMEOUT': 0})
+    def test_idle_clients_evicted(self):
+        """
+        Ensure idle clients are closed and replaced.
+        """
+        client = upstream_clients.get(self.example_api)
+        upstream_clients.evict_idle()
+        self.assertIsNot(upstream_clients.get(self.example_api), client)
+
+    @override_settings(API_BOUNCER={'UPSTREAM_POOL_SIZE': 42})
+    def test_client_pool_size(self):
+        """
+        Ensure upstream connection pools use the configured size.
+        """
+        upstream_clients.discard(self.example_api.pk)
+        client = upstream_clients.get(self.example_api)
+        adapter = client.session.get_adapter(self.example_api.upstream_url)
+        self.assertEqual(adapter._pool_maxsize, 42)
+
+    def test_upstream_cookies_not_kept(self):
+        """
+        Ensure cookies set by an upstream are never sent to other consumers.
+        """
+        client = upstream_clients.get(self.example_api)
+        policy = client.session.cookies.get_policy()
+        self.assertTrue(policy.is_not_allowed('httpbin.org'))